@@ -1,13 +1,32 @@
 # Import Flask framework for creating web application
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, stream_with_context
 # Import sqlite3 for database operations
 import sqlite3
 # Import hashlib for password hashing (security)
 import hashlib
 # Import os for secret key generation
 import os
+# Import threading for the per-thread connection pool
+import threading
+# Import time for pool wait accounting
+import time
+# Import json for background job payloads
+import json
+# Import queue for the Server-Sent Events hub
+import queue
+# Import csv, io and zipfile for the streaming gradebook export
+import csv
+import io
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
+# Import re and markupsafe for full-text search queries and highlighted results
+import re
+from markupsafe import Markup, escape
 # Import contextmanager for safe database connection handling
 from contextlib import contextmanager
+# Import OrderedDict and datetime for the lesson page cache and date parsing
+from collections import OrderedDict
+from datetime import datetime, timezone
 
 # Initialize Flask application
 app = Flask(__name__)
@@ -15,410 +34,2826 @@ app = Flask(__name__)
 # This ensures user sessions are secure and cannot be tampered with
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
+# Path of the SQLite database file (override with LMS_DATABASE, e.g. for testing)
+DATABASE = os.environ.get('LMS_DATABASE', 'lms.db')
+
+# Maximum number of SQLite connections the pool keeps open at the same time
+DB_POOL_SIZE = int(os.environ.get('LMS_DB_POOL_SIZE', '16'))
+
+# Seconds a thread waits for a free pooled connection before giving up
+DB_POOL_TIMEOUT = float(os.environ.get('LMS_DB_POOL_TIMEOUT', '30'))
+
+# Named SQLite storage profiles (select with LMS_STORAGE_PROFILE)
+# journal_mode is stored in the database file and set once at startup;
+# every other PRAGMA is applied once to each new pooled connection.
+STORAGE_PROFILES = {
+    # Local development: WAL so the dev server's threads don't block each other
+    'dev': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        # Negative value = size in KiB (2 MB page cache per connection)
+        'cache_size': -2000,
+        'temp_store': 'MEMORY',
+        'mmap_size': 0,
+    },
+    # Production: readers never block the single writer, and vice versa
+    'production': {
+        'journal_mode': 'WAL',
+        # NORMAL is durable across application crashes in WAL mode
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        # 64 MB page cache per connection
+        'cache_size': -64000,
+        'temp_store': 'MEMORY',
+        # Map up to 256 MB of the database file into memory
+        'mmap_size': 268435456,
+    },
+    # Bulk loading (imports, backfills): trade durability for write speed
+    'bulk-load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'busy_timeout': 30000,
+        # 256 MB page cache per connection
+        'cache_size': -256000,
+        'temp_store': 'MEMORY',
+        'mmap_size': 268435456,
+    },
+}
+
+# Storage profile used by this process
+STORAGE_PROFILE = os.environ.get('LMS_STORAGE_PROFILE', 'production')
+
+# PRAGMA values as SQLite reports them back, used when checking the profile
+PRAGMA_READBACK = {
+    'journal_mode': lambda value: str(value).lower(),
+    'synchronous': lambda value: {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3}.get(str(value).upper(), value),
+    'temp_store': lambda value: {'DEFAULT': 0, 'FILE': 1, 'MEMORY': 2}.get(str(value).upper(), value),
+}
+
+
+class PooledConnection:
+    """
+    A long-lived sqlite3 connection handed out by ConnectionPool.
+    
+    Behaves like sqlite3.Connection (execute, cursor, commit, rollback, ...),
+    except that close() gives the connection back to the pool instead of
+    closing the underlying database handle. This keeps the existing
+    "conn = get_db_connection() ... conn.close()" pattern in the routes
+    working unchanged.
+    """
+    
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        # Thread ident that currently has affinity to this connection
+        self.owner = None
+        # Number of nested checkouts by the owning thread (0 = idle)
+        self.depth = 0
+    
+    def __getattr__(self, name):
+        # Delegate everything else (execute, commit, total_changes, ...) to sqlite3
+        return getattr(self._raw, name)
+    
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._raw.__exit__(exc_type, exc_value, traceback)
+    
+    def cursor(self, *args):
+        return self._raw.cursor(*args)
+    
+    def close(self):
+        """Return the connection to the pool (the database handle stays open)."""
+        self._pool.release(self)
+
+
+class ConnectionPool:
+    """
+    Thread-affine pool of SQLite connections.
+    
+    Each worker thread is given one long-lived connection which it keeps
+    between requests. Nested checkouts on the same thread (for example a
+    helper called from inside a route) share that connection. Connections
+    are validated on checkout, PRAGMAs are applied only once when a
+    connection is opened, and connections left behind by finished threads
+    are handed to new threads instead of being reopened.
+    
+    Args:
+        database (str): Path of the SQLite database file
+        max_size (int): Maximum number of open connections
+        pragmas (dict): PRAGMA name -> value applied to every new connection
+        timeout (float): Seconds to wait for a free connection
+    """
+    
+    def __init__(self, database, max_size=DB_POOL_SIZE, pragmas=None, timeout=DB_POOL_TIMEOUT):
+        self.database = database
+        self.max_size = max_size
+        self.pragmas = dict(pragmas or {})
+        self.timeout = timeout
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._connections = []
+        # Counters reported by stats()
+        self._created = 0
+        self._reused = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._invalidated = 0
+        self._checkouts = 0
+    
+    def _connect(self):
+        """Open a new sqlite3 connection and apply the pool PRAGMAs to it."""
+        # check_same_thread=False: a connection whose thread has finished may be
+        # adopted by another thread; the pool guarantees one user at a time
+        raw = sqlite3.connect(self.database, timeout=self.timeout,
+                              check_same_thread=False, cached_statements=256)
+        raw.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            raw.execute(f"PRAGMA {name} = {value}")
+        self._created += 1
+        return PooledConnection(self, raw)
+    
+    def _is_valid(self, conn):
+        """Check that a pooled connection is still usable."""
+        try:
+            conn._raw.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def _claim(self, ident):
+        """
+        Find an idle connection for the calling thread (pool lock held).
+        
+        Prefers connections of threads that no longer exist, then any idle
+        connection, then opens a new one if the pool is not full.
+        
+        Returns:
+            PooledConnection or None if every connection is busy
+        """
+        alive = {thread.ident for thread in threading.enumerate()}
+        idle = [conn for conn in self._connections if conn.depth == 0]
+        idle.sort(key=lambda conn: conn.owner in alive)
+        if idle:
+            return idle[0]
+        if len(self._connections) < self.max_size:
+            conn = self._connect()
+            self._connections.append(conn)
+            return conn
+        return None
+    
+    def acquire(self):
+        """
+        Check out the calling thread's connection.
+        
+        Returns:
+            PooledConnection: Connection with sqlite3.Row row factory
+        
+        Raises:
+            sqlite3.OperationalError: If no connection frees up within the timeout
+        """
+        ident = threading.get_ident()
+        with self._cond:
+            self._checkouts += 1
+            created_before = self._created
+            conn = getattr(self._local, 'conn', None)
+            
+            # Nested checkout on the same thread shares the open connection
+            if conn is not None and conn.owner == ident and conn.depth > 0:
+                conn.depth += 1
+                self._reused += 1
+                return conn
+            
+            # Reuse the connection this thread kept from its previous request
+            if conn is None or conn.owner != ident:
+                conn = None
+                deadline = time.monotonic() + self.timeout
+                while conn is None:
+                    conn = self._claim(ident)
+                    if conn is not None:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError("timed out waiting for a database connection")
+                    self._waits += 1
+                    started = time.monotonic()
+                    self._cond.wait(remaining)
+                    self._wait_time += time.monotonic() - started
+            
+            # Validate reused connections before handing out; replace ones that went bad
+            if self._created == created_before:
+                self._reused += 1
+            if self._created == created_before and not self._is_valid(conn):
+                self._invalidated += 1
+                self._connections.remove(conn)
+                try:
+                    conn._raw.close()
+                except sqlite3.Error:
+                    pass
+                conn = self._connect()
+                self._connections.append(conn)
+            
+            conn.owner = ident
+            conn.depth = 1
+            self._local.conn = conn
+            return conn
+    
+    def release(self, conn):
+        """
+        Give back one checkout of a connection.
+        
+        When the outermost checkout is released, any transaction that was
+        not committed is rolled back (matching the old close() behaviour)
+        and the connection becomes idle again. Releases from a thread that
+        does not own the connection, or of a connection that is already
+        idle, are ignored: a handler that calls close() twice must not hand
+        back a connection another thread has checked out since.
+        """
+        with self._cond:
+            if conn.depth == 0 or conn.owner != threading.get_ident():
+                return
+            conn.depth -= 1
+            if conn.depth == 0:
+                if conn._raw.in_transaction:
+                    conn._raw.rollback()
+                self._cond.notify()
+    
+    def release_thread(self):
+        """Release every checkout held by the calling thread (end of request)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.owner != threading.get_ident():
+            return
+        with self._cond:
+            if conn.depth > 0:
+                conn.depth = 1
+        self.release(conn)
+    
+    def close_all(self):
+        """Close every idle connection and forget it."""
+        with self._cond:
+            for conn in [c for c in self._connections if c.depth == 0]:
+                conn._raw.close()
+                self._connections.remove(conn)
+    
+    def stats(self):
+        """
+        Return pool statistics.
+        
+        Returns:
+            dict: Pool size, connections in use, waits and reuse counters
+        """
+        with self._cond:
+            in_use = sum(1 for conn in self._connections if conn.depth > 0)
+            return {
+                'database': self.database,
+                'max_size': self.max_size,
+                'size': len(self._connections),
+                'in_use': in_use,
+                'idle': len(self._connections) - in_use,
+                'checkouts': self._checkouts,
+                'created': self._created,
+                'reused': self._reused,
+                'waits': self._waits,
+                'wait_time_ms': round(self._wait_time * 1000, 2),
+                'invalidated': self._invalidated,
+            }
+
+
+def get_storage_profile(profile=None):
+    """
+    Look up a named storage profile.
+    
+    Args:
+        profile (str): Profile name, defaults to STORAGE_PROFILE
+    
+    Returns:
+        dict: PRAGMA name -> value
+    
+    Raises:
+        ValueError: If the profile name is unknown
+    """
+    profile = profile or STORAGE_PROFILE
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{profile}' (choose from {', '.join(STORAGE_PROFILES)})")
+    return STORAGE_PROFILES[profile]
+
+
+def connection_pragmas(profile=None):
+    """Return the per-connection PRAGMAs of a storage profile (everything but journal_mode)."""
+    return {name: value for name, value in get_storage_profile(profile).items() if name != 'journal_mode'}
+
+
+def apply_storage_profile(db_name=None, profile=None):
+    """
+    Configure the database file for a storage profile and verify it.
+    
+    Sets the persistent journal mode, then reads every PRAGMA of the
+    profile back from a pooled connection and compares it with the
+    requested value.
+    
+    Args:
+        db_name (str): Database file, defaults to DATABASE
+        profile (str): Profile name, defaults to STORAGE_PROFILE
+    
+    Returns:
+        list: Human-readable mismatches (empty when the profile is fully active)
+    """
+    settings = get_storage_profile(profile)
+    
+    # journal_mode is a property of the database file, so set it once here
+    raw = sqlite3.connect(db_name or DATABASE, timeout=DB_POOL_TIMEOUT)
+    try:
+        raw.execute(f"PRAGMA journal_mode = {settings['journal_mode']}").fetchone()
+    finally:
+        raw.close()
+    
+    mismatches = []
+    conn = get_db_connection(db_name)
+    try:
+        for name, wanted in settings.items():
+            actual = conn.execute(f"PRAGMA {name}").fetchone()[0]
+            normalize = PRAGMA_READBACK.get(name, lambda value: value)
+            if normalize(actual) != normalize(wanted):
+                mismatches.append(f"{name}: wanted {wanted}, got {actual}")
+    finally:
+        conn.close()
+    return mismatches
+
+
+# One pool per database file, created on first use
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name=None):
+    """
+    Return the connection pool for a database file, creating it if needed.
+    
+    Args:
+        db_name (str): Database file, defaults to DATABASE
+    
+    Returns:
+        ConnectionPool: Pool serving that database
+    """
+    db_name = db_name or DATABASE
+    with _pools_lock:
+        pool = _pools.get(db_name)
+        if pool is None:
+            pool = ConnectionPool(db_name, pragmas=connection_pragmas())
+            _pools[db_name] = pool
+        return pool
+
+
+# Release pooled connections when the Flask app context ends (end of every request)
+@app.teardown_appcontext
+def release_db_connections(exception):
+    """
+    Hand the request thread's pooled connections back to their pools.
+    
+    Routes still call conn.close(), but this also covers early returns
+    and exceptions that skip it.
+    """
+    for pool in list(_pools.values()):
+        pool.release_thread()
+
 
 # Context manager for database connections
-from contextlib import contextmanager
+@contextmanager
+def get_db():
+    """
+    Context manager for safe database connection handling.
+    Ensures connection is always released, even if an error occurs.
+    
+    Usage:
+        with get_db() as cursor:
+            cursor.execute(...)
+    
+    Yields:
+        sqlite3.Cursor: Database cursor object
+    """
+    conn = get_db_connection()
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+# Function to establish database connection (kept for backward compatibility)
+def get_db_connection(db_name=None):
+    """
+    Check out a pooled connection to the SQLite database.
+    
+    The connection is long-lived and shared by the calling thread; calling
+    close() on it returns it to the pool.
+    
+    Args:
+        db_name (str): Name of the database file, defaults to DATABASE
+    
+    Returns:
+        PooledConnection: Database connection object with Row factory
+    """
+    return get_pool(db_name).acquire()
+
+
+# Function to hash passwords for secure storage
+def hash_password(password):
+    """
+    Hash a password using SHA256 algorithm.
+    
+    Args:
+        password (str): Plain text password to hash
+    
+    Returns:
+        str: Hashed password (hexadecimal string)
+    """
+    # Use SHA256 to hash the password for security
+    # This ensures passwords are not stored in plain text
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+# Tables that must never be fully scanned by a query with a WHERE clause
+HOT_TABLES = {'notifications', 'msqs', 'topics', 'submissions', 'attendance', 'grades', 'comments', 'enrollments',
+              'course_events', 'jobs', 'comment_deletions', 'attendance_student_summary', 'attendance_lesson_summary',
+              'student_stats', 'lesson_views', 'teacher_summaries'}
+
+
+# Words that can follow a table name without being its alias
+SQL_KEYWORDS = {'WHERE', 'LEFT', 'INNER', 'JOIN', 'ON', 'ORDER', 'GROUP', 'LIMIT', 'SET', 'AS', 'USING', 'CROSS'}
+
+
+def find_app_queries(source_path=__file__):
+    """
+    Collect the literal SQL statements passed to execute() in a source file.
+    
+    Args:
+        source_path (str): Python file to read, defaults to this module
+    
+    Returns:
+        list: (line number, SQL text) tuples for SELECT/UPDATE/DELETE/INSERT statements,
+              excluding those inside migration_* functions
+    """
+    import ast
+    
+    with open(source_path, encoding='utf-8') as source:
+        tree = ast.parse(source.read())
+    
+    # Schema migrations run once under the migration lock; their data fix-ups may scan
+    migration_lines = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name.startswith('migration_'):
+            migration_lines.update(range(node.lineno, node.end_lineno + 1))
+    
+    queries = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+            continue
+        if node.lineno in migration_lines:
+            continue
+        if node.func.attr not in ('execute', 'executemany') or not node.args:
+            continue
+        arg = node.args[0]
+        if not (isinstance(arg, ast.Constant) and isinstance(arg.value, str)):
+            continue
+        sql = ' '.join(arg.value.split())
+        if sql.split(' ', 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'):
+            queries.append((node.lineno, sql))
+    return sorted(queries)
+
+
+def explain_queries(queries, db_name=None):
+    """
+    Run EXPLAIN QUERY PLAN over SQL statements and find full table scans.
+    
+    A statement fails when it has a WHERE clause and its plan scans one of
+    HOT_TABLES without an index.
+    
+    Args:
+        queries (list): (line number, SQL text) tuples
+        db_name (str): Database to plan against, defaults to DATABASE
+    
+    Returns:
+        list: (line number, SQL text, plan details, failing scans) tuples
+    """
+    results = []
+    conn = get_db_connection(db_name)
+    try:
+        for lineno, sql in queries:
+            # Plan with NULL for every parameter; only the shape of the query matters
+            params = [None] * sql.count('?')
+            try:
+                plan = [row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            except sqlite3.Error as e:
+                results.append((lineno, sql, [f"error: {e}"], [f"error: {e}"]))
+                continue
+            
+            # Plans name tables by their alias, so map aliases back to tables
+            aliases = {}
+            for table, alias in re.findall(r"(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.IGNORECASE):
+                aliases[table] = table
+                if alias and alias.upper() not in SQL_KEYWORDS:
+                    aliases[alias] = table
+            
+            scans = []
+            if ' WHERE ' in f" {sql.upper()} ":
+                for detail in plan:
+                    match = re.match(r"SCAN (\w+)", detail)
+                    if match and 'USING' not in detail and aliases.get(match.group(1)) in HOT_TABLES:
+                        scans.append(detail)
+            results.append((lineno, sql, plan, scans))
+    finally:
+        conn.close()
+    return results
+
+
+# Flask CLI command: flask --app app check-indexes
+@app.cli.command('check-indexes')
+def check_indexes_command():
+    """Fail if any SQL statement in app.py still scans a hot table."""
+    import sys
+    
+    failures = 0
+    for lineno, sql, plan, scans in explain_queries(find_app_queries()):
+        status = 'SCAN' if scans else 'ok'
+        print(f"[{status:>4}] app.py:{lineno}: {sql[:100]}")
+        for detail in plan:
+            print(f"         {detail}")
+        failures += bool(scans)
+    
+    print(f"\n{failures} statement(s) with full scans of hot tables")
+    if failures:
+        sys.exit(1)
+
+
+# Schema migration 1: create the application tables
+def migration_001_create_tables(cursor):
+    """
+    Create the application tables if they don't exist.
+    
+    Creates tables for:
+    - users: Store user account information
+    - courses: Store course information
+    - topics: Store lesson topics within courses
+    - msqs: Store multiple choice questions for assignments
+    - enrollments, submissions, attendance, notifications, grades,
+      assignments and comments
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    # Create users table for storing user account information
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            -- Unique identifier for each user (auto-incrementing primary key)
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- Username must be unique (no two users can have same username)
+            username TEXT NOT NULL UNIQUE,
+            -- Email must be unique (no two users can have same email)
+            email TEXT NOT NULL UNIQUE,
+            -- Password stored as hashed string (never plain text)
+            password TEXT NOT NULL,
+            -- Full name of the user
+            full_name TEXT NOT NULL,
+            -- User role: either 'student' or 'teacher'
+            role TEXT NOT NULL DEFAULT 'student',
+            -- Timestamp when account was created (automatic)
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Timestamp of last login
+            last_login TIMESTAMP
+        )
+    """)
+
+    # Create courses table for storing course information
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS courses (
+            -- Unique identifier for each course
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- Unique course ID number
+            course_id INTEGER,
+            -- Course title (must be unique)
+            title TEXT NOT NULL UNIQUE,
+            -- Description of what the course covers
+            description TEXT,
+            -- Type of course (Self-Paced, Instructor-Led, Hybrid, Workshop)
+            course_type TEXT DEFAULT 'Self-Paced',
+            -- Duration of the course (e.g., "4 weeks", "20 hours")
+            duration TEXT DEFAULT 'Flexible',
+            -- Difficulty level (Beginner, Intermediate, Advanced, Expert)
+            level TEXT DEFAULT 'Beginner',
+            -- ID of the teacher who created this course
+            teacher_id INTEGER,
+            -- Timestamp when course was created
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Foreign key linking to the teacher user
+            FOREIGN KEY (teacher_id) REFERENCES users(id)
+        )
+    """)
+
+    # Create topics table for storing lesson topics within courses
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS topics (
+            -- Unique identifier for each topic
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the course this topic belongs to
+            course_id INTEGER NOT NULL,
+            -- Topic title (must be unique)
+            title TEXT UNIQUE,
+            -- Optional subtitle or description
+            subtitle TEXT,
+            -- Lesson content (body text for the lesson)
+            content TEXT,
+            -- Timestamp when topic was created
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Foreign key linking to courses table
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    """)
+
+    # Create msqs table for storing multiple choice questions
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS msqs (
+            -- Unique identifier for each question
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the topic this question belongs to
+            topic_id INTEGER NOT NULL,
+            -- The question text
+            question TEXT NOT NULL,
+            -- Option A text
+            option_a TEXT NOT NULL,
+            -- Option B text
+            option_b TEXT NOT NULL,
+            -- Option C text
+            option_c TEXT NOT NULL,
+            -- Option D text
+            option_d TEXT NOT NULL,
+            -- Correct answer: 'a', 'b', 'c', or 'd'
+            correct_answer TEXT NOT NULL,
+            -- Timestamp when question was created
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Foreign key linking to topics table
+            FOREIGN KEY (topic_id) REFERENCES topics(id)
+        )
+    """)
+
+    # Create enrollments table to track which students are enrolled in which courses
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS enrollments (
+            -- Unique identifier for each enrollment
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the student
+            student_id INTEGER NOT NULL,
+            -- ID of the course
+            course_id INTEGER NOT NULL,
+            -- Timestamp when student enrolled
+            enrolled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Student's progress percentage (0-100)
+            progress INTEGER DEFAULT 0,
+            -- Foreign keys
+            FOREIGN KEY (student_id) REFERENCES users(id),
+            FOREIGN KEY (course_id) REFERENCES courses(id),
+            -- Unique constraint: each student can only enroll once per course
+            UNIQUE(student_id, course_id)
+        )
+    """)
+
+    # Create submissions table to track student assignment submissions
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS submissions (
+            -- Unique identifier for each submission
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the student submitting
+            student_id INTEGER NOT NULL,
+            -- ID of the question being answered
+            question_id INTEGER NOT NULL,
+            -- Student's selected answer: 'a', 'b', 'c', or 'd'
+            selected_answer TEXT NOT NULL,
+            -- Whether the answer is correct (1 for correct, 0 for incorrect)
+            is_correct INTEGER DEFAULT 0,
+            -- Timestamp when answer was submitted
+            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Foreign keys
+            FOREIGN KEY (student_id) REFERENCES users(id),
+            FOREIGN KEY (question_id) REFERENCES msqs(id)
+        )
+    """)
+
+    # Create attendance table to track student attendance in lessons
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance (
+            -- Unique identifier for each attendance record
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the student
+            student_id INTEGER NOT NULL,
+            -- ID of the lesson/topic
+            lesson_id INTEGER NOT NULL,
+            -- ID of the course
+            course_id INTEGER NOT NULL,
+            -- Attendance status: 'present', 'absent', 'late'
+            status TEXT DEFAULT 'absent',
+            -- Date of the lesson
+            lesson_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Timestamp when attendance was recorded
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Foreign keys
+            FOREIGN KEY (student_id) REFERENCES users(id),
+            FOREIGN KEY (lesson_id) REFERENCES topics(id),
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    """)
+
+    # Create notifications table to notify students of new lessons and assignments
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notifications (
+            -- Unique identifier for each notification
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the student receiving the notification
+            student_id INTEGER NOT NULL,
+            -- ID of the course
+            course_id INTEGER NOT NULL,
+            -- Type of notification: 'lesson', 'assignment'
+            notification_type TEXT NOT NULL,
+            -- Title of the notification
+            title TEXT NOT NULL,
+            -- Message content
+            message TEXT,
+            -- Link to the resource (lesson_id or assignment_id)
+            resource_id INTEGER,
+            -- Whether the notification has been read
+            is_read INTEGER DEFAULT 0,
+            -- Timestamp when notification was created
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Foreign keys
+            FOREIGN KEY (student_id) REFERENCES users(id),
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    """)
+
+    # Create grades table to store assignment grades and teacher feedback
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS grades (
+            -- Unique identifier for each grade record
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the student being graded
+            student_id INTEGER NOT NULL,
+            -- ID of the assignment being graded
+            assignment_id INTEGER NOT NULL,
+            -- ID of the teacher giving the grade
+            teacher_id INTEGER NOT NULL,
+            -- Numeric grade (0-100)
+            grade REAL,
+            -- Feedback comments from the teacher
+            feedback TEXT,
+            -- Timestamp when grade was given
+            graded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Timestamp when last updated
+            updated_at TIMESTAMP,
+            -- Foreign keys
+            FOREIGN KEY (student_id) REFERENCES users(id),
+            FOREIGN KEY (assignment_id) REFERENCES assignments(id),
+            FOREIGN KEY (teacher_id) REFERENCES users(id)
+        )
+    """)
+
+    # Create assignments table for course assignments
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS assignments (
+            -- Unique identifier for each assignment
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the course this assignment belongs to
+            course_id INTEGER NOT NULL,
+            -- Title of the assignment
+            title TEXT NOT NULL UNIQUE,
+            -- Description of the assignment
+            description TEXT,
+            -- Deadline for the assignment
+            deadline TEXT,
+            -- Foreign key linking to courses table
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    """)
+
+    # Create comments table for course discussions and student interactions
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS comments (
+            -- Unique identifier for each comment
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the user posting the comment
+            user_id INTEGER NOT NULL,
+            -- ID of the course the comment is about
+            course_id INTEGER NOT NULL,
+            -- Content of the comment/message
+            message TEXT NOT NULL,
+            -- Timestamp when comment was created
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Foreign keys
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    """)
+
+
+# Schema migration 2: add columns missing from `courses` tables created by older versions
+def migration_002_courses_columns(cursor):
+    """
+    Add the columns introduced after the first `courses` schema.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("PRAGMA table_info(courses)")
+    existing_cols = [row['name'] for row in cursor.fetchall()]
+    
+    columns_to_add = {
+        'course_id': "INTEGER",
+        'course_type': "TEXT DEFAULT 'Self-Paced'",
+        'duration': "TEXT DEFAULT 'Flexible'",
+        'level': "TEXT DEFAULT 'Beginner'",
+        'teacher_id': "INTEGER",
+        # ALTER TABLE cannot add a column with a non-constant default
+        'created_at': "TIMESTAMP"
+    }
+    
+    for col, definition in columns_to_add.items():
+        if col not in existing_cols:
+            cursor.execute(f"ALTER TABLE courses ADD COLUMN {col} {definition}")
+
+
+# Schema migration 3: add the lesson body column to older `topics` tables
+def migration_003_topics_content(cursor):
+    """
+    Add `topics.content` if the table predates it.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("PRAGMA table_info(topics)")
+    existing_cols = [row['name'] for row in cursor.fetchall()]
+    if 'content' not in existing_cols:
+        cursor.execute("ALTER TABLE topics ADD COLUMN content TEXT")
+
+
+# Schema migration 4: secondary indexes for the hot foreign-key lookups
+def migration_004_secondary_indexes(cursor):
+    """
+    Create the secondary indexes for the foreign-key lookups the routes
+    run on every request. Later migrations replace some of them; this
+    list stays as it was when migration 4 was first applied.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    # Each entry: (index name, table, indexed columns)
+    indexes = [
+        # Student notification list and unread count
+        ('idx_notifications_student', 'notifications', 'student_id, created_at'),
+        # Teacher view of notifications sent from their courses
+        ('idx_notifications_course', 'notifications', 'course_id'),
+        # Questions of a lesson
+        ('idx_msqs_topic', 'msqs', 'topic_id'),
+        # Lessons of a course, in creation order
+        ('idx_topics_course', 'topics', 'course_id, created_at'),
+        # A student's submission history
+        ('idx_submissions_student', 'submissions', 'student_id, submitted_at'),
+        # Submissions of a question (cascading deletes)
+        ('idx_submissions_question', 'submissions', 'question_id'),
+        # Attendance report of a course (replaced by a (course_id, student_id, lesson_id) index in migration 10)
+        ('idx_attendance_course', 'attendance', 'course_id'),
+        # Attendance of a lesson (replaced by a unique per-day index in migration 9)
+        ('idx_attendance_lesson', 'attendance', 'lesson_id, student_id'),
+        # A student's grade for an assignment (replaced by a unique index in migration 8)
+        ('idx_grades_student_assignment', 'grades', 'student_id, assignment_id'),
+        # All grades of an assignment
+        ('idx_grades_assignment', 'grades', 'assignment_id'),
+        # Course discussion, newest first
+        ('idx_comments_course', 'comments', 'course_id, created_at'),
+        # Students enrolled in a course (UNIQUE(student_id, course_id) covers the other direction)
+        ('idx_enrollments_course', 'enrollments', 'course_id'),
+        # Courses taught by a teacher
+        ('idx_courses_teacher', 'courses', 'teacher_id, created_at'),
+        # Assignments of a course
+        ('idx_assignments_course', 'assignments', 'course_id'),
+    ]
+    for name, table, columns in indexes:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+# Schema migration 5: persistent background job queue
+def migration_005_jobs(cursor):
+    """
+    Create the `jobs` table used by the background job queue.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            -- Unique identifier for each job
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- Name of the registered handler that runs the job
+            job_type TEXT NOT NULL,
+            -- JSON arguments for the handler
+            payload TEXT NOT NULL DEFAULT '{}',
+            -- Job status: 'queued', 'running', 'done', 'failed'
+            status TEXT NOT NULL DEFAULT 'queued',
+            -- Number of times the job has been started
+            attempts INTEGER NOT NULL DEFAULT 0,
+            -- Give up after this many attempts
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            -- Error message of the last failed attempt
+            last_error TEXT,
+            -- JSON result reported by the handler
+            result TEXT,
+            -- Course the job belongs to (for the teacher's job list)
+            course_id INTEGER,
+            -- ID of the user who queued the job
+            created_by INTEGER,
+            -- The job is not started before this time (retry backoff)
+            run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Timestamp when the job was queued
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Timestamp when the last attempt started
+            started_at TIMESTAMP,
+            -- Timestamp when the job finished or failed for good
+            finished_at TIMESTAMP,
+            -- Foreign keys
+            FOREIGN KEY (course_id) REFERENCES courses(id),
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    """)
+    # Workers pick the oldest runnable job; teachers list their own jobs
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, run_after)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_by ON jobs (created_by, id)")
+
+
+# Schema migration 6: course-level notification events and per-student read cursors
+def migration_006_course_events(cursor):
+    """
+    Create the tables used by the 'events' notification mode.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS course_events (
+            -- Unique identifier for each event (also orders events for the read cursors)
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the course the event was posted to
+            course_id INTEGER NOT NULL,
+            -- Type of event: 'lesson', 'assignment'
+            event_type TEXT NOT NULL,
+            -- Title shown in the notification list
+            title TEXT NOT NULL,
+            -- Message content
+            message TEXT,
+            -- Link to the resource (lesson_id or assignment_id)
+            resource_id INTEGER,
+            -- Timestamp when the event was posted
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- Foreign key linking to courses table
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_course_events_course ON course_events (course_id, id)")
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notification_cursors (
+            -- ID of the student
+            student_id INTEGER NOT NULL,
+            -- ID of the course
+            course_id INTEGER NOT NULL,
+            -- Highest course_events.id the student has seen in this course
+            last_seen_event_id INTEGER NOT NULL DEFAULT 0,
+            -- Foreign keys
+            FOREIGN KEY (student_id) REFERENCES users(id),
+            FOREIGN KEY (course_id) REFERENCES courses(id),
+            -- One cursor per student and course
+            PRIMARY KEY (student_id, course_id)
+        )
+    """)
+
+
+# Schema migration 7: comment deletion log for incremental comment polling
+def migration_007_comment_deletions(cursor):
+    """
+    Create `comment_deletions` and index comments by (course_id, id).
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS comment_deletions (
+            -- Unique identifier for each deletion (the polling cursor)
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            -- ID of the deleted comment
+            comment_id INTEGER NOT NULL,
+            -- ID of the course the comment belonged to
+            course_id INTEGER NOT NULL,
+            -- Timestamp when the comment was deleted
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comment_deletions_course ON comment_deletions (course_id, id)")
+    # Newest comment ID per course (discussion version) and "comments after ID" deltas
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_course_id ON comments (course_id, id)")
+
+
+# Schema migration 8: one grade per (student, assignment) so grades can be upserted
+def migration_008_unique_grades(cursor):
+    """
+    Remove duplicate grades and make (student_id, assignment_id) unique.
+    
+    When a pair was graded more than once, the newest row is kept.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        DELETE FROM grades
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM grades GROUP BY student_id, assignment_id
+        )
+    """)
+    # The unique index replaces the plain one created by earlier versions of migration 4
+    cursor.execute("DROP INDEX IF EXISTS idx_grades_student_assignment")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_grades_student_assignment
+        ON grades (student_id, assignment_id)
+    """)
+
+
+# Schema migration 9: one attendance row per student, lesson and day
+def migration_009_attendance_session_date(cursor):
+    """
+    Add `attendance.session_date` and make (student_id, lesson_id, session_date) unique.
+    
+    session_date is backfilled from lesson_date. When a student has several
+    rows for the same lesson and day, the newest one is kept.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("PRAGMA table_info(attendance)")
+    existing_cols = [row['name'] for row in cursor.fetchall()]
+    if 'session_date' not in existing_cols:
+        # ALTER TABLE cannot add a column with a non-constant default; writers always set it
+        cursor.execute("ALTER TABLE attendance ADD COLUMN session_date TEXT")
+    cursor.execute("UPDATE attendance SET session_date = DATE(lesson_date) WHERE session_date IS NULL")
+    cursor.execute("""
+        DELETE FROM attendance
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM attendance GROUP BY student_id, lesson_id, session_date
+        )
+    """)
+    # Lesson first so the index also serves "attendance of this lesson today"
+    cursor.execute("DROP INDEX IF EXISTS idx_attendance_lesson")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_lesson_day
+        ON attendance (lesson_id, session_date, student_id)
+    """)
+
+
+# Schema migration 10: rolling attendance counts per student and per lesson
+def migration_010_attendance_summary(cursor):
+    """
+    Create the attendance summary tables and fill them from `attendance`.
+    
+    upsert_attendance() keeps them up to date on every save.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_student_summary (
+            -- ID of the course
+            course_id INTEGER NOT NULL,
+            -- ID of the student
+            student_id INTEGER NOT NULL,
+            -- Sessions the student was present, late and absent
+            present INTEGER NOT NULL DEFAULT 0,
+            late INTEGER NOT NULL DEFAULT 0,
+            absent INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, student_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_lesson_summary (
+            -- ID of the lesson
+            lesson_id INTEGER PRIMARY KEY,
+            -- ID of the lesson's course
+            course_id INTEGER NOT NULL,
+            -- Student sessions of the lesson marked present, late and absent
+            present INTEGER NOT NULL DEFAULT 0,
+            late INTEGER NOT NULL DEFAULT 0,
+            absent INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        INSERT OR REPLACE INTO attendance_student_summary (course_id, student_id, present, late, absent)
+        SELECT course_id, student_id,
+               SUM(status = 'present'), SUM(status = 'late'), SUM(status = 'absent')
+        FROM attendance
+        GROUP BY course_id, student_id
+    """)
+    cursor.execute("""
+        INSERT OR REPLACE INTO attendance_lesson_summary (lesson_id, course_id, present, late, absent)
+        SELECT lesson_id, MAX(course_id),
+               SUM(status = 'present'), SUM(status = 'late'), SUM(status = 'absent')
+        FROM attendance
+        GROUP BY lesson_id
+    """)
+    # A page of students' attendance in a course (replaces the course_id-only index)
+    cursor.execute("DROP INDEX IF EXISTS idx_attendance_course")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_attendance_course_student
+        ON attendance (course_id, student_id, lesson_id)
+    """)
+
+
+# Schema migration 11: attendance by course and day, for date-range reports
+def migration_011_attendance_date_index(cursor):
+    """
+    Index attendance by (course_id, session_date).
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_attendance_course_date
+        ON attendance (course_id, session_date)
+    """)
+
+
+# Schema migration 12: per-student statistics read model
+def migration_012_student_stats(cursor):
+    """
+    Create `student_stats` and fill it from submissions and grades.
+    
+    One row per (student, course) plus a course_id = 0 row with the
+    student's totals over all courses. Writers keep it up to date through
+    update_student_stats().
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS student_stats (
+            -- ID of the student
+            student_id INTEGER NOT NULL,
+            -- ID of the course, or 0 for the student's totals
+            course_id INTEGER NOT NULL,
+            -- Question answers submitted and answered correctly
+            submissions INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            -- Graded assignments and the sum of their grades
+            graded INTEGER NOT NULL DEFAULT 0,
+            grade_total REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (student_id, course_id)
+        )
+    """)
+    cursor.execute("DELETE FROM student_stats")
+    # Submissions per course (questions of lessons that still exist), then the totals
+    cursor.execute("""
+        INSERT INTO student_stats (student_id, course_id, submissions, correct)
+        SELECT s.student_id, t.course_id, COUNT(*), SUM(s.is_correct)
+        FROM submissions s
+        JOIN msqs m ON m.id = s.question_id
+        JOIN topics t ON t.id = m.topic_id
+        GROUP BY s.student_id, t.course_id
+    """)
+    cursor.execute("""
+        INSERT INTO student_stats (student_id, course_id, submissions, correct)
+        SELECT student_id, 0, COUNT(*), SUM(is_correct)
+        FROM submissions
+        GROUP BY student_id
+    """)
+    # Grades per course, then the totals
+    for course_column, group_by in (('a.course_id', 'g.student_id, a.course_id'), ('0', 'g.student_id')):
+        cursor.execute(f"""
+            INSERT INTO student_stats (student_id, course_id, graded, grade_total)
+            SELECT g.student_id, {course_column}, COUNT(*), TOTAL(g.grade)
+            FROM grades g
+            JOIN assignments a ON a.id = g.assignment_id
+            WHERE g.grade IS NOT NULL
+            GROUP BY {group_by}
+            ON CONFLICT (student_id, course_id) DO UPDATE SET
+                graded = excluded.graded,
+                grade_total = excluded.grade_total
+        """)
+
+
+# Schema migration 13: counters behind enrollments.progress
+def migration_013_course_progress(cursor):
+    """
+    Track lesson views and completed questions per enrollment.
+    
+    Adds `lesson_views` and the enrollment counters the progress engine
+    reads, fills the counters from existing submissions and computes
+    every enrollment's progress once. The backfill is self-contained SQL
+    so later changes to refresh_course_progress() or the weights do not
+    change what this migration does.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lesson_views (
+            -- ID of the student
+            student_id INTEGER NOT NULL,
+            -- ID of the lesson viewed
+            lesson_id INTEGER NOT NULL,
+            -- ID of the lesson's course
+            course_id INTEGER NOT NULL,
+            -- Timestamp of the first view
+            viewed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (student_id, lesson_id)
+        )
+    """)
+    # Views of a lesson (deleting a lesson)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_lesson_views_lesson
+        ON lesson_views (lesson_id)
+    """)
+    
+    cursor.execute("PRAGMA table_info(enrollments)")
+    existing_cols = [row['name'] for row in cursor.fetchall()]
+    for col in ('lessons_viewed', 'questions_completed'):
+        if col not in existing_cols:
+            cursor.execute(f"ALTER TABLE enrollments ADD COLUMN {col} INTEGER NOT NULL DEFAULT 0")
+    
+    # Lessons opened, and questions of the course answered correctly at least once
+    cursor.execute("""
+        UPDATE enrollments SET
+            lessons_viewed = (
+                SELECT COUNT(*) FROM lesson_views v
+                WHERE v.student_id = enrollments.student_id AND v.course_id = enrollments.course_id
+            ),
+            questions_completed = (
+                SELECT COUNT(DISTINCT s.question_id)
+                FROM submissions s
+                JOIN msqs m ON m.id = s.question_id
+                JOIN topics t ON t.id = m.topic_id
+                WHERE s.student_id = enrollments.student_id
+                  AND t.course_id = enrollments.course_id
+                  AND s.is_correct = 1
+            )
+    """)
+    
+    # Progress with the weights of the time (lessons 40, questions 40, attendance 20);
+    # components a course does not have are left out and the others weighted up
+    cursor.execute("""
+        WITH totals AS (
+            SELECT e.student_id, e.course_id, e.lessons_viewed, e.questions_completed,
+                   (SELECT COUNT(*) FROM topics t WHERE t.course_id = e.course_id) AS lessons,
+                   (SELECT COUNT(*) FROM topics t JOIN msqs m ON m.topic_id = t.id
+                    WHERE t.course_id = e.course_id) AS questions,
+                   IFNULL(s.present, 0) + IFNULL(s.late, 0) AS attended,
+                   IFNULL(s.present, 0) + IFNULL(s.late, 0) + IFNULL(s.absent, 0) AS sessions
+            FROM enrollments e
+            LEFT JOIN attendance_student_summary s
+                   ON s.course_id = e.course_id AND s.student_id = e.student_id
+        )
+        UPDATE enrollments SET progress = IFNULL(CAST(ROUND(100.0 * (
+                CASE WHEN totals.lessons > 0
+                     THEN 40 * MIN(totals.lessons_viewed * 1.0 / totals.lessons, 1) ELSE 0 END
+              + CASE WHEN totals.questions > 0
+                     THEN 40 * MIN(totals.questions_completed * 1.0 / totals.questions, 1) ELSE 0 END
+              + CASE WHEN totals.sessions > 0
+                     THEN 20 * totals.attended * 1.0 / totals.sessions ELSE 0 END
+            ) / NULLIF((totals.lessons > 0) * 40 + (totals.questions > 0) * 40 + (totals.sessions > 0) * 20, 0))
+            AS INTEGER), 0)
+        FROM totals
+        WHERE totals.student_id = enrollments.student_id AND totals.course_id = enrollments.course_id
+    """)
+
+
+# Schema migration 14: teacher dashboard summaries shared between processes
+def migration_014_teacher_summaries(cursor):
+    """
+    Create `teacher_summaries`, the shared backing table of the teacher
+    dashboard cache (used when LMS_TEACHER_SUMMARY_CACHE=shared).
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS teacher_summaries (
+            -- ID of the teacher
+            teacher_id INTEGER PRIMARY KEY,
+            -- Bumped on every change to the teacher's courses, questions or enrollments
+            version INTEGER NOT NULL DEFAULT 0,
+            -- Cached dashboard summary (JSON), NULL until recomputed
+            summary TEXT,
+            -- Timestamp when the summary was computed
+            updated_at TIMESTAMP
+        )
+    """)
+
+
+# Tables whose row counts are kept in `site_counters` (home page statistics)
+SITE_COUNTER_TABLES = ('courses', 'topics', 'users')
+
+
+# Schema migration 15: row counters maintained by triggers
+def migration_015_site_counters(cursor):
+    """
+    Create `site_counters` with one row per table in SITE_COUNTER_TABLES,
+    seeded with COUNT(*) and kept current by insert/delete triggers, so
+    every write path (routes, importers, the sqlite3 shell) is covered.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS site_counters (
+            -- Name of the counted table
+            name TEXT PRIMARY KEY,
+            -- Number of rows in it
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for table in SITE_COUNTER_TABLES:
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO site_counters (name, value)
+            SELECT '{table}', COUNT(*) FROM {table}
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS site_counters_{table}_insert AFTER INSERT ON {table}
+            BEGIN
+                UPDATE site_counters SET value = value + 1 WHERE name = '{table}';
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS site_counters_{table}_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE site_counters SET value = value - 1 WHERE name = '{table}';
+            END
+        """)
+
+
+# Documents in `search_index`: rowid = source ID * 4 + kind code, so a trigger finds a document by rowid
+SEARCH_KINDS = {1: 'course', 2: 'lesson', 3: 'question'}
+
+# What each kind indexes: (kind code, source table, SQL for the title, body and parent ID)
+# where {row} is replaced by the row prefix ('' when rebuilding, 'new.' in triggers)
+SEARCH_SOURCES = [
+    (1, 'courses', "{row}title, COALESCE({row}description, ''), NULL"),
+    (2, 'topics', "{row}title, COALESCE({row}subtitle, '') || ' ' || COALESCE({row}content, ''), {row}course_id"),
+    (3, 'msqs', "{row}question, '', {row}topic_id"),
+]
+
+
+def rebuild_search_index(cursor):
+    """
+    Refill `search_index` from courses, lessons and questions, then merge
+    its b-trees (FTS5 'optimize').
+    
+    Args:
+        cursor: Database cursor (caller commits)
+    
+    Returns:
+        int: Number of documents indexed
+    """
+    cursor.execute("DELETE FROM search_index")
+    indexed = 0
+    for code, table, columns in SEARCH_SOURCES:
+        cursor.execute(f"""
+            INSERT INTO search_index (rowid, title, body, parent_id)
+            SELECT id * 4 + {code}, {columns.format(row='')} FROM {table}
+        """)
+        indexed += cursor.rowcount
+    cursor.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    return indexed
+
+
+# Schema migration 16: full-text search over courses, lessons and questions
+def migration_016_search_index(cursor):
+    """
+    Create the FTS5 table `search_index`, the triggers that keep it in
+    sync with courses, topics and msqs, and index the existing rows.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            title,
+            body,
+            -- Course of a lesson, lesson of a question (not searchable)
+            parent_id UNINDEXED,
+            tokenize = 'porter unicode61'
+        )
+    """)
+    for code, table, columns in SEARCH_SOURCES:
+        values = columns.format(row='new.')
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS search_index_{table}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO search_index (rowid, title, body, parent_id) VALUES (new.id * 4 + {code}, {values});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS search_index_{table}_update AFTER UPDATE ON {table}
+            BEGIN
+                DELETE FROM search_index WHERE rowid = old.id * 4 + {code};
+                INSERT INTO search_index (rowid, title, body, parent_id) VALUES (new.id * 4 + {code}, {values});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS search_index_{table}_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM search_index WHERE rowid = old.id * 4 + {code};
+            END
+        """)
+    rebuild_search_index(cursor)
+
+
+# Schema migration 17: lesson and assignment listings
+def migration_017_listing_indexes(cursor):
+    """
+    Count questions in `site_counters` and index a course's lessons by ID,
+    for the paginated /lessons and /assignments pages.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        INSERT OR REPLACE INTO site_counters (name, value)
+        SELECT 'msqs', COUNT(*) FROM msqs
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS site_counters_msqs_insert AFTER INSERT ON msqs
+        BEGIN
+            UPDATE site_counters SET value = value + 1 WHERE name = 'msqs';
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS site_counters_msqs_delete AFTER DELETE ON msqs
+        BEGIN
+            UPDATE site_counters SET value = value - 1 WHERE name = 'msqs';
+        END
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_topics_course_id
+        ON topics (course_id, id)
+    """)
+
+
+# Schema migration 18: lesson versions for the lesson page cache
+def migration_018_lesson_versions(cursor):
+    """
+    Add `topics.version` and `topics.updated_at`, bumped by triggers
+    whenever what the lesson page shows changes: the lesson itself, its
+    questions or its course title.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("PRAGMA table_info(topics)")
+    existing_cols = [row['name'] for row in cursor.fetchall()]
+    if 'version' not in existing_cols:
+        cursor.execute("ALTER TABLE topics ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    if 'updated_at' not in existing_cols:
+        # ALTER TABLE cannot add a column with a non-constant default
+        cursor.execute("ALTER TABLE topics ADD COLUMN updated_at TIMESTAMP")
+    cursor.execute("UPDATE topics SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL")
+    
+    bump = "UPDATE topics SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE"
+    triggers = {
+        'lesson_version_topics_insert': "AFTER INSERT ON topics WHEN new.updated_at IS NULL "
+                                        "BEGIN UPDATE topics SET updated_at = CURRENT_TIMESTAMP WHERE id = new.id; END",
+        'lesson_version_topics_update': f"AFTER UPDATE OF title, subtitle, content, course_id ON topics "
+                                        f"BEGIN {bump} id = new.id; END",
+        'lesson_version_msqs_insert': f"AFTER INSERT ON msqs BEGIN {bump} id = new.topic_id; END",
+        'lesson_version_msqs_update': f"AFTER UPDATE ON msqs BEGIN {bump} id IN (old.topic_id, new.topic_id); END",
+        'lesson_version_msqs_delete': f"AFTER DELETE ON msqs BEGIN {bump} id = old.topic_id; END",
+        'lesson_version_courses_update': f"AFTER UPDATE OF title ON courses BEGIN {bump} course_id = new.id; END",
+    }
+    for name, definition in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {definition}")
+    
+    # Version bumps must not rewrite the lesson's search document
+    cursor.execute("DROP TRIGGER IF EXISTS search_index_topics_update")
+    for code, table, columns in SEARCH_SOURCES:
+        if table == 'topics':
+            cursor.execute(f"""
+                CREATE TRIGGER search_index_topics_update AFTER UPDATE OF title, subtitle, content, course_id ON topics
+                BEGIN
+                    DELETE FROM search_index WHERE rowid = old.id * 4 + {code};
+                    INSERT INTO search_index (rowid, title, body, parent_id)
+                    VALUES (new.id * 4 + {code}, {columns.format(row='new.')});
+                END
+            """)
+
+# Schema migration 19: per-course gradebook version for the grade export ETag
+def migration_019_gradebook_versions(cursor):
+    """
+    Create `gradebook_versions`, one counter per course bumped by triggers
+    whenever anything the gradebook export shows changes: grades,
+    assignments, enrollments or a student's name.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the migration transaction
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS gradebook_versions (
+            -- ID of the course
+            course_id INTEGER PRIMARY KEY,
+            -- Bumped on every change to the course's gradebook
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO gradebook_versions (course_id, version)
+        SELECT id, 1 FROM courses
+    """)
+    
+    def bump(course_select):
+        # WHERE is required before ON CONFLICT when an UPSERT reads from a SELECT
+        return (f"INSERT INTO gradebook_versions (course_id, version) {course_select} "
+                f"ON CONFLICT (course_id) DO UPDATE SET version = version + 1;")
+    
+    def bump_course(course_id):
+        return bump(f"SELECT {course_id}, 1 WHERE {course_id} IS NOT NULL")
+    
+    def bump_assignment(assignment_id):
+        return bump(f"SELECT course_id, 1 FROM assignments WHERE id = {assignment_id}")
+    
+    triggers = {
+        'gradebook_version_grades_insert': f"AFTER INSERT ON grades BEGIN {bump_assignment('new.assignment_id')} END",
+        'gradebook_version_grades_update': f"AFTER UPDATE OF grade, assignment_id, student_id ON grades "
+                                           f"BEGIN {bump_assignment('old.assignment_id')} "
+                                           f"{bump_assignment('new.assignment_id')} END",
+        'gradebook_version_grades_delete': f"AFTER DELETE ON grades BEGIN {bump_assignment('old.assignment_id')} END",
+        'gradebook_version_assignments_insert': f"AFTER INSERT ON assignments BEGIN {bump_course('new.course_id')} END",
+        'gradebook_version_assignments_update': f"AFTER UPDATE OF title, course_id ON assignments "
+                                                f"BEGIN {bump_course('old.course_id')} {bump_course('new.course_id')} END",
+        'gradebook_version_assignments_delete': f"AFTER DELETE ON assignments BEGIN {bump_course('old.course_id')} END",
+        'gradebook_version_enrollments_insert': f"AFTER INSERT ON enrollments BEGIN {bump_course('new.course_id')} END",
+        'gradebook_version_enrollments_update': f"AFTER UPDATE OF student_id, course_id ON enrollments "
+                                                f"BEGIN {bump_course('old.course_id')} {bump_course('new.course_id')} END",
+        'gradebook_version_enrollments_delete': f"AFTER DELETE ON enrollments BEGIN {bump_course('old.course_id')} END",
+        'gradebook_version_users_update': f"AFTER UPDATE OF full_name, username ON users "
+                                          f"BEGIN {bump('SELECT course_id, 1 FROM enrollments WHERE student_id = new.id')} END",
+    }
+    for name, definition in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {definition}")
+
+
+
+# Ordered list of schema migrations: (version, description, function)
+# Append new migrations at the end with the next version number; never edit applied ones
+MIGRATIONS = [
+    (1, 'create tables', migration_001_create_tables),
+    (2, 'add courses columns', migration_002_courses_columns),
+    (3, 'add topics.content', migration_003_topics_content),
+    (4, 'secondary indexes', migration_004_secondary_indexes),
+    (5, 'background job queue', migration_005_jobs),
+    (6, 'course notification events', migration_006_course_events),
+    (7, 'comment deletion log', migration_007_comment_deletions),
+    (8, 'unique grade per student and assignment', migration_008_unique_grades),
+    (9, 'attendance session date', migration_009_attendance_session_date),
+    (10, 'attendance summaries', migration_010_attendance_summary),
+    (11, 'attendance date index', migration_011_attendance_date_index),
+    (12, 'student statistics', migration_012_student_stats),
+    (13, 'course progress counters', migration_013_course_progress),
+    (14, 'teacher dashboard summaries', migration_014_teacher_summaries),
+    (15, 'site counters', migration_015_site_counters),
+    (16, 'full-text search index', migration_016_search_index),
+    (17, 'listing counters and indexes', migration_017_listing_indexes),
+    (18, 'lesson versions', migration_018_lesson_versions),
+    (19, 'gradebook versions', migration_019_gradebook_versions),
+]
+
+# Latest schema version this code expects
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(cursor):
+    """
+    Read the schema version recorded in the database.
+    
+    Args:
+        cursor (sqlite3.Cursor): Database cursor
+    
+    Returns:
+        int: Highest applied migration, or 0 for a database never migrated
+    """
+    try:
+        cursor.execute("SELECT MAX(version) as version FROM schema_version")
+    except sqlite3.OperationalError:
+        # schema_version table doesn't exist yet
+        return 0
+    return cursor.fetchone()['version'] or 0
+
+
+# Function to bring the database schema up to date
+def migrate_db(db_name=None):
+    """
+    Apply pending schema migrations.
+    
+    Fast path: when the recorded version is already current this runs a
+    single SELECT and no DDL at all. Otherwise it takes SQLite's write lock
+    with BEGIN IMMEDIATE, which acts as an advisory lock so that when
+    several workers boot at once only one of them migrates; the others
+    wait on the busy timeout, re-read the version and find nothing to do.
+    
+    Args:
+        db_name (str): Database file, defaults to DATABASE
+    
+    Returns:
+        list: Versions applied by this call (empty if already current)
+    """
+    conn = get_db_connection(db_name)
+    try:
+        cursor = conn.cursor()
+        if get_schema_version(cursor) >= SCHEMA_VERSION:
+            return []
+        
+        applied = []
+        # Take the database write lock before looking at the version again
+        conn.commit()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    -- Number of the applied migration
+                    version INTEGER PRIMARY KEY,
+                    -- What the migration does
+                    description TEXT,
+                    -- Timestamp when the migration was applied
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            current = get_schema_version(cursor)
+            for version, description, migration in MIGRATIONS:
+                if version <= current:
+                    continue
+                migration(cursor)
+                cursor.execute("""
+                    INSERT INTO schema_version (version, description) VALUES (?, ?)
+                """, (version, description))
+                applied.append(version)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        if applied:
+            print(f"Applied schema migrations: {', '.join(str(v) for v in applied)}")
+        return applied
+    finally:
+        # Always close the connection, even if an error occurs
+        conn.close()
+
+
+# Flask CLI command: flask --app app migrate
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations."""
+    applied = migrate_db()
+    if not applied:
+        print(f"Schema is up to date (version {SCHEMA_VERSION})")
+
+
+# Function to initialize database tables on first run (kept for backward compatibility)
+def init_db():
+    """
+    Create or upgrade the database schema.
+    
+    Equivalent to migrate_db() on the default database.
+    """
+    migrate_db()
+
+
+# Function to safely execute SELECT query with error handling
+# Seconds a safe_count_query() result is served from memory (select with LMS_AGGREGATE_CACHE_TTL; 0 = no cache)
+AGGREGATE_CACHE_TTL = float(os.environ.get('LMS_AGGREGATE_CACHE_TTL', '30'))
+
+# Entries kept before the aggregate cache is emptied and refilled on demand
+AGGREGATE_CACHE_SIZE = 1000
+
+# Cached aggregates: {(database, query, params): (expires at, value)}
+_aggregates = {}
+_aggregates_lock = threading.Lock()
+
+
+def safe_count_query(query, params=(), db_name=None, ttl=None):
+    """
+    Safely execute an aggregate query and return its `count` column,
+    caching the value in memory for a few seconds.
+    
+    Returns 0 if the table doesn't exist. Cheap queries (such as reads of
+    `site_counters`) are the best fit: within the TTL, repeated calls
+    don't touch the database at all.
+    
+    Args:
+        query (str): SQL query selecting a value named `count`
+        params (tuple): Query parameters
+        db_name (str): Name of the database file
+        ttl (float): Seconds to cache the value, defaults to AGGREGATE_CACHE_TTL
+    
+    Returns:
+        int: Count result or 0 if table doesn't exist
+    """
+    ttl = AGGREGATE_CACHE_TTL if ttl is None else ttl
+    key = (db_name or DATABASE, query, tuple(params))
+    now = time.monotonic()
+    with _aggregates_lock:
+        cached = _aggregates.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+    
+    conn = None
+    try:
+        conn = get_db_connection(db_name)
+        cursor = conn.cursor()
+        # Execute the SQL query
+        cursor.execute(query, params)
+        # Fetch the result and get the count value
+        row = cursor.fetchone()
+        result = row['count'] if row else 0
+    except sqlite3.OperationalError:
+        # If table doesn't exist, return 0 instead of crashing (not cached)
+        return 0
+    finally:
+        # Always close the connection
+        if conn:
+            conn.close()
+    
+    if ttl > 0:
+        with _aggregates_lock:
+            if len(_aggregates) >= AGGREGATE_CACHE_SIZE:
+                _aggregates.clear()
+            _aggregates[key] = (now + ttl, result)
+    return result
+
+
+# Function to notify all students enrolled in a course
+def fan_out_notifications(cursor, course_id, notification_type, title, message, resource_id):
+    """
+    Create one notification per enrolled student with a single INSERT ... SELECT.
+    
+    The caller owns the transaction and commits it.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the caller's transaction
+        course_id (int): Course whose students are notified
+        notification_type (str): 'lesson' or 'assignment'
+        title (str): Notification title
+        message (str): Notification message
+        resource_id (int): ID of the new lesson or assignment
+    
+    Returns:
+        tuple: (number of notifications written, elapsed milliseconds)
+    """
+    started = time.perf_counter()
+    cursor.execute("""
+        INSERT INTO notifications (student_id, course_id, notification_type, title, message, resource_id)
+        SELECT student_id, ?, ?, ?, ?, ?
+        FROM enrollments
+        WHERE course_id = ?
+    """, (course_id, notification_type, title, message, resource_id, course_id))
+    return cursor.rowcount, (time.perf_counter() - started) * 1000
+
+
+# How lesson/assignment notifications are stored (select with LMS_NOTIFICATION_MODE):
+# 'fanout' - one `notifications` row per enrolled student, written by a background job
+# 'events' - one `course_events` row per lesson/assignment, read through per-student cursors
+NOTIFICATION_MODES = ('fanout', 'events')
+NOTIFICATION_MODE = os.environ.get('LMS_NOTIFICATION_MODE', 'fanout')
+if NOTIFICATION_MODE not in NOTIFICATION_MODES:
+    raise ValueError(f"Unknown notification mode '{NOTIFICATION_MODE}' (choose from {', '.join(NOTIFICATION_MODES)})")
+
+
+# Number of background job worker threads started with the app (0 = run jobs with "flask run-jobs")
+JOB_WORKERS = int(os.environ.get('LMS_JOB_WORKERS', '2'))
+
+# Seconds an idle worker sleeps before checking the queue again
+JOB_POLL_INTERVAL = float(os.environ.get('LMS_JOB_POLL_INTERVAL', '1'))
+
+# Attempts before a job is marked as failed
+JOB_MAX_ATTEMPTS = 3
+
+# A 'running' job older than this is assumed to belong to a dead worker and is retried
+JOB_STALE_AFTER = 600
+
+# Registered job handlers: job_type -> function(cursor, payload) returning a result dict
+JOB_HANDLERS = {}
+
+# Set when a job is queued so idle workers wake up early
+_job_wakeup = threading.Event()
+_job_workers = []
+_job_workers_lock = threading.Lock()
+
+
+def job_handler(job_type):
+    """
+    Register a function as the handler for a job type.
+    
+    The handler is called as handler(cursor, payload) inside a transaction
+    that is committed when it returns and rolled back if it raises.
+    
+    Args:
+        job_type (str): Name used with enqueue_job()
+    """
+    def register(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return register
+
+
+def enqueue_job(cursor, job_type, payload, course_id=None, created_by=None, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Queue a background job.
+    
+    The job row is written in the caller's transaction, so it only becomes
+    visible to workers if the caller commits.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the caller's transaction
+        job_type (str): Registered handler name
+        payload (dict): JSON-serializable arguments for the handler
+        course_id (int): Course the job belongs to
+        created_by (int): ID of the user who queued the job
+        max_attempts (int): Attempts before giving up
+    
+    Returns:
+        int: ID of the queued job
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"No handler registered for job type '{job_type}'")
+    cursor.execute("""
+        INSERT INTO jobs (job_type, payload, course_id, created_by, max_attempts)
+        VALUES (?, ?, ?, ?, ?)
+    """, (job_type, json.dumps(payload), course_id, created_by, max_attempts))
+    _job_wakeup.set()
+    return cursor.lastrowid
+
+
+def claim_job(conn):
+    """
+    Atomically take the oldest runnable job off the queue.
+    
+    Args:
+        conn (PooledConnection): Connection with no open transaction
+    
+    Returns:
+        sqlite3.Row or None: The claimed job, now marked 'running'
+    """
+    cursor = conn.cursor()
+    # The write lock makes select-then-update atomic across threads and processes
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("""
+            SELECT * FROM jobs
+            WHERE (status = 'queued' AND run_after <= CURRENT_TIMESTAMP)
+               OR (status = 'running' AND started_at <= datetime('now', ?))
+            ORDER BY id
+            LIMIT 1
+        """, (f"-{JOB_STALE_AFTER} seconds",))
+        job = cursor.fetchone()
+        if job is not None:
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'running', attempts = attempts + 1, started_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (job['id'],))
+        conn.commit()
+        return job
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_job(conn, job):
+    """
+    Run a claimed job and record its outcome.
+    
+    Failed attempts are retried with exponential backoff until
+    max_attempts is reached, then the job is marked 'failed'.
+    
+    Args:
+        conn (PooledConnection): Connection with no open transaction
+        job (sqlite3.Row): Job returned by claim_job()
+    
+    Returns:
+        bool: True if the job succeeded
+    """
+    cursor = conn.cursor()
+    attempts = job['attempts'] + 1
+    try:
+        handler = JOB_HANDLERS[job['job_type']]
+        result = handler(cursor, json.loads(job['payload']))
+        cursor.execute("""
+            UPDATE jobs
+            SET status = 'done', result = ?, last_error = NULL, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (json.dumps(result), job['id']))
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Job {job['id']} ({job['job_type']}) failed on attempt {attempts}: {str(e)}")
+        if attempts < job['max_attempts']:
+            # Retry after 2, 4, 8, ... seconds
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'queued', last_error = ?, run_after = datetime('now', ?)
+                WHERE id = ?
+            """, (str(e), f"+{2 ** attempts} seconds", job['id']))
+        else:
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'failed', last_error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (str(e), job['id']))
+        conn.commit()
+        return False
+
+
+def run_pending_jobs(limit=None, db_name=None):
+    """
+    Run queued jobs until the queue is empty.
+    
+    Args:
+        limit (int): Stop after this many jobs (None = no limit)
+        db_name (str): Database file, defaults to DATABASE
+    
+    Returns:
+        int: Number of jobs run
+    """
+    processed = 0
+    conn = get_db_connection(db_name)
+    try:
+        while limit is None or processed < limit:
+            job = claim_job(conn)
+            if job is None:
+                break
+            run_job(conn, job)
+            processed += 1
+    finally:
+        conn.close()
+    return processed
+
+
+def _job_worker_loop():
+    """Body of a background worker thread: run jobs, then sleep until woken or polled."""
+    while True:
+        try:
+            run_pending_jobs()
+        except Exception as e:
+            print(f"Job worker error: {str(e)}")
+        _job_wakeup.wait(JOB_POLL_INTERVAL)
+        _job_wakeup.clear()
+
+
+def start_job_workers(count=None):
+    """
+    Start the background worker threads once per process.
+    
+    Args:
+        count (int): Number of threads, defaults to JOB_WORKERS
+    """
+    count = JOB_WORKERS if count is None else count
+    with _job_workers_lock:
+        while len(_job_workers) < count:
+            worker = threading.Thread(target=_job_worker_loop, name=f"lms-job-worker-{len(_job_workers) + 1}", daemon=True)
+            worker.start()
+            _job_workers.append(worker)
+
+
+# Start the job workers alongside the web app (on the first request, so CLI commands don't)
+@app.before_request
+def ensure_job_workers():
+    """Make sure the background job workers are running."""
+    if len(_job_workers) < JOB_WORKERS:
+        start_job_workers()
+
+
+# Flask CLI command: flask --app app run-jobs
+@app.cli.command('run-jobs')
+def run_jobs_command():
+    """Run every queued background job, then exit."""
+    print(f"Ran {run_pending_jobs()} job(s)")
+
+
+# Job handler: notify all students enrolled in a course
+@job_handler('notify_course')
+def notify_course_job(cursor, payload):
+    """Fan out a lesson or assignment notification to a course."""
+    notified, elapsed_ms = fan_out_notifications(
+        cursor, payload['course_id'], payload['notification_type'],
+        payload['title'], payload['message'], payload['resource_id'])
+    print(f"Created notifications for {notified} enrolled students: {payload['title']} ({elapsed_ms:.1f} ms)")
+    return {'notified': notified, 'elapsed_ms': round(elapsed_ms, 1)}
+
+
+# Job handler: remove the questions and submissions of a deleted lesson
+@job_handler('delete_lesson_content')
+def delete_lesson_content_job(cursor, payload):
+    """Delete the submissions, questions, attendance and views that belonged to a lesson."""
+    # Delete all submissions for questions in this lesson, taking them out of the student statistics
+    # (jobs queued before course_id was added to the payload only correct the totals)
+    remove_submission_stats(cursor, payload.get('course_id'),
+                            'question_id IN (SELECT id FROM msqs WHERE topic_id = ?)', (payload['lesson_id'],))
+    cursor.execute("""
+        DELETE FROM submissions 
+        WHERE question_id IN (
+            SELECT id FROM msqs WHERE topic_id = ?
+        )
+    """, (payload['lesson_id'],))
+    submissions_deleted = cursor.rowcount
+    
+    # Take the lesson's attendance out of the student summaries, then delete it
+    cursor.execute("""
+        SELECT course_id FROM attendance_lesson_summary WHERE lesson_id = ?
+    """, (payload['lesson_id'],))
+    lesson_summary = cursor.fetchone()
+    if lesson_summary:
+        cursor.execute("""
+            SELECT student_id,
+                   -SUM(status = 'present') AS present, -SUM(status = 'late') AS late,
+                   -SUM(status = 'absent') AS absent
+            FROM attendance
+            WHERE lesson_id = ?
+            GROUP BY student_id
+        """, (payload['lesson_id'],))
+        cursor.executemany("""
+            UPDATE attendance_student_summary
+            SET present = present + ?, late = late + ?, absent = absent + ?
+            WHERE course_id = ? AND student_id = ?
+        """, [(row['present'], row['late'], row['absent'], lesson_summary['course_id'], row['student_id'])
+              for row in cursor.fetchall()])
+        cursor.execute("""
+            DELETE FROM attendance_lesson_summary WHERE lesson_id = ?
+        """, (payload['lesson_id'],))
+    cursor.execute("""
+        DELETE FROM attendance WHERE lesson_id = ?
+    """, (payload['lesson_id'],))
+    
+    # Take the lesson's views out of the enrollment counters, then delete them
+    cursor.execute("""
+        SELECT student_id, course_id FROM lesson_views WHERE lesson_id = ?
+    """, (payload['lesson_id'],))
+    cursor.executemany("""
+        UPDATE enrollments SET lessons_viewed = MAX(lessons_viewed - 1, 0)
+        WHERE student_id = ? AND course_id = ?
+    """, [(row['student_id'], row['course_id']) for row in cursor.fetchall()])
+    cursor.execute("""
+        DELETE FROM lesson_views WHERE lesson_id = ?
+    """, (payload['lesson_id'],))
+    
+    # Delete all questions for this lesson and drop their cached answer keys
+    cursor.execute("""
+        SELECT id FROM msqs WHERE topic_id = ?
+    """, (payload['lesson_id'],))
+    question_ids = [row['id'] for row in cursor.fetchall()]
+    cursor.execute("""
+        DELETE FROM msqs WHERE topic_id = ?
+    """, (payload['lesson_id'],))
+    questions_deleted = cursor.rowcount
+    invalidate_answer_keys(question_ids)
+    
+    # The course has one lesson less, so everyone's progress changes
+    if payload.get('course_id'):
+        refresh_course_progress(cursor, payload['course_id'])
+    return {'submissions_deleted': submissions_deleted, 'questions_deleted': questions_deleted}
+
+
+# Job handler: recompute the progress of a whole course after its lessons or questions change
+@job_handler('refresh_course_progress')
+def refresh_course_progress_job(cursor, payload):
+    """Recompute the progress of every enrollment of a course."""
+    return {'enrollments_updated': refresh_course_progress(cursor, payload['course_id'])}
+
+
+# Attendance statuses accepted from the attendance form
+ATTENDANCE_STATUSES = ('present', 'absent', 'late')
+
+# Rows per attendance INSERT statement (5 bound parameters each, under SQLite's 999 limit)
+ATTENDANCE_UPSERT_ROWS = 150
+
+
+def upsert_attendance(cursor, lesson_id, course_id, session_date, records):
+    """
+    Save a class's attendance for one lesson and day with a multi-row UPSERT.
+    
+    A class of up to ATTENDANCE_UPSERT_ROWS students is saved with a single
+    statement; rows that already exist for the day get their status updated.
+    The attendance summaries are adjusted by the difference with the
+    statuses stored before, and the students' course progress refreshed.
+    
+    Args:
+        cursor: Database cursor (caller commits)
+        lesson_id (int): ID of the lesson
+        course_id (int): ID of the lesson's course
+        session_date (str): Day of the session, 'YYYY-MM-DD'
+        records (list): (student_id, status) pairs
+    
+    Returns:
+        int: Number of records saved
+    """
+    # Statuses already saved for this session, to turn the save into summary deltas
+    cursor.execute("""
+        SELECT student_id, status FROM attendance
+        WHERE lesson_id = ? AND session_date = ?
+    """, (lesson_id, session_date))
+    previous = {row['student_id']: row['status'] for row in cursor.fetchall()}
+    
+    # The last status wins when a student appears twice in the form
+    records = list(dict(records).items())
+    deltas = {}
+    for student_id, status in records:
+        counts = deltas.setdefault(student_id, dict.fromkeys(ATTENDANCE_STATUSES, 0))
+        counts[status] += 1
+        if student_id in previous:
+            counts[previous[student_id]] -= 1
+    update_attendance_summaries(cursor, course_id, lesson_id, deltas)
+    refresh_course_progress(cursor, course_id, deltas)
+    
+    for start in range(0, len(records), ATTENDANCE_UPSERT_ROWS):
+        chunk = records[start:start + ATTENDANCE_UPSERT_ROWS]
+        params = []
+        for student_id, status in chunk:
+            params += [student_id, lesson_id, course_id, status, session_date]
+        cursor.execute(f"""
+            INSERT INTO attendance (student_id, lesson_id, course_id, status, session_date)
+            VALUES {', '.join(['(?, ?, ?, ?, ?)'] * len(chunk))}
+            ON CONFLICT (student_id, lesson_id, session_date) DO UPDATE SET
+                status = excluded.status,
+                recorded_at = CURRENT_TIMESTAMP
+        """, params)
+    return len(records)
+
+
+def update_attendance_summaries(cursor, course_id, lesson_id, deltas):
+    """
+    Add per-student status count changes to the attendance summaries.
+    
+    Args:
+        cursor: Database cursor (caller commits)
+        course_id (int): ID of the course
+        lesson_id (int): ID of the lesson the changes belong to
+        deltas (dict): {student_id: {'present': n, 'late': n, 'absent': n}}, n may be negative
+    """
+    cursor.executemany("""
+        INSERT INTO attendance_student_summary (course_id, student_id, present, late, absent)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (course_id, student_id) DO UPDATE SET
+            present = present + excluded.present,
+            late = late + excluded.late,
+            absent = absent + excluded.absent
+    """, [(course_id, student_id, counts['present'], counts['late'], counts['absent'])
+          for student_id, counts in deltas.items()])
+    
+    totals = {status: sum(counts[status] for counts in deltas.values()) for status in ATTENDANCE_STATUSES}
+    cursor.execute("""
+        INSERT INTO attendance_lesson_summary (lesson_id, course_id, present, late, absent)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (lesson_id) DO UPDATE SET
+            present = present + excluded.present,
+            late = late + excluded.late,
+            absent = absent + excluded.absent
+    """, (lesson_id, course_id, totals['present'], totals['late'], totals['absent']))
+
+
+# Job handler: save the attendance form of a lesson
+@job_handler('save_attendance')
+def save_attendance_job(cursor, payload):
+    """Insert or update the attendance of each student in the payload for the session day."""
+    # Jobs queued before session_date was added to the payload save for today
+    session_date = payload.get('session_date') or time.strftime('%Y-%m-%d', time.gmtime())
+    saved = upsert_attendance(cursor, payload['lesson_id'], payload['course_id'],
+                              session_date, payload['records'])
+    return {'saved': saved}
+
+
+# Function to notify a course about a new lesson or assignment
+def publish_course_notification(cursor, course_id, notification_type, title, message, resource_id, created_by=None):
+    """
+    Notify the students of a course, using the configured NOTIFICATION_MODE.
+    
+    In 'events' mode a single course event row is written. In 'fanout'
+    mode a background job is queued that writes one row per student.
+    Either way the write is part of the caller's transaction.
+    
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the caller's transaction
+        course_id (int): Course whose students are notified
+        notification_type (str): 'lesson' or 'assignment'
+        title (str): Notification title
+        message (str): Notification message
+        resource_id (int): ID of the new lesson or assignment
+        created_by (int): ID of the teacher
+    
+    Returns:
+        str: Short description for the teacher's success message
+    """
+    if NOTIFICATION_MODE == 'events':
+        cursor.execute("""
+            INSERT INTO course_events (course_id, event_type, title, message, resource_id)
+            VALUES (?, ?, ?, ?, ?)
+        """, (course_id, notification_type, title, message, resource_id))
+        return 'Enrolled students have been notified.'
+    
+    job_id = enqueue_job(cursor, 'notify_course', {
+        'course_id': course_id,
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'resource_id': resource_id,
+    }, course_id=course_id, created_by=created_by)
+    return f'Students are being notified (job #{job_id}).'
+
+
+# Answer keys by question ID: {msqs.id: ('A'..'D', course ID)}
+# Questions are never edited in place or moved between lessons and AUTOINCREMENT IDs are never reused,
+# so an entry only goes stale when its question is deleted.
+_answer_keys = {}
+_answer_keys_lock = threading.Lock()
+
+# Entries kept before the cache is emptied and refilled on demand
+ANSWER_KEY_CACHE_SIZE = 50000
+
+
+def get_answer_keys(cursor, question_ids):
+    """
+    Return the correct answers of a set of questions, with their course.
+    
+    Cached answers are used directly; the rest are loaded with a single
+    IN (...) query and added to the cache.
+    
+    Args:
+        cursor: Database cursor
+        question_ids (iterable): Question (msqs) IDs
+    
+    Returns:
+        dict: {question_id: ('A'..'D', course_id)} for the questions that exist;
+              course_id is None when the question's lesson is gone
+    """
+    question_ids = set(question_ids)
+    with _answer_keys_lock:
+        keys = {qid: _answer_keys[qid] for qid in question_ids if qid in _answer_keys}
+    missing = sorted(question_ids - keys.keys())
+    
+    # SQLite limits the number of bound parameters, so load in chunks
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        cursor.execute(f"""
+            SELECT m.id, m.correct_answer, t.course_id
+            FROM msqs m
+            LEFT JOIN topics t ON t.id = m.topic_id
+            WHERE m.id IN ({', '.join('?' * len(chunk))})
+        """, chunk)
+        loaded = {row['id']: (row['correct_answer'].upper(), row['course_id']) for row in cursor.fetchall()}
+        keys.update(loaded)
+        with _answer_keys_lock:
+            if len(_answer_keys) + len(loaded) > ANSWER_KEY_CACHE_SIZE:
+                _answer_keys.clear()
+            _answer_keys.update(loaded)
+    return keys
+
+
+def invalidate_answer_keys(question_ids=None):
+    """
+    Drop cached answer keys after questions are deleted.
+    
+    Args:
+        question_ids (iterable): IDs to drop, or None to empty the cache
+    """
+    with _answer_keys_lock:
+        if question_ids is None:
+            _answer_keys.clear()
+        else:
+            for qid in question_ids:
+                _answer_keys.pop(qid, None)
 
-@contextmanager
-def get_db():
+
+def score_submission(cursor, student_id, answers):
     """
-    Context manager for safe database connection handling.
-    Ensures connection is always closed, even if an error occurs.
+    Score a whole assignment attempt and save it with one executemany insert.
     
-    Usage:
-        with get_db() as cursor:
-            cursor.execute(...)
+    The student's statistics and course progress are updated in the same
+    transaction.
     
-    Yields:
-        sqlite3.Cursor: Database cursor object
+    Args:
+        cursor: Database cursor (caller commits)
+        student_id (int): ID of the student submitting
+        answers (dict): {question_id: 'A'..'D'}
+    
+    Returns:
+        tuple: (number correct, number of questions scored)
     """
-    conn = sqlite3.connect("lms.db")
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn.cursor()
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    keys = get_answer_keys(cursor, answers)
+    
+    # Questions that no longer exist are skipped
+    rows = [(student_id, qid, answer, 1 if answer == keys[qid][0] else 0)
+            for qid, answer in answers.items() if qid in keys]
+    
+    # Correct answers to questions the student had not completed yet advance their course progress
+    newly_correct = {row[1] for row in rows if row[3] and keys[row[1]][1]}
+    candidates = sorted(newly_correct)
+    for start in range(0, len(candidates), 500):
+        chunk = candidates[start:start + 500]
+        cursor.execute(f"""
+            SELECT DISTINCT question_id FROM submissions
+            WHERE student_id = ? AND is_correct = 1 AND question_id IN ({', '.join('?' * len(chunk))})
+        """, [student_id] + chunk)
+        newly_correct -= {row['question_id'] for row in cursor.fetchall()}
+    
+    cursor.executemany("""
+        INSERT INTO submissions (student_id, question_id, selected_answer, is_correct)
+        VALUES (?, ?, ?, ?)
+    """, rows)
+    
+    deltas = {}
+    for _, qid, _, is_correct in rows:
+        # A question whose lesson is gone only counts in the totals
+        counts = deltas.setdefault((student_id, keys[qid][1] or 0), {'submissions': 0, 'correct': 0})
+        counts['submissions'] += 1
+        counts['correct'] += is_correct
+    update_student_stats(cursor, deltas)
+    
+    completed = {}
+    for qid in newly_correct:
+        completed[keys[qid][1]] = completed.get(keys[qid][1], 0) + 1
+    for course_id, count in completed.items():
+        cursor.execute("""
+            UPDATE enrollments SET questions_completed = questions_completed + ?
+            WHERE student_id = ? AND course_id = ?
+        """, (count, student_id, course_id))
+        refresh_course_progress(cursor, course_id, [student_id])
+    return sum(row[3] for row in rows), len(rows)
 
 
-# Function to establish database connection (kept for backward compatibility)
-def get_db_connection(db_name="lms.db"):
+# Counters kept in student_stats
+STUDENT_STAT_FIELDS = ('submissions', 'correct', 'graded', 'grade_total')
+
+
+def update_student_stats(cursor, deltas):
     """
-    Connect to the SQLite database and return connection object.
+    Add changes to the `student_stats` read model.
+    
+    Each (student, course) change is also added to the student's
+    course_id = 0 totals row.
     
     Args:
-        db_name (str): Name of the database file, defaults to "lms.db"
+        cursor: Database cursor (caller commits)
+        deltas (dict): {(student_id, course_id): {field: change}} with fields
+                       from STUDENT_STAT_FIELDS; changes may be negative
+    """
+    rows = {}
+    for (student_id, course_id), changes in deltas.items():
+        for key in {(student_id, course_id), (student_id, 0)}:
+            row = rows.setdefault(key, dict.fromkeys(STUDENT_STAT_FIELDS, 0))
+            for field, change in changes.items():
+                row[field] += change
+    cursor.executemany("""
+        INSERT INTO student_stats (student_id, course_id, submissions, correct, graded, grade_total)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (student_id, course_id) DO UPDATE SET
+            submissions = submissions + excluded.submissions,
+            correct = correct + excluded.correct,
+            graded = graded + excluded.graded,
+            grade_total = grade_total + excluded.grade_total
+    """, [key + tuple(row[field] for field in STUDENT_STAT_FIELDS) for key, row in rows.items()])
+
+
+def get_student_stats(cursor, student_id, course_id=0):
+    """
+    Read a student's statistics for one course, or their totals (course_id 0).
     
     Returns:
-        sqlite3.Connection: Database connection object with Row factory
+        dict: submissions, correct, graded and grade_total (zeros if no row)
     """
-    # Connect to the specified SQLite database file
-    conn = sqlite3.connect(db_name)
-    # Set row_factory to sqlite3.Row to access columns by name (dict-like)
-    # This allows us to use column names instead of column indices
-    conn.row_factory = sqlite3.Row
-    return conn
+    cursor.execute("""
+        SELECT submissions, correct, graded, grade_total
+        FROM student_stats
+        WHERE student_id = ? AND course_id = ?
+    """, (student_id, course_id))
+    row = cursor.fetchone()
+    return dict(row) if row else dict.fromkeys(STUDENT_STAT_FIELDS, 0)
 
 
-# Function to hash passwords for secure storage
-def hash_password(password):
+def remove_submission_stats(cursor, course_id, question_filter, params):
     """
-    Hash a password using SHA256 algorithm.
+    Take submissions that are about to be deleted out of `student_stats`.
     
     Args:
-        password (str): Plain text password to hash
+        cursor: Database cursor (caller commits)
+        course_id (int): Course of the questions, or None if unknown (totals only)
+        question_filter (str): SQL condition on submissions.question_id, e.g. 'question_id = ?'
+        params (tuple): Parameters of question_filter
+    """
+    cursor.execute(f"""
+        SELECT student_id, COUNT(*) AS submissions, SUM(is_correct) AS correct
+        FROM submissions
+        WHERE {question_filter}
+        GROUP BY student_id
+    """, params)
+    rows = cursor.fetchall()
+    update_student_stats(cursor, {(row['student_id'], course_id or 0): {'submissions': -row['submissions'],
+                                                                        'correct': -row['correct']}
+                                  for row in rows})
+    
+    # Questions that were completed (answered correctly) leave the enrollment counters too
+    if course_id:
+        cursor.execute(f"""
+            SELECT student_id, COUNT(DISTINCT question_id) AS completed
+            FROM submissions
+            WHERE ({question_filter}) AND is_correct = 1
+            GROUP BY student_id
+        """, params)
+        cursor.executemany("""
+            UPDATE enrollments SET questions_completed = MAX(questions_completed - ?, 0)
+            WHERE student_id = ? AND course_id = ?
+        """, [(row['completed'], row['student_id'], course_id) for row in cursor.fetchall()])
+
+
+# What counts towards a student's course progress:
+# 'lessons'    - lessons of the course the student has opened
+# 'questions'  - questions of the course answered correctly at least once
+# 'attendance' - recorded sessions the student was present or late for
+PROGRESS_COMPONENTS = ('lessons', 'questions', 'attendance')
+
+
+def parse_progress_weights(value):
+    """
+    Parse a progress weighting such as 'lessons=40,questions=40,attendance=20'.
+    
+    Args:
+        value (str): Comma-separated component=weight pairs
     
     Returns:
-        str: Hashed password (hexadecimal string)
+        dict: {component: weight} for the components in PROGRESS_COMPONENTS
     """
-    # Use SHA256 to hash the password for security
-    # This ensures passwords are not stored in plain text
-    return hashlib.sha256(password.encode()).hexdigest()
+    weights = dict.fromkeys(PROGRESS_COMPONENTS, 0.0)
+    for pair in value.split(','):
+        if not pair.strip():
+            continue
+        component, _, weight = pair.partition('=')
+        component = component.strip()
+        if component not in weights:
+            raise ValueError(f"Unknown progress component '{component}' (choose from {', '.join(PROGRESS_COMPONENTS)})")
+        weights[component] = float(weight)
+        if weights[component] < 0:
+            raise ValueError(f"Progress weight of '{component}' must not be negative")
+    if not any(weights.values()):
+        raise ValueError("At least one progress weight must be positive")
+    return weights
 
 
-# Function to initialize database tables on first run
-def init_db():
+# Relative weight of each component (select with LMS_PROGRESS_WEIGHTS)
+PROGRESS_WEIGHTS = parse_progress_weights(os.environ.get('LMS_PROGRESS_WEIGHTS',
+                                                         'lessons=40,questions=40,attendance=20'))
+
+
+def compute_progress(ratios, weights=None):
     """
-    Create necessary database tables if they don't exist.
+    Combine component completion ratios into a 0-100 progress percentage.
     
-    Creates tables for:
-    - users: Store user account information
-    - courses: Store course information
-    - topics: Store lesson topics within courses
-    - msqs: Store multiple choice questions for assignments
+    Components a course does not have (no lessons, no questions, no
+    attendance taken yet) are left out and the others weighted up.
+    
+    Args:
+        ratios (dict): {component: ratio 0..1 or None when not applicable}
+        weights (dict): Component weights, defaults to PROGRESS_WEIGHTS
+    
+    Returns:
+        int: Progress percentage
     """
-    # Establish connection to the database
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    weights = weights or PROGRESS_WEIGHTS
+    applicable = {component: min(ratio, 1.0) for component, ratio in ratios.items()
+                  if ratio is not None and weights.get(component)}
+    total_weight = sum(weights[component] for component in applicable)
+    if not total_weight:
+        return 0
+    return round(100 * sum(weights[c] * ratio for c, ratio in applicable.items()) / total_weight)
+
+
+def refresh_course_progress(cursor, course_id, student_ids=None):
+    """
+    Recompute enrollments.progress from the enrollment counters.
     
-    try:
-        # Create users table for storing user account information
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                -- Unique identifier for each user (auto-incrementing primary key)
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- Username must be unique (no two users can have same username)
-                username TEXT NOT NULL UNIQUE,
-                -- Email must be unique (no two users can have same email)
-                email TEXT NOT NULL UNIQUE,
-                -- Password stored as hashed string (never plain text)
-                password TEXT NOT NULL,
-                -- Full name of the user
-                full_name TEXT NOT NULL,
-                -- User role: either 'student' or 'teacher'
-                role TEXT NOT NULL DEFAULT 'student',
-                -- Timestamp when account was created (automatic)
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Timestamp of last login
-                last_login TIMESTAMP
-            )
-        """)
-        
-        # Create courses table for storing course information
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS courses (
-                -- Unique identifier for each course
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- Unique course ID number
-                course_id INTEGER,
-                -- Course title (must be unique)
-                title TEXT NOT NULL UNIQUE,
-                -- Description of what the course covers
-                description TEXT,
-                -- Type of course (Self-Paced, Instructor-Led, Hybrid, Workshop)
-                course_type TEXT DEFAULT 'Self-Paced',
-                -- Duration of the course (e.g., "4 weeks", "20 hours")
-                duration TEXT DEFAULT 'Flexible',
-                -- Difficulty level (Beginner, Intermediate, Advanced, Expert)
-                level TEXT DEFAULT 'Beginner',
-                -- ID of the teacher who created this course
-                teacher_id INTEGER,
-                -- Timestamp when course was created
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Foreign key linking to the teacher user
-                FOREIGN KEY (teacher_id) REFERENCES users(id)
-            )
-        """)
+    Reads the course's lesson and question counts (two indexed COUNTs),
+    each enrollment's lessons_viewed / questions_completed counters and
+    its attendance summary; no submissions or attendance rows are
+    aggregated. Only rows whose progress changed are written.
+    
+    Args:
+        cursor: Database cursor (caller commits)
+        course_id (int): ID of the course
+        student_ids (iterable): Students to refresh, or None for the whole course
+    
+    Returns:
+        int: Number of enrollments whose progress changed
+    """
+    cursor.execute("""
+        SELECT COUNT(*) AS count FROM topics WHERE course_id = ?
+    """, (course_id,))
+    lesson_count = cursor.fetchone()['count']
+    cursor.execute("""
+        SELECT COUNT(*) AS count
+        FROM topics t
+        JOIN msqs m ON m.topic_id = t.id
+        WHERE t.course_id = ?
+    """, (course_id,))
+    question_count = cursor.fetchone()['count']
+    
+    query = """
+        SELECT e.student_id, e.progress, e.lessons_viewed, e.questions_completed,
+               s.present, s.late, s.absent
+        FROM enrollments e
+        LEFT JOIN attendance_student_summary s
+               ON s.course_id = e.course_id AND s.student_id = e.student_id
+        WHERE e.course_id = ?
+    """
+    if student_ids is None:
+        cursor.execute(query, (course_id,))
+        enrollments = cursor.fetchall()
+    else:
+        student_ids = sorted(set(student_ids))
+        enrollments = []
+        # SQLite limits the number of bound parameters, so read in chunks
+        for start in range(0, len(student_ids), 500):
+            chunk = student_ids[start:start + 500]
+            cursor.execute(query + f" AND e.student_id IN ({', '.join('?' * len(chunk))})",
+                           [course_id] + chunk)
+            enrollments += cursor.fetchall()
+    
+    updates = []
+    for row in enrollments:
+        attended = (row['present'] or 0) + (row['late'] or 0)
+        sessions = attended + (row['absent'] or 0)
+        progress = compute_progress({
+            'lessons': row['lessons_viewed'] / lesson_count if lesson_count else None,
+            'questions': row['questions_completed'] / question_count if question_count else None,
+            'attendance': attended / sessions if sessions else None,
+        })
+        if progress != row['progress']:
+            updates.append((progress, row['student_id'], course_id))
+    cursor.executemany("""
+        UPDATE enrollments SET progress = ?
+        WHERE student_id = ? AND course_id = ?
+    """, updates)
+    return len(updates)
+
+
+def record_lesson_view(cursor, student_id, lesson_id, course_id):
+    """
+    Count a student's first view of a lesson towards their course progress.
+    
+    Views by students not enrolled in the course are ignored.
+    
+    Args:
+        cursor: Database cursor (caller commits)
+        student_id (int): ID of the student
+        lesson_id (int): ID of the lesson viewed
+        course_id (int): ID of the lesson's course
+    
+    Returns:
+        bool: True if this was the student's first view of the lesson
+    """
+    cursor.execute("""
+        INSERT OR IGNORE INTO lesson_views (student_id, lesson_id, course_id)
+        SELECT ?, ?, ?
+        WHERE EXISTS (SELECT 1 FROM enrollments WHERE student_id = ? AND course_id = ?)
+    """, (student_id, lesson_id, course_id, student_id, course_id))
+    if not cursor.rowcount:
+        return False
+    cursor.execute("""
+        UPDATE enrollments SET lessons_viewed = lessons_viewed + 1
+        WHERE student_id = ? AND course_id = ?
+    """, (student_id, course_id))
+    refresh_course_progress(cursor, course_id, [student_id])
+    return True
 
-        # Migration: ensure `courses` table has expected columns when upgrading from older schema
+
+def count_enrollment_progress(cursor, student_id, course_id):
+    """
+    Fill a new enrollment's counters from the student's earlier activity.
+    
+    Students can answer questions before enrolling, so those are counted
+    once here; everything after is counted as it happens.
+    
+    Args:
+        cursor: Database cursor (caller commits)
+        student_id (int): ID of the student
+        course_id (int): ID of the course just enrolled in
+    """
+    cursor.execute("""
+        UPDATE enrollments SET questions_completed = (
+            SELECT COUNT(DISTINCT s.question_id)
+            FROM submissions s
+            JOIN msqs m ON m.id = s.question_id
+            JOIN topics t ON t.id = m.topic_id
+            WHERE s.student_id = ? AND t.course_id = ? AND s.is_correct = 1
+        )
+        WHERE student_id = ? AND course_id = ?
+    """, (student_id, course_id, student_id, course_id))
+    refresh_course_progress(cursor, course_id, [student_id])
+
+
+# Push live updates with Server-Sent Events (LMS_SSE=1). Off by default: every open
+# stream holds a WSGI worker, so only enable it under an async worker (gunicorn -k gevent)
+SSE_ENABLED = os.environ.get('LMS_SSE', '0') == '1'
+
+# Seconds between keep-alive comments on idle Server-Sent Events streams
+SSE_HEARTBEAT = float(os.environ.get('LMS_SSE_HEARTBEAT', '15'))
+
+# Seconds after which a stream is closed so the browser reconnects (frees the worker)
+SSE_MAX_DURATION = float(os.environ.get('LMS_SSE_MAX_DURATION', '300'))
+
+# Maximum number of open streams per process; beyond that clients fall back to polling
+SSE_MAX_CONNECTIONS = int(os.environ.get('LMS_SSE_MAX_CONNECTIONS', '500'))
+
+
+class EventSubscription:
+    """
+    One open event stream: a bounded queue fed by EventHub.publish().
+    
+    Args:
+        channels (list): Channel names the stream listens to
+        max_queue (int): Events buffered before the subscriber counts as too slow
+    """
+    
+    def __init__(self, channels, max_queue=100):
+        self.channels = list(channels)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+    
+    def get(self, timeout):
+        """Wait for the next (event, data) pair; None if the timeout passes first."""
         try:
-            cursor.execute("PRAGMA table_info(courses)")
-            existing_cols = [row['name'] for row in cursor.fetchall()]
-
-            columns_to_add = {
-                'course_id': "INTEGER",
-                'course_type': "TEXT DEFAULT 'Self-Paced'",
-                'duration': "TEXT DEFAULT 'Flexible'",
-                'level': "TEXT DEFAULT 'Beginner'",
-                'teacher_id': "INTEGER",
-                'created_at': "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """
+    In-process publish/subscribe hub for Server-Sent Events.
+    
+    Publishers never block: each event is copied into the queue of every
+    subscriber of the channel, and a subscriber whose queue is full misses
+    the event (its page catches up through the polling fallback). No thread
+    is started per subscriber; a stream only runs while its request handler
+    waits on its queue.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._connections = 0
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+    
+    def subscribe(self, channels):
+        """
+        Open a subscription to one or more channels.
+        
+        Returns:
+            EventSubscription or None if SSE_MAX_CONNECTIONS is reached
+        """
+        with self._lock:
+            if self._connections >= SSE_MAX_CONNECTIONS:
+                return None
+            subscription = EventSubscription(channels)
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+            self._connections += 1
+            return subscription
+    
+    def unsubscribe(self, subscription):
+        """Close a subscription (safe to call more than once)."""
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+            self._connections -= 1
+    
+    def publish(self, channel, event, data):
+        """
+        Send an event to every subscriber of a channel.
+        
+        Args:
+            channel (str): Channel name, e.g. 'course:3' or 'user:7'
+            event (str): SSE event name
+            data (dict): JSON-serializable payload
+        
+        Returns:
+            int: Number of subscribers the event was delivered to
+        """
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+            self._published += 1
+        delivered = 0
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait((event, data))
+                delivered += 1
+            except queue.Full:
+                with self._lock:
+                    self._dropped += 1
+        with self._lock:
+            self._delivered += delivered
+        return delivered
+    
+    def stats(self):
+        """
+        Return hub statistics.
+        
+        Returns:
+            dict: Open connections, active channels and event counters
+        """
+        with self._lock:
+            return {
+                'connections': self._connections,
+                'max_connections': SSE_MAX_CONNECTIONS,
+                'channels': len(self._channels),
+                'published': self._published,
+                'delivered': self._delivered,
+                'dropped': self._dropped,
             }
 
-            for col, definition in columns_to_add.items():
-                if col not in existing_cols:
-                    try:
-                        cursor.execute(f"ALTER TABLE courses ADD COLUMN {col} {definition}")
-                    except sqlite3.OperationalError:
-                        # If ALTER TABLE fails for any reason, ignore and continue - table will still be usable
-                        pass
-        except Exception:
-            # If PRAGMA or inspection fails, continue without raising to avoid breaking init on older DBs
-            pass
-        
-        # Create topics table for storing lesson topics within courses
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS topics (
-                -- Unique identifier for each topic
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- ID of the course this topic belongs to
-                course_id INTEGER NOT NULL,
-                -- Topic title (must be unique)
-                title TEXT UNIQUE,
-                -- Optional subtitle or description
-                subtitle TEXT,
-                -- Lesson content (body text for the lesson)
-                content TEXT,
-                -- Timestamp when topic was created
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Foreign key linking to courses table
-                FOREIGN KEY (course_id) REFERENCES courses(id)
-            )
-        """)
-        
-        # Migration: ensure `topics` table has content column
-        try:
-            cursor.execute("PRAGMA table_info(topics)")
-            existing_cols = [row['name'] for row in cursor.fetchall()]
-            if 'content' not in existing_cols:
-                try:
-                    cursor.execute("ALTER TABLE topics ADD COLUMN content TEXT")
-                except sqlite3.OperationalError:
-                    pass
-        except Exception:
-            pass
-        
-        # Create msqs table for storing multiple choice questions
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS msqs (
-                -- Unique identifier for each question
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- ID of the topic this question belongs to
-                topic_id INTEGER NOT NULL,
-                -- The question text
-                question TEXT NOT NULL,
-                -- Option A text
-                option_a TEXT NOT NULL,
-                -- Option B text
-                option_b TEXT NOT NULL,
-                -- Option C text
-                option_c TEXT NOT NULL,
-                -- Option D text
-                option_d TEXT NOT NULL,
-                -- Correct answer: 'a', 'b', 'c', or 'd'
-                correct_answer TEXT NOT NULL,
-                -- Timestamp when question was created
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Foreign key linking to topics table
-                FOREIGN KEY (topic_id) REFERENCES topics(id)
-            )
-        """)
-        
-        # Create enrollments table to track which students are enrolled in which courses
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS enrollments (
-                -- Unique identifier for each enrollment
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- ID of the student
-                student_id INTEGER NOT NULL,
-                -- ID of the course
-                course_id INTEGER NOT NULL,
-                -- Timestamp when student enrolled
-                enrolled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Student's progress percentage (0-100)
-                progress INTEGER DEFAULT 0,
-                -- Foreign keys
-                FOREIGN KEY (student_id) REFERENCES users(id),
-                FOREIGN KEY (course_id) REFERENCES courses(id),
-                -- Unique constraint: each student can only enroll once per course
-                UNIQUE(student_id, course_id)
-            )
-        """)
-        
-        # Create submissions table to track student assignment submissions
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS submissions (
-                -- Unique identifier for each submission
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- ID of the student submitting
-                student_id INTEGER NOT NULL,
-                -- ID of the question being answered
-                question_id INTEGER NOT NULL,
-                -- Student's selected answer: 'a', 'b', 'c', or 'd'
-                selected_answer TEXT NOT NULL,
-                -- Whether the answer is correct (1 for correct, 0 for incorrect)
-                is_correct INTEGER DEFAULT 0,
-                -- Timestamp when answer was submitted
-                submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Foreign keys
-                FOREIGN KEY (student_id) REFERENCES users(id),
-                FOREIGN KEY (question_id) REFERENCES msqs(id)
-            )
-        """)
-        
-        # Create attendance table to track student attendance in lessons
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS attendance (
-                -- Unique identifier for each attendance record
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- ID of the student
-                student_id INTEGER NOT NULL,
-                -- ID of the lesson/topic
-                lesson_id INTEGER NOT NULL,
-                -- ID of the course
-                course_id INTEGER NOT NULL,
-                -- Attendance status: 'present', 'absent', 'late'
-                status TEXT DEFAULT 'absent',
-                -- Date of the lesson
-                lesson_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Timestamp when attendance was recorded
-                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Foreign keys
-                FOREIGN KEY (student_id) REFERENCES users(id),
-                FOREIGN KEY (lesson_id) REFERENCES topics(id),
-                FOREIGN KEY (course_id) REFERENCES courses(id)
-            )
-        """)
-        
-        # Create notifications table to notify students of new lessons and assignments
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS notifications (
-                -- Unique identifier for each notification
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- ID of the student receiving the notification
-                student_id INTEGER NOT NULL,
-                -- ID of the course
-                course_id INTEGER NOT NULL,
-                -- Type of notification: 'lesson', 'assignment'
-                notification_type TEXT NOT NULL,
-                -- Title of the notification
-                title TEXT NOT NULL,
-                -- Message content
-                message TEXT,
-                -- Link to the resource (lesson_id or assignment_id)
-                resource_id INTEGER,
-                -- Whether the notification has been read
-                is_read INTEGER DEFAULT 0,
-                -- Timestamp when notification was created
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Foreign keys
-                FOREIGN KEY (student_id) REFERENCES users(id),
-                FOREIGN KEY (course_id) REFERENCES courses(id)
-            )
-        """)
-        
-        # Create grades table to store assignment grades and teacher feedback
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS grades (
-                -- Unique identifier for each grade record
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- ID of the student being graded
-                student_id INTEGER NOT NULL,
-                -- ID of the assignment being graded
-                assignment_id INTEGER NOT NULL,
-                -- ID of the teacher giving the grade
-                teacher_id INTEGER NOT NULL,
-                -- Numeric grade (0-100)
-                grade REAL,
-                -- Feedback comments from the teacher
-                feedback TEXT,
-                -- Timestamp when grade was given
-                graded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Timestamp when last updated
-                updated_at TIMESTAMP,
-                -- Foreign keys
-                FOREIGN KEY (student_id) REFERENCES users(id),
-                FOREIGN KEY (assignment_id) REFERENCES assignments(id),
-                FOREIGN KEY (teacher_id) REFERENCES users(id)
-            )
-        """)
-        
-        # Create assignments table for course assignments
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS assignments (
-                -- Unique identifier for each assignment
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- ID of the course this assignment belongs to
-                course_id INTEGER NOT NULL,
-                -- Title of the assignment
-                title TEXT NOT NULL UNIQUE,
-                -- Description of the assignment
-                description TEXT,
-                -- Deadline for the assignment
-                deadline TEXT,
-                -- Foreign key linking to courses table
-                FOREIGN KEY (course_id) REFERENCES courses(id)
-            )
-        """)
-        
-        # Create comments table for course discussions and student interactions
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS comments (
-                -- Unique identifier for each comment
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                -- ID of the user posting the comment
-                user_id INTEGER NOT NULL,
-                -- ID of the course the comment is about
-                course_id INTEGER NOT NULL,
-                -- Content of the comment/message
-                message TEXT NOT NULL,
-                -- Timestamp when comment was created
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- Foreign keys
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (course_id) REFERENCES courses(id)
-            )
-        """)
-        
-        # Commit all changes to the database
-        conn.commit()
-    finally:
-        # Always close the connection, even if an error occurs
-        conn.close()
 
+# Process-wide event hub used by the /api/stream endpoints
+event_hub = EventHub()
 
-# Function to safely execute SELECT query with error handling
-def safe_count_query(query, db_name="lms.db"):
+
+@app.context_processor
+def inject_sse_enabled():
+    """Let templates open Server-Sent Events streams only when LMS_SSE is on."""
+    return {'sse_enabled': SSE_ENABLED}
+
+
+def sse_stream(subscription):
     """
-    Safely execute a COUNT query and return the count.
-    Returns 0 if table doesn't exist.
+    Generate a text/event-stream body for a subscription.
+    
+    Sends keep-alive comments while idle (so dead connections are noticed)
+    and ends after SSE_MAX_DURATION; the browser's EventSource reconnects.
     
     Args:
-        query (str): SQL query to execute
-        db_name (str): Name of the database file
+        subscription (EventSubscription): Open subscription, closed when the stream ends
     
-    Returns:
-        int: Count result or 0 if table doesn't exist
+    Yields:
+        str: SSE-formatted chunks
     """
-    conn = None
+    deadline = time.monotonic() + SSE_MAX_DURATION
     try:
-        conn = get_db_connection(db_name)
-        cursor = conn.cursor()
-        # Execute the SQL query
-        cursor.execute(query)
-        # Fetch the result and get the count value
-        result = cursor.fetchone()['count']
-        # Return the count
-        return result
-    except sqlite3.OperationalError:
-        # If table doesn't exist, return 0 instead of crashing
-        return 0
+        # Ask the browser to wait 5 seconds before reconnecting
+        yield "retry: 5000\n\n"
+        while time.monotonic() < deadline:
+            item = subscription.get(timeout=min(SSE_HEARTBEAT, max(deadline - time.monotonic(), 0.01)))
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            event, data = item
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
     finally:
-        # Always close the connection
-        if conn:
-            conn.close()
+        event_hub.unsubscribe(subscription)
+
+
+def sse_response(subscription):
+    """Wrap a subscription in a streaming text/event-stream response."""
+    response = app.response_class(sse_stream(subscription), mimetype='text/event-stream')
+    # The generator's finally only runs once it has started; this also covers a
+    # response closed before its first chunk was sent
+    response.call_on_close(lambda: event_hub.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    # Tell nginx-style reverse proxies not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Function to push a new lesson/assignment notification to connected students
+def push_course_notification(course_id, notification_type, title, message, resource_id):
+    """
+    Publish a notification event to the students of a course that have a stream open.
+    
+    Call after the lesson or assignment has been committed.
+    """
+    event_hub.publish(f"notify:{course_id}", 'notification', {
+        'course_id': course_id,
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'resource_id': resource_id,
+    })
 
 
 # Define route for homepage
@@ -435,14 +2870,12 @@ def home():
     Returns:
         Rendered HTML template with statistics
     """
-    # Safely count courses - returns 0 if courses table doesn't exist
-    courses_count = safe_count_query("SELECT COUNT(*) as count FROM courses")
-    
-    # Safely count topics - returns 0 if topics table doesn't exist
-    topics_count = safe_count_query("SELECT COUNT(*) as count FROM topics")
-    
-    # Safely count users - returns 0 if users table doesn't exist
-    users_count = safe_count_query("SELECT COUNT(*) as count FROM users")
+    # Counts kept by triggers in site_counters, served from memory for AGGREGATE_CACHE_TTL seconds
+    # (0 if the table doesn't exist yet)
+    counter_query = "SELECT value as count FROM site_counters WHERE name = ?"
+    courses_count = safe_count_query(counter_query, ('courses',))
+    topics_count = safe_count_query(counter_query, ('topics',))
+    users_count = safe_count_query(counter_query, ('users',))
     
     # Check if user is logged in
     is_logged_in = 'user_id' in session
@@ -587,19 +3020,11 @@ def login():
                 # Store full name in session
                 session['full_name'] = user['full_name']
                 
-                # Update last_login timestamp in database (execute in finally to ensure connection closing)
-                conn.commit()
-            finally:
-                # Always close the connection after initial query
-                conn.close()
-            
-            # Update last_login timestamp in database (outside initial connection)
-            conn = get_db_connection()
-            try:
-                cursor = conn.cursor()
+                # Update last_login timestamp in database on the same connection
                 cursor.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?", (user['id'],))
                 conn.commit()
             finally:
+                # Always close the connection
                 conn.close()
             
             # Redirect to appropriate dashboard based on user role
@@ -700,6 +3125,140 @@ def student_dashboard():
             conn.close()
 
 
+# Where teacher dashboard summaries are cached (select with LMS_TEACHER_SUMMARY_CACHE):
+# 'memory' - in this process only; a repeated dashboard load runs no query at all
+# 'shared' - in the `teacher_summaries` table, so every worker process sees the same invalidations;
+#            a repeated load is one primary-key lookup
+TEACHER_SUMMARY_CACHES = ('memory', 'shared')
+TEACHER_SUMMARY_CACHE = os.environ.get('LMS_TEACHER_SUMMARY_CACHE', 'memory')
+if TEACHER_SUMMARY_CACHE not in TEACHER_SUMMARY_CACHES:
+    raise ValueError(f"Unknown teacher summary cache '{TEACHER_SUMMARY_CACHE}' "
+                     f"(choose from {', '.join(TEACHER_SUMMARY_CACHES)})")
+
+# In-process summaries by teacher ID, and a generation per teacher bumped on every invalidation
+# so that a summary computed while the data changed is not stored
+_teacher_summaries = {}
+_teacher_summary_generations = {}
+_teacher_summaries_lock = threading.Lock()
+
+
+def compute_teacher_summary(cursor, teacher_id):
+    """
+    Run the teacher dashboard queries.
+    
+    Args:
+        cursor: Database cursor
+        teacher_id (int): ID of the teacher
+    
+    Returns:
+        dict: courses (list of dicts), total_students and total_assignments
+    """
+    # Fetch all courses created by this teacher
+    cursor.execute("""
+        SELECT id, title, description, created_at
+        FROM courses
+        WHERE teacher_id = ?
+        ORDER BY created_at DESC
+    """, (teacher_id,))
+    courses = [dict(row) for row in cursor.fetchall()]
+    
+    # Count total students enrolled in this teacher's courses
+    cursor.execute("""
+        SELECT COUNT(DISTINCT e.student_id) as count
+        FROM enrollments e
+        JOIN courses c ON e.course_id = c.id
+        WHERE c.teacher_id = ?
+    """, (teacher_id,))
+    total_students = cursor.fetchone()['count']
+    
+    # Count total assignments (questions) created
+    cursor.execute("""
+        SELECT COUNT(m.id) as count
+        FROM msqs m
+        JOIN topics t ON m.topic_id = t.id
+        JOIN courses c ON t.course_id = c.id
+        WHERE c.teacher_id = ?
+    """, (teacher_id,))
+    total_assignments = cursor.fetchone()['count']
+    
+    return {'courses': courses, 'total_students': total_students, 'total_assignments': total_assignments}
+
+
+def get_teacher_summary(conn, teacher_id):
+    """
+    Return a teacher's dashboard summary from the cache, computing it on a miss.
+    
+    The cache version (or in-process generation) is read before the
+    summary is computed, and the result is only stored if no invalidation
+    happened in between.
+    
+    Args:
+        conn: Database connection
+        teacher_id (int): ID of the teacher
+    
+    Returns:
+        dict: See compute_teacher_summary()
+    """
+    cursor = conn.cursor()
+    if TEACHER_SUMMARY_CACHE == 'memory':
+        with _teacher_summaries_lock:
+            summary = _teacher_summaries.get(teacher_id)
+            generation = _teacher_summary_generations.get(teacher_id, 0)
+        if summary is None:
+            summary = compute_teacher_summary(cursor, teacher_id)
+            with _teacher_summaries_lock:
+                if _teacher_summary_generations.get(teacher_id, 0) == generation:
+                    _teacher_summaries[teacher_id] = summary
+        return summary
+    
+    cursor.execute("""
+        SELECT version, summary FROM teacher_summaries WHERE teacher_id = ?
+    """, (teacher_id,))
+    row = cursor.fetchone()
+    if row and row['summary']:
+        return json.loads(row['summary'])
+    
+    version = row['version'] if row else 0
+    summary = compute_teacher_summary(cursor, teacher_id)
+    cursor.execute("""
+        INSERT INTO teacher_summaries (teacher_id, version, summary, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (teacher_id) DO UPDATE SET
+            summary = excluded.summary,
+            updated_at = excluded.updated_at
+        WHERE version = excluded.version
+    """, (teacher_id, version, json.dumps(summary)))
+    conn.commit()
+    return summary
+
+
+def invalidate_teacher_summary(conn, teacher_id):
+    """
+    Drop a teacher's cached dashboard summary.
+    
+    Call it after committing a change to the teacher's courses, their
+    questions or their enrollments. A summary being computed at the same
+    time is discarded instead of stored.
+    
+    Args:
+        conn: Database connection (committed)
+        teacher_id (int): ID of the teacher, or None (ignored)
+    """
+    if teacher_id is None:
+        return
+    with _teacher_summaries_lock:
+        _teacher_summaries.pop(teacher_id, None)
+        _teacher_summary_generations[teacher_id] = _teacher_summary_generations.get(teacher_id, 0) + 1
+    if TEACHER_SUMMARY_CACHE == 'shared':
+        conn.execute("""
+            INSERT INTO teacher_summaries (teacher_id, version) VALUES (?, 1)
+            ON CONFLICT (teacher_id) DO UPDATE SET
+                version = version + 1,
+                summary = NULL
+        """, (teacher_id,))
+        conn.commit()
+
+
 # Define route for teacher dashboard
 @app.route("/teacher_dashboard")
 def teacher_dashboard():
@@ -719,45 +3278,18 @@ def teacher_dashboard():
     # Check if user role is 'teacher'
     if session.get('role') != 'teacher':
         # Redirect to home if not a teacher (maybe a student)
-        return redirect(url_for('home'))
-    
-    conn = None
-    try:
-        # Establish connection to the database
-        conn = get_db_connection()
-        # Create cursor object to execute SQL queries
-        cursor = conn.cursor()
-        
-        # Fetch all courses created by this teacher
-        cursor.execute("""
-            SELECT id, title, description, created_at
-            FROM courses
-            WHERE teacher_id = ?
-            ORDER BY created_at DESC
-        """, (session['user_id'],))
-        # Fetch all results
-        my_courses = cursor.fetchall()
-        
-        # Count total students enrolled in this teacher's courses
-        cursor.execute("""
-            SELECT COUNT(DISTINCT e.student_id) as count
-            FROM enrollments e
-            JOIN courses c ON e.course_id = c.id
-            WHERE c.teacher_id = ?
-        """, (session['user_id'],))
-        # Get the count
-        total_students = cursor.fetchone()['count']
+        return redirect(url_for('home'))
+    
+    conn = None
+    try:
+        # Establish connection to the database
+        conn = get_db_connection()
         
-        # Count total assignments (questions) created
-        cursor.execute("""
-            SELECT COUNT(m.id) as count
-            FROM msqs m
-            JOIN topics t ON m.topic_id = t.id
-            JOIN courses c ON t.course_id = c.id
-            WHERE c.teacher_id = ?
-        """, (session['user_id'],))
-        # Get the count
-        total_assignments = cursor.fetchone()['count']
+        # Courses and totals from the summary cache (one lookup unless something changed)
+        summary = get_teacher_summary(conn, session['user_id'])
+        my_courses = summary['courses']
+        total_students = summary['total_students']
+        total_assignments = summary['total_assignments']
         
         # Pop one-time welcome message if present
         welcome = session.pop('welcome', None)
@@ -897,6 +3429,9 @@ def create_course():
             # Get the ID of the newly created course
             course_id = cursor.lastrowid
             
+            # The teacher's dashboard lists the new course
+            invalidate_teacher_summary(conn, session['user_id'])
+            
             # Render success message and new course ID
             return render_template('create_course.html', 
                                  success='Course created successfully!',
@@ -1077,34 +3612,26 @@ def create_lesson(course_id):
                 # Get the lesson ID that was just created
                 lesson_id = cursor.lastrowid
                 
-                # Fetch all students enrolled in the course to notify them
-                cursor.execute("""
-                    SELECT student_id FROM enrollments WHERE course_id = ?
-                """, (course_id,))
-                
-                students = cursor.fetchall()
+                # A new lesson lowers everyone's lesson completion (recomputed by a queued job)
+                enqueue_job(cursor, 'refresh_course_progress', {'course_id': course_id},
+                            course_id=course_id, created_by=session['user_id'])
                 
-                # Create notifications for all enrolled students
-                try:
-                    for student in students:
-                        cursor.execute("""
-                            INSERT INTO notifications (student_id, course_id, notification_type, title, message, resource_id)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """, (student['student_id'], course_id, 'lesson', 
-                              f"New Lesson: {title}", 
-                              f"A new lesson '{title}' has been added to the course.",
-                              lesson_id))
-                    print(f"Created notifications for {len(students)} enrolled students in lesson '{title}'")
-                except Exception as notif_error:
-                    print(f"Error creating notifications: {str(notif_error)}")
+                # Notify the enrolled students (course event or queued fan-out job)
+                notification = ('lesson', f"New Lesson: {title}",
+                                f"A new lesson '{title}' has been added to the course.", lesson_id)
+                notified = publish_course_notification(cursor, course_id, *notification,
+                                                       created_by=session['user_id'])
                 
-                # Commit the changes to the database
+                # Commit the lesson and its notification together
                 conn.commit()
                 
+                # Push the notification to students with an open stream
+                push_course_notification(course_id, *notification)
+                
                 # Render success message
                 return render_template('create_lesson.html', 
                                      course=course,
-                                     success='Lesson created successfully!')
+                                     success=f'Lesson created successfully! {notified}')
             except Exception as e:
                 conn.rollback()
                 raise
@@ -1253,29 +3780,23 @@ def delete_lesson(lesson_id):
             return render_template('error.html', error='Unauthorized!')
         
         try:
-            # Delete all submissions for questions in this lesson
-            cursor.execute("""
-                DELETE FROM submissions 
-                WHERE question_id IN (
-                    SELECT id FROM msqs WHERE topic_id = ?
-                )
-            """, (lesson_id,))
-            
-            # Delete all questions for this lesson
-            cursor.execute("""
-                DELETE FROM msqs WHERE topic_id = ?
-            """, (lesson_id,))
-            
             # Delete the lesson
             cursor.execute("""
                 DELETE FROM topics WHERE id = ?
             """, (lesson_id,))
             
+            # Queue the cascading delete of its questions and submissions
+            enqueue_job(cursor, 'delete_lesson_content', {'lesson_id': lesson_id, 'course_id': course_id},
+                        course_id=course_id, created_by=session['user_id'])
+            
             conn.commit()
         except Exception as e:
             conn.rollback()
             raise
         
+        # The lesson's questions no longer count on the dashboard
+        invalidate_teacher_summary(conn, session['user_id'])
+        
         return redirect(url_for('manage_course', course_id=course_id))
     
     except Exception as e:
@@ -1333,7 +3854,8 @@ def delete_assignment(assignment_id):
             return render_template('error.html', error='Unauthorized!')
         
         try:
-            # Delete all submissions for this question
+            # Delete all submissions for this question, taking them out of the student statistics
+            remove_submission_stats(cursor, course_id, 'question_id = ?', (assignment_id,))
             cursor.execute("""
                 DELETE FROM submissions WHERE question_id = ?
             """, (assignment_id,))
@@ -1343,11 +3865,18 @@ def delete_assignment(assignment_id):
                 DELETE FROM msqs WHERE id = ?
             """, (assignment_id,))
             
+            # One question less changes the progress of the whole course (recomputed by a queued job)
+            enqueue_job(cursor, 'refresh_course_progress', {'course_id': course_id},
+                        course_id=course_id, created_by=session['user_id'])
+            
             conn.commit()
+            invalidate_answer_keys([assignment_id])
         except Exception as e:
             conn.rollback()
             raise
         
+        invalidate_teacher_summary(conn, session['user_id'])
+        
         return redirect(url_for('manage_course', course_id=course_id))
     
     except Exception as e:
@@ -1463,32 +3992,27 @@ def create_assignment(course_id):
                 # Get the assignment ID that was just created
                 assignment_id = cursor.lastrowid
                 
-                # Fetch all students enrolled in the course to notify them
-                cursor.execute("""
-                    SELECT student_id FROM enrollments WHERE course_id = ?
-                """, (course_id,))
+                # A new question lowers everyone's completion (recomputed by a queued job)
+                enqueue_job(cursor, 'refresh_course_progress', {'course_id': course_id},
+                            course_id=course_id, created_by=session['user_id'])
                 
-                students = cursor.fetchall()
-                
-                # Create notifications for all enrolled students
-                try:
-                    for student in students:
-                        cursor.execute("""
-                            INSERT INTO notifications (student_id, course_id, notification_type, title, message, resource_id)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """, (student['student_id'], course_id, 'assignment', 
-                              f"New Assignment: {question[:50]}...", 
-                              f"A new assignment has been added: {question[:80]}",
-                              assignment_id))
-                    print(f"Created notifications for {len(students)} enrolled students in assignment: {question[:50]}...")
-                except Exception as notif_error:
-                    print(f"Error creating assignment notifications: {str(notif_error)}")
+                # Notify the enrolled students (course event or queued fan-out job)
+                notification = ('assignment', f"New Assignment: {question[:50]}...",
+                                f"A new assignment has been added: {question[:80]}", assignment_id)
+                notified = publish_course_notification(cursor, course_id, *notification,
+                                                       created_by=session['user_id'])
 
-                # Commit the changes to the database
+                # Commit the assignment and its notification together
                 conn.commit()
+                invalidate_teacher_summary(conn, session['user_id'])
+
+                # Push the notification to students with an open stream
+                push_course_notification(course_id, *notification)
 
                 # Render success message and select the topic that was used
-                return render_template('create_assignment.html', course=course, topics=topics, success='Assignment created successfully!', selected_topic_id=topic_id)
+                return render_template('create_assignment.html', course=course, topics=topics,
+                                       success=f'Assignment created successfully! {notified}',
+                                       selected_topic_id=topic_id)
             except Exception as e:
                 conn.rollback()
                 raise
@@ -1507,45 +4031,246 @@ def create_assignment(course_id):
             conn.close()
 
 
+# Lessons and questions per listing page
+LESSONS_PAGE_SIZE = 24
+ASSIGNMENTS_PAGE_SIZE = 20
+
+
+def parse_listing_args(args, names):
+    """
+    Read integer listing filters and the `after` cursor from query parameters.
+    
+    Args:
+        args: request.args
+        names (tuple): Filter parameter names, e.g. ('course_id', 'topic_id')
+    
+    Returns:
+        tuple: (filters dict, after or None, error message or None)
+    """
+    try:
+        filters = {name: int(args[name]) for name in names if args.get(name)}
+        after = int(args['after']) if args.get('after') else None
+    except ValueError:
+        return {}, None, f"Invalid {', '.join(names)} or after"
+    return filters, after, None
+
+
+def get_lessons_page(cursor, course_id=None, after=None, limit=LESSONS_PAGE_SIZE):
+    """
+    Load one page of lessons, newest first, keyed on topics.id.
+    
+    With a course filter the page is read from idx_topics_course_id, so
+    a page costs the same however many lessons exist.
+    
+    Args:
+        cursor: Database cursor
+        course_id (int): Only lessons of this course, or None
+        after (int): Last lesson ID of the previous page, or None
+        limit (int): Page size
+    
+    Returns:
+        tuple: (lessons, next_after or None)
+    """
+    conditions = []
+    params = []
+    if course_id is not None:
+        conditions.append('t.course_id = ?')
+        params.append(course_id)
+    if after is not None:
+        conditions.append('t.id < ?')
+        params.append(after)
+    params.append(limit + 1)
+    cursor.execute(f"""
+        SELECT t.id, t.title, t.subtitle, t.course_id, c.title as course_title
+        FROM topics t
+        LEFT JOIN courses c ON t.course_id = c.id
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY t.id DESC
+        LIMIT ?
+    """, params)
+    lessons = cursor.fetchall()
+    
+    next_after = None
+    if len(lessons) > limit:
+        lessons = lessons[:limit]
+        next_after = lessons[-1]['id']
+    return lessons, next_after
+
+
+def get_assignments_page(cursor, course_id=None, topic_id=None, after=None, limit=ASSIGNMENTS_PAGE_SIZE):
+    """
+    Load one page of questions, newest first, keyed on msqs.id.
+    
+    Args:
+        cursor: Database cursor
+        course_id (int): Only questions of this course's lessons, or None
+        topic_id (int): Only questions of this lesson, or None
+        after (int): Last question ID of the previous page, or None
+        limit (int): Page size
+    
+    Returns:
+        tuple: (questions, next_after or None)
+    """
+    conditions = []
+    params = []
+    if course_id is not None:
+        conditions.append('t.course_id = ?')
+        params.append(course_id)
+    if topic_id is not None:
+        conditions.append('m.topic_id = ?')
+        params.append(topic_id)
+    if after is not None:
+        conditions.append('m.id < ?')
+        params.append(after)
+    params.append(limit + 1)
+    cursor.execute(f"""
+        SELECT m.id, m.question, m.topic_id, t.title as topic_title, t.course_id,
+               m.option_a, m.option_b, m.option_c, m.option_d
+        FROM msqs m
+        LEFT JOIN topics t ON m.topic_id = t.id
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY m.id DESC
+        LIMIT ?
+    """, params)
+    questions = cursor.fetchall()
+    
+    next_after = None
+    if len(questions) > limit:
+        questions = questions[:limit]
+        next_after = questions[-1]['id']
+    return questions, next_after
+
+
 # Define route for lessons page
 @app.route("/lessons")
 def lessons():
     """
-    Render the lessons page with all available topics/lessons.
+    Render one page of lessons, newest first.
     
-    Fetches lesson data from topics table joined with courses table.
+    Query parameters: course_id (optional filter) and after (cursor from
+    the previous page). The total comes from a cached aggregate.
     
     Returns:
         Rendered HTML template with lessons data
     """
+    filters, after, error = parse_listing_args(request.args, ('course_id',))
+    course_id = filters.get('course_id')
+    lessons_data, next_after, total, course_title = [], None, 0, None
     conn = None
-    try:
-        # Try to fetch lessons from database
-        # Establish connection to the database
-        conn = get_db_connection()
-        # Create cursor object to execute SQL queries
-        cursor = conn.cursor()
-        
-        # Execute SQL query to fetch all lessons with related course information
-        cursor.execute("""
-            SELECT t.id, t.title, t.subtitle, c.title as course_title 
-            FROM topics t 
-            LEFT JOIN courses c ON t.course_id = c.id
-            ORDER BY t.id DESC
-        """)
-        # Fetch all results from the query and store in lessons_data list
-        lessons_data = cursor.fetchall()
-    except sqlite3.OperationalError:
-        # If topics table doesn't exist, return empty list
-        lessons_data = []
-    finally:
-        # Always close the connection
-        if conn:
-            conn.close()
+    if not error:
+        try:
+            # Establish connection to the database
+            conn = get_db_connection()
+            # Create cursor object to execute SQL queries
+            cursor = conn.cursor()
+            
+            lessons_data, next_after = get_lessons_page(cursor, course_id, after)
+            
+            if course_id is None:
+                # Kept by triggers in site_counters, cached for AGGREGATE_CACHE_TTL seconds
+                total = safe_count_query("SELECT value as count FROM site_counters WHERE name = ?", ('topics',))
+            else:
+                total = safe_count_query("SELECT COUNT(*) as count FROM topics WHERE course_id = ?", (course_id,))
+                cursor.execute("""
+                    SELECT title FROM courses WHERE id = ?
+                """, (course_id,))
+                course = cursor.fetchone()
+                course_title = course['title'] if course else None
+        except sqlite3.OperationalError:
+            # If topics table doesn't exist, return empty list
+            lessons_data = []
+        finally:
+            # Always close the connection
+            if conn:
+                conn.close()
+    
+    return render_template('lessons.html',
+                         lessons=lessons_data,
+                         next_after=next_after,
+                         total=total,
+                         filters=filters,
+                         course_title=course_title,
+                         error=error)
+
+
+# Rendered lesson bodies kept in memory (least recently used are dropped first)
+LESSON_PAGE_CACHE_SIZE = 500
+
+# Rendered lesson bodies: {(lesson ID, topics.version): (title, body Markup)}
+_lesson_pages = OrderedDict()
+_lesson_pages_lock = threading.Lock()
+
+# Digest of the lesson page templates, part of every lesson ETag so a deploy never gets a stale 304
+_lesson_template_digest = None
+
+
+def lesson_template_digest():
+    """Return a short digest of the templates a lesson page is rendered from."""
+    global _lesson_template_digest
+    if _lesson_template_digest is None:
+        digest = hashlib.sha1()
+        for name in ('base.html', 'lesson_detail.html', 'lesson_body.html'):
+            source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+            digest.update(source.encode('utf-8'))
+        _lesson_template_digest = digest.hexdigest()[:8]
+    return _lesson_template_digest
+
+
+def lesson_page_etag(lesson_id, version):
+    """
+    Build the strong ETag of a lesson page for the current visitor.
+    
+    The navigation bar shows the visitor's name and role, so they are
+    part of the tag along with the lesson version and the templates.
+    """
+    viewer = hashlib.sha1(f"{session.get('role')}|{session.get('full_name')}".encode('utf-8')).hexdigest()[:8]
+    return f"lesson-{lesson_id}-{version}-{viewer}-{lesson_template_digest()}"
+
+
+def get_lesson_body(cursor, lesson_id, version):
+    """
+    Return a lesson's rendered body, from the cache or by rendering it.
+    
+    Args:
+        cursor: Database cursor
+        lesson_id (int): ID of the lesson
+        version (int): Current topics.version of the lesson
     
-    # Render lessons.html template and pass lessons data as variable
-    # The template can loop through this data with {% for lesson in lessons %}
-    return render_template('lessons.html', lessons=lessons_data)
+    Returns:
+        tuple: (lesson title, body Markup)
+    """
+    key = (lesson_id, version)
+    with _lesson_pages_lock:
+        if key in _lesson_pages:
+            _lesson_pages.move_to_end(key)
+            return _lesson_pages[key]
+    
+    # Fetch the specific lesson details
+    cursor.execute("""
+        SELECT t.id, t.title, t.subtitle, t.content, c.id as course_id, c.title as course_title
+        FROM topics t
+        LEFT JOIN courses c ON t.course_id = c.id
+        WHERE t.id = ?
+    """, (lesson_id,))
+    lesson = cursor.fetchone()
+    
+    # Fetch all questions/assignments for this lesson
+    cursor.execute("""
+        SELECT id, question, option_a, option_b, option_c, option_d, correct_answer
+        FROM msqs
+        WHERE topic_id = ?
+        ORDER BY id ASC
+    """, (lesson_id,))
+    questions = cursor.fetchall()
+    
+    page = (lesson['title'], Markup(render_template('lesson_body.html', lesson=lesson, questions=questions)))
+    with _lesson_pages_lock:
+        _lesson_pages[key] = page
+        # Older versions of the lesson are never asked for again
+        _lesson_pages.pop((lesson_id, version - 1), None)
+        while len(_lesson_pages) > LESSON_PAGE_CACHE_SIZE:
+            _lesson_pages.popitem(last=False)
+    return page
 
 
 # Define route for viewing a specific lesson
@@ -1554,43 +4279,61 @@ def view_lesson(lesson_id):
     """
     Display a specific lesson with its content and details.
     
+    The lesson body is rendered once per lesson version (see
+    migration_018_lesson_versions) and cached; a request costs one
+    primary-key lookup of the version. Responses carry a strong ETag and
+    Last-Modified, and a browser or proxy revalidating an unchanged page
+    gets 304 Not Modified with no body.
+    
     Args:
         lesson_id (int): ID of the lesson/topic to view
     
     Returns:
-        Rendered lesson detail page
+        Rendered lesson detail page, or an empty 304 response
     """
     conn = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Fetch the specific lesson details
         cursor.execute("""
-            SELECT t.id, t.title, t.subtitle, t.content, c.id as course_id, c.title as course_title
-            FROM topics t
-            LEFT JOIN courses c ON t.course_id = c.id
-            WHERE t.id = ?
+            SELECT id, course_id, version, updated_at FROM topics WHERE id = ?
         """, (lesson_id,))
-        
         lesson = cursor.fetchone()
         
         if not lesson:
             return render_template('error.html', error='Lesson not found!')
         
-        # Fetch all questions/assignments for this lesson
-        cursor.execute("""
-            SELECT id, question, option_a, option_b, option_c, option_d, correct_answer
-            FROM msqs
-            WHERE topic_id = ?
-            ORDER BY id ASC
-        """, (lesson_id,))
-        
-        questions = cursor.fetchall()
+        # A student's first view of the lesson counts towards their course progress
+        if session.get('role') == 'student' and lesson['course_id']:
+            if record_lesson_view(cursor, session['user_id'], lesson_id, lesson['course_id']):
+                conn.commit()
         
-        return render_template('lesson_detail.html', 
-                             lesson=lesson,
-                             questions=questions)
+        etag = lesson_page_etag(lesson_id, lesson['version'])
+        last_modified = None
+        if lesson['updated_at']:
+            last_modified = datetime.strptime(lesson['updated_at'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+        
+        # If-None-Match wins over If-Modified-Since when both are sent
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            not_modified = bool(last_modified and request.if_modified_since
+                                and request.if_modified_since >= last_modified)
+        
+        if not_modified:
+            response = app.response_class(status=304)
+        else:
+            title, body = get_lesson_body(cursor, lesson_id, lesson['version'])
+            response = app.response_class(render_template('lesson_detail.html', title=title, body=body),
+                                          mimetype='text/html')
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        # Revalidate on every use; the page is personal (navigation bar) for logged-in visitors
+        response.headers['Cache-Control'] = 'private, no-cache' if 'user_id' in session else 'public, no-cache'
+        response.vary.add('Cookie')
+        return response
     
     except Exception as e:
         return render_template('error.html', error='Error loading lesson!')
@@ -1599,58 +4342,316 @@ def view_lesson(lesson_id):
             conn.close()
 
 
+# Courses per catalog page, and the largest page the API serves
+CATALOG_PAGE_SIZE = 24
+CATALOG_MAX_PAGE_SIZE = 100
+
+# Course columns the catalog can be filtered on with an exact match
+CATALOG_FILTERS = ('level', 'course_type', 'duration')
+
+
+def parse_catalog_args(args):
+    """
+    Read the catalog filters and cursor from query parameters.
+    
+    Args:
+        args: request.args (level, course_type, duration, teacher_id,
+              enrolled = 'yes'/'no', after, limit)
+    
+    Returns:
+        tuple: (filters dict, after or None, limit, error message or None)
+    """
+    filters = {name: args.get(name, '').strip() for name in CATALOG_FILTERS if args.get(name, '').strip()}
+    try:
+        if args.get('teacher_id'):
+            filters['teacher_id'] = int(args['teacher_id'])
+        after = int(args['after']) if args.get('after') else None
+        limit = min(max(int(args.get('limit', CATALOG_PAGE_SIZE)), 1), CATALOG_MAX_PAGE_SIZE)
+    except ValueError:
+        return {}, None, CATALOG_PAGE_SIZE, 'Invalid teacher_id, after or limit'
+    enrolled = args.get('enrolled', '')
+    if enrolled not in ('', 'yes', 'no'):
+        return {}, None, CATALOG_PAGE_SIZE, "enrolled must be 'yes' or 'no'"
+    if enrolled:
+        filters['enrolled'] = enrolled
+    return filters, after, limit, None
+
+
+def get_course_catalog(cursor, filters, student_id=None, after=None, limit=CATALOG_PAGE_SIZE):
+    """
+    Load one page of the course catalog, newest first.
+    
+    Pages are keyed on courses.id (`after` is the last ID of the previous
+    page), so every page costs the same however deep it is. For a student
+    the enrollment is joined in the same query: the `enrolled` filter is
+    an anti-join (no matching enrollment) or its inverse.
+    
+    Args:
+        cursor: Database cursor
+        filters (dict): From parse_catalog_args(); 'enrolled' needs a student_id
+        student_id (int): ID of the logged-in student, or None
+        after (int): Last course ID of the previous page, or None
+        limit (int): Page size
+    
+    Returns:
+        tuple: (courses, next_after or None)
+    """
+    conditions = []
+    params = []
+    if student_id is not None:
+        enrollment_columns = 'e.id IS NOT NULL AS enrolled, e.progress, e.enrolled_at'
+        enrollment_join = 'LEFT JOIN enrollments e ON e.course_id = c.id AND e.student_id = ?'
+        params.append(student_id)
+        if filters.get('enrolled') == 'yes':
+            conditions.append('e.id IS NOT NULL')
+        elif filters.get('enrolled') == 'no':
+            conditions.append('e.id IS NULL')
+    else:
+        enrollment_columns = '0 AS enrolled, NULL AS progress, NULL AS enrolled_at'
+        enrollment_join = ''
+    
+    for name in CATALOG_FILTERS:
+        if name in filters:
+            conditions.append(f'c.{name} = ?')
+            params.append(filters[name])
+    if 'teacher_id' in filters:
+        conditions.append('c.teacher_id = ?')
+        params.append(filters['teacher_id'])
+    if after is not None:
+        conditions.append('c.id < ?')
+        params.append(after)
+    
+    # One extra row tells whether there is a next page
+    params.append(limit + 1)
+    cursor.execute(f"""
+        SELECT c.id, c.title, c.description, c.course_id, c.level, c.course_type, c.duration,
+               c.teacher_id, u.full_name as teacher_name, {enrollment_columns}
+        FROM courses c
+        LEFT JOIN users u ON c.teacher_id = u.id
+        {enrollment_join}
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY c.id DESC
+        LIMIT ?
+    """, params)
+    courses = cursor.fetchall()
+    
+    next_after = None
+    if len(courses) > limit:
+        courses = courses[:limit]
+        next_after = courses[-1]['id']
+    return courses, next_after
+
+
 # Define route for courses page
 @app.route("/course")
 def course():
     """
-    Render the courses page with all available courses.
-    Shows enrolled courses if student is logged in, otherwise shows all courses.
+    Render one page of the course catalog.
+    
+    Supports the filters of parse_catalog_args(). Logged-in students see
+    which courses they are enrolled in, with their progress.
     
     Returns:
-        Rendered HTML template with courses data
+        Rendered HTML template with a page of courses
     """
-    enrolled_courses = []
-    all_courses = []
     user_id = session.get('user_id')
     user_role = session.get('role')
+    student_id = user_id if user_role == 'student' else None
+    filters, after, limit, error = parse_catalog_args(request.args)
+    courses, next_after = [], None
     conn = None
     
+    if not error:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            courses, next_after = get_course_catalog(cursor, filters, student_id, after, limit)
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            if conn:
+                conn.close()
+    
+    # Query string of the active filters and page size, for the paging links
+    filter_args = {name: value for name, value in request.args.items() if name != 'after'}
+    
+    return render_template('course.html',
+                         courses=courses,
+                         next_after=next_after,
+                         filters=filters,
+                         filter_args=filter_args,
+                         error=error,
+                         is_logged_in=user_id is not None,
+                         is_student=user_role == 'student')
+
+
+# Define route for the course catalog API
+@app.route("/api/courses")
+def api_courses():
+    """
+    Return one page of the course catalog as JSON.
+    
+    Takes the query parameters of parse_catalog_args(); pass the returned
+    `next_after` as `after` to get the next page.
+    
+    Returns:
+        JSON response with courses and next_after (null on the last page)
+    """
+    student_id = session.get('user_id') if session.get('role') == 'student' else None
+    filters, after, limit, error = parse_catalog_args(request.args)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    conn = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        
-        # Get all courses
-        cursor.execute("""
-            SELECT c.id, c.title, c.description, c.course_id, u.full_name as teacher_name
-            FROM courses c
-            LEFT JOIN users u ON c.teacher_id = u.id
-            ORDER BY c.id DESC
-        """)
-        all_courses = cursor.fetchall()
-        
-        # If student is logged in, get their enrolled courses
-        if user_id and user_role == 'student':
-            cursor.execute("""
-                SELECT c.id, c.title, c.description, c.course_id, u.full_name as teacher_name, 
-                       e.progress, e.enrolled_at
-                FROM courses c
-                LEFT JOIN users u ON c.teacher_id = u.id
-                LEFT JOIN enrollments e ON c.id = e.course_id
-                WHERE e.student_id = ? AND e.student_id IS NOT NULL
-                ORDER BY c.id DESC
-            """, (user_id,))
-            enrolled_courses = cursor.fetchall()
-    except sqlite3.OperationalError:
-        pass
+        courses, next_after = get_course_catalog(cursor, filters, student_id, after, limit)
+        return jsonify({'success': True,
+                        'courses': [dict(row, enrolled=bool(row['enrolled'])) for row in courses],
+                        'next_after': next_after})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
     finally:
         if conn:
             conn.close()
+
+
+# Results per search page, and the deepest page served (ranked results are paged with OFFSET)
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE = 50
+
+# Highlight markers passed to FTS5; the text around them is HTML-escaped before they become <mark> tags
+SEARCH_MARK_OPEN = '\x02'
+SEARCH_MARK_CLOSE = '\x03'
+
+
+def build_search_query(text):
+    """
+    Turn a search box string into an FTS5 query.
     
-    return render_template('course.html', 
-                         all_courses=all_courses,
-                         enrolled_courses=enrolled_courses,
-                         is_logged_in=user_id is not None,
-                         is_student=user_role == 'student')
+    Every word must match (implicit AND) and the last word also matches
+    as a prefix, so results appear while typing. Words are quoted, which
+    keeps FTS5 operators and punctuation in the input from being parsed.
+    
+    Args:
+        text (str): What the user typed
+    
+    Returns:
+        str: FTS5 MATCH expression, or None if there are no words
+    """
+    words = re.findall(r'\w+', text or '')[:16]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def search_markup(text):
+    """HTML-escape an FTS5 highlight/snippet and turn its markers into <mark> tags."""
+    return Markup(str(escape(text or ''))
+                  .replace(SEARCH_MARK_OPEN, '<mark>').replace(SEARCH_MARK_CLOSE, '</mark>'))
+
+
+def search_content(cursor, text, kind=None, page=1, limit=SEARCH_PAGE_SIZE):
+    """
+    Search courses, lessons and questions, best matches first.
+    
+    Results are ranked with BM25, title matches weighing ten times body
+    matches, and come with a highlighted title and a snippet of the body.
+    
+    Args:
+        cursor: Database cursor
+        text (str): What the user typed
+        kind (str): 'course', 'lesson' or 'question' to search one kind only
+        page (int): 1-based page number
+        limit (int): Results per page
+    
+    Returns:
+        tuple: (list of result dicts with kind, id, parent_id, title, snippet; has_next)
+    """
+    query = build_search_query(text)
+    if query is None:
+        return [], False
+    
+    kind_filter = ''
+    params = [SEARCH_MARK_OPEN, SEARCH_MARK_CLOSE, SEARCH_MARK_OPEN, SEARCH_MARK_CLOSE, query]
+    if kind:
+        kind_filter = 'AND rowid % 4 = ?'
+        params.append({name: code for code, name in SEARCH_KINDS.items()}[kind])
+    params += [limit + 1, (page - 1) * limit]
+    cursor.execute(f"""
+        SELECT rowid, parent_id,
+               highlight(search_index, 0, ?, ?) AS title,
+               snippet(search_index, 1, ?, ?, '…', 24) AS snippet
+        FROM search_index
+        WHERE search_index MATCH ? {kind_filter}
+        ORDER BY bm25(search_index, 10.0, 1.0)
+        LIMIT ? OFFSET ?
+    """, params)
+    rows = cursor.fetchall()
+    
+    results = [{'kind': SEARCH_KINDS[row['rowid'] % 4], 'id': row['rowid'] // 4, 'parent_id': row['parent_id'],
+                'title': search_markup(row['title']), 'snippet': search_markup(row['snippet'])}
+               for row in rows[:limit]]
+    return results, len(rows) > limit
+
+
+# Define route for full-text search
+@app.route("/search")
+def search():
+    """
+    Search courses, lessons and questions.
+    
+    Query parameters: q (search text), type ('course', 'lesson' or
+    'question', optional) and page.
+    
+    Returns:
+        Rendered search page with ranked, highlighted results
+    """
+    text = request.args.get('q', '').strip()
+    kind = request.args.get('type', '')
+    if kind not in SEARCH_KINDS.values():
+        kind = ''
+    try:
+        page = min(max(int(request.args.get('page', 1)), 1), SEARCH_MAX_PAGE)
+    except ValueError:
+        page = 1
+    
+    results, has_next, error = [], False, None
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        results, has_next = search_content(cursor, text, kind or None, page)
+    except sqlite3.OperationalError as e:
+        print(f"Search failed for {text!r}: {e}")
+        error = 'Search is not available right now.'
+    finally:
+        if conn:
+            conn.close()
+    
+    return render_template('search.html',
+                         q=text,
+                         kind=kind,
+                         page=page,
+                         results=results,
+                         has_next=has_next and page < SEARCH_MAX_PAGE,
+                         error=error,
+                         is_teacher=session.get('role') == 'teacher')
+
+
+# Flask CLI command: flask --app app rebuild-search
+@app.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Rebuild the full-text search index from courses, lessons and questions."""
+    conn = get_db_connection()
+    try:
+        started = time.perf_counter()
+        indexed = rebuild_search_index(conn.cursor())
+        conn.commit()
+        print(f"Indexed {indexed} document(s) in {(time.perf_counter() - started):.1f} s")
+    finally:
+        conn.close()
 
 
 # Define route for learning a specific course (student view)
@@ -1731,17 +4732,8 @@ def learn_course(course_id):
         
         assignments = cursor.fetchall()
         
-        # Count student's correct submissions for this course
-        cursor.execute("""
-            SELECT COUNT(*) as total_correct
-            FROM submissions s
-            JOIN msqs m ON s.question_id = m.id
-            JOIN topics t ON m.topic_id = t.id
-            WHERE s.student_id = ? AND t.course_id = ? AND s.is_correct = 1
-        """, (session['user_id'], course_id))
-        
-        stats = cursor.fetchone()
-        correct_submissions = stats['total_correct'] if stats else 0
+        # Student's correct submissions for this course, from the student_stats read model
+        correct_submissions = get_student_stats(cursor, session['user_id'], course_id)['correct']
         
         return render_template('learn_course.html',
                              course=course,
@@ -1762,47 +4754,62 @@ def learn_course(course_id):
             conn.close()
 
 
-# Define route for assignments page
-@app.route("/assignments")
-def assignments():
-    """
-    Render the assignments page with quiz questions.
-    
-    Fetches multiple choice questions from msqs table with related topic info.
-    
-    Returns:
-        Rendered HTML template with assignments data
-    """
-    conn = None
-    try:
-        # Try to fetch assignments from database
-        # Establish connection to the database
-        conn = get_db_connection()
-        # Create cursor object to execute SQL queries
-        cursor = conn.cursor()
-        
-        # Execute SQL query to fetch all multiple choice questions
-        cursor.execute("""
-            SELECT m.id, m.question, t.title as topic_title, 
-                   m.option_a, m.option_b, m.option_c, m.option_d
-            FROM msqs m 
-            LEFT JOIN topics t ON m.topic_id = t.id
-            ORDER BY m.id DESC
-            LIMIT 20
-        """)
-        # Fetch all results from the query and store in assignments_data list
-        assignments_data = cursor.fetchall()
-    except sqlite3.OperationalError:
-        # If msqs table doesn't exist, return empty list
-        assignments_data = []
-    finally:
-        # Always close the connection
-        if conn:
-            conn.close()
+# Define route for assignments page
+@app.route("/assignments")
+def assignments():
+    """
+    Render one page of quiz questions, newest first.
+    
+    Query parameters: course_id and topic_id (optional filters) and after
+    (cursor from the previous page). The total comes from a cached aggregate.
+    
+    Returns:
+        Rendered HTML template with assignments data
+    """
+    filters, after, error = parse_listing_args(request.args, ('course_id', 'topic_id'))
+    assignments_data, next_after, total, topic_title = [], None, 0, None
+    conn = None
+    if not error:
+        try:
+            # Establish connection to the database
+            conn = get_db_connection()
+            # Create cursor object to execute SQL queries
+            cursor = conn.cursor()
+            
+            assignments_data, next_after = get_assignments_page(cursor, filters.get('course_id'),
+                                                                filters.get('topic_id'), after)
+            
+            if 'topic_id' in filters:
+                total = safe_count_query("SELECT COUNT(*) as count FROM msqs WHERE topic_id = ?",
+                                         (filters['topic_id'],))
+                cursor.execute("""
+                    SELECT title FROM topics WHERE id = ?
+                """, (filters['topic_id'],))
+                topic = cursor.fetchone()
+                topic_title = topic['title'] if topic else None
+            elif 'course_id' in filters:
+                total = safe_count_query("""
+                    SELECT COUNT(*) as count FROM topics t JOIN msqs m ON m.topic_id = t.id
+                    WHERE t.course_id = ?
+                """, (filters['course_id'],))
+            else:
+                # Kept by triggers in site_counters, cached for AGGREGATE_CACHE_TTL seconds
+                total = safe_count_query("SELECT value as count FROM site_counters WHERE name = ?", ('msqs',))
+        except sqlite3.OperationalError:
+            # If msqs table doesn't exist, return empty list
+            assignments_data = []
+        finally:
+            # Always close the connection
+            if conn:
+                conn.close()
     
-    # Render assignments.html template and pass assignments data as variable
-    # The template can loop through this data with {% for assignment in assignments %}
-    return render_template('assignments.html', assignments=assignments_data)
+    return render_template('assignments.html',
+                         assignments=assignments_data,
+                         next_after=next_after,
+                         total=total,
+                         filters=filters,
+                         topic_title=topic_title,
+                         error=error)
 
 
 # Define route for enrolling in a course
@@ -1840,8 +4847,19 @@ def enroll_course(course_id):
             VALUES (?, ?)
         """, (session['user_id'], course_id))
         
+        # Count questions already answered towards the new enrollment's progress
+        count_enrollment_progress(cursor, session['user_id'], course_id)
+        
         # Commit the changes to the database
         conn.commit()
+        
+        # The course's teacher has one more student
+        cursor.execute("""
+            SELECT teacher_id FROM courses WHERE id = ?
+        """, (course_id,))
+        course = cursor.fetchone()
+        if course:
+            invalidate_teacher_summary(conn, course['teacher_id'])
     except sqlite3.IntegrityError:
         # Handle case where enrollment already exists (duplicate key)
         pass
@@ -1902,38 +4920,25 @@ def mark_attendance(lesson_id):
             # Get form data for all students
             attendance_data = request.form.to_dict()
             
+            # Collect (student_id, status) pairs from the form
+            records = []
+            for key, value in attendance_data.items():
+                if key.startswith('attendance_'):
+                    try:
+                        student_id = int(key.split('_')[1])
+                    except (ValueError, IndexError):
+                        continue
+                    if value in ATTENDANCE_STATUSES:
+                        records.append([student_id, value])
+            
             try:
-                # Process each student
-                for key, value in attendance_data.items():
-                    if key.startswith('attendance_'):
-                        try:
-                            student_id = int(key.split('_')[1])
-                            status = value  # 'present', 'absent', 'late'
-                            
-                            # Check if attendance record exists for today
-                            cursor.execute("""
-                                SELECT id FROM attendance
-                                WHERE student_id = ? AND lesson_id = ? AND DATE(lesson_date) = DATE('now')
-                            """, (student_id, lesson_id))
-                            
-                            existing = cursor.fetchone()
-                            
-                            if existing:
-                                # Update existing record
-                                cursor.execute("""
-                                    UPDATE attendance
-                                    SET status = ?
-                                    WHERE student_id = ? AND lesson_id = ? AND DATE(lesson_date) = DATE('now')
-                                """, (status, student_id, lesson_id))
-                            else:
-                                # Insert new record
-                                cursor.execute("""
-                                    INSERT INTO attendance (student_id, lesson_id, course_id, status)
-                                    VALUES (?, ?, ?, ?)
-                                """, (student_id, lesson_id, course_id, status))
-                        except (ValueError, IndexError):
-                            continue
-                
+                # Queue the save; a background worker writes the attendance rows.
+                # The session day is fixed now so a job run after midnight still saves today's sheet.
+                if records:
+                    enqueue_job(cursor, 'save_attendance',
+                                {'lesson_id': lesson_id, 'course_id': course_id, 'records': records,
+                                 'session_date': time.strftime('%Y-%m-%d', time.gmtime())},
+                                course_id=course_id, created_by=session['user_id'])
                 conn.commit()
             except Exception as e:
                 conn.rollback()
@@ -1955,7 +4960,7 @@ def mark_attendance(lesson_id):
         # Fetch today's attendance records for this lesson
         cursor.execute("""
             SELECT student_id, status FROM attendance
-            WHERE lesson_id = ? AND DATE(lesson_date) = DATE('now')
+            WHERE lesson_id = ? AND session_date = DATE('now')
         """, (lesson_id,))
         
         attendance_records = {row['student_id']: row['status'] for row in cursor.fetchall()}
@@ -1973,13 +4978,221 @@ def mark_attendance(lesson_id):
             conn.close()
 
 
+# Students shown per attendance report page
+ATTENDANCE_PAGE_SIZE = 50
+
+
+def get_attendance_report(cursor, course_id, after=None, limit=ATTENDANCE_PAGE_SIZE, date_range=None):
+    """
+    Load the lessons and one page of students of a course's attendance report.
+    
+    Without a date range the counts come from the attendance summaries, not
+    from the attendance rows. With one they are counted from the sessions
+    in the range (through idx_attendance_course_date), for the lessons and
+    for the current page of students only. Students are ordered by name and
+    paged with a (full_name, id) keyset.
+    
+    Args:
+        cursor: Database cursor
+        course_id (int): ID of the course
+        after (list): [full_name, id] of the previous page's last student, or None
+        limit (int): Page size
+        date_range (tuple): ('YYYY-MM-DD', 'YYYY-MM-DD') inclusive, or None for all sessions
+    
+    Returns:
+        tuple: (lessons, students, next_after or None, number of enrolled students)
+    """
+    if date_range is None:
+        cursor.execute("""
+            SELECT t.id, t.title,
+                   COALESCE(s.present, 0) AS present, COALESCE(s.late, 0) AS late, COALESCE(s.absent, 0) AS absent
+            FROM topics t
+            LEFT JOIN attendance_lesson_summary s ON s.lesson_id = t.id
+            WHERE t.course_id = ?
+            ORDER BY t.created_at ASC
+        """, (course_id,))
+    else:
+        cursor.execute("""
+            SELECT t.id, t.title,
+                   COALESCE(s.present, 0) AS present, COALESCE(s.late, 0) AS late, COALESCE(s.absent, 0) AS absent
+            FROM topics t
+            LEFT JOIN (
+                SELECT lesson_id, SUM(status = 'present') AS present, SUM(status = 'late') AS late,
+                       SUM(status = 'absent') AS absent
+                FROM attendance
+                WHERE course_id = ? AND session_date BETWEEN ? AND ?
+                GROUP BY lesson_id
+            ) s ON s.lesson_id = t.id
+            WHERE t.course_id = ?
+            ORDER BY t.created_at ASC
+        """, (course_id, date_range[0], date_range[1], course_id))
+    lessons = cursor.fetchall()
+    
+    cursor.execute("""
+        SELECT COUNT(*) AS count FROM enrollments WHERE course_id = ?
+    """, (course_id,))
+    total_students = cursor.fetchone()['count']
+    
+    keyset = ''
+    params = [course_id]
+    if after is not None:
+        keyset = 'AND (u.full_name, u.id) > (?, ?)'
+        params += after
+    cursor.execute(f"""
+        SELECT u.id, u.full_name,
+               COALESCE(s.present, 0) AS present, COALESCE(s.late, 0) AS late, COALESCE(s.absent, 0) AS absent
+        FROM enrollments e
+        JOIN users u ON u.id = e.student_id
+        LEFT JOIN attendance_student_summary s ON s.course_id = e.course_id AND s.student_id = e.student_id
+        WHERE e.course_id = ? {keyset}
+        ORDER BY u.full_name, u.id
+        LIMIT ?
+    """, params + [limit + 1])
+    students = [dict(row) for row in cursor.fetchall()]
+    
+    next_after = None
+    if len(students) > limit:
+        students = students[:limit]
+        next_after = [students[-1]['full_name'], students[-1]['id']]
+    
+    if date_range is not None and students:
+        # Replace the all-time counts with the counts inside the range
+        cursor.execute(f"""
+            SELECT student_id, SUM(status = 'present') AS present, SUM(status = 'late') AS late,
+                   SUM(status = 'absent') AS absent
+            FROM attendance
+            WHERE course_id = ? AND session_date BETWEEN ? AND ?
+              AND student_id IN ({', '.join('?' * len(students))})
+            GROUP BY student_id
+        """, [course_id, date_range[0], date_range[1]] + [student['id'] for student in students])
+        counts = {row['student_id']: row for row in cursor.fetchall()}
+        for student in students:
+            for status in ATTENDANCE_STATUSES:
+                student[status] = counts[student['id']][status] if student['id'] in counts else 0
+    
+    return lessons, students, next_after, total_students
+
+
+def get_attendance_matrix(cursor, course_id, student_ids, date_range=None):
+    """
+    Return the latest attendance status of each (student, lesson) pair.
+    
+    Args:
+        cursor: Database cursor
+        course_id (int): ID of the course
+        student_ids (list): Students of the current report page
+        date_range (tuple): ('YYYY-MM-DD', 'YYYY-MM-DD') inclusive, or None for all sessions
+    
+    Returns:
+        dict: {(student_id, lesson_id): status}
+    """
+    if not student_ids:
+        return {}
+    date_filter = ''
+    params = [course_id] + list(student_ids)
+    if date_range is not None:
+        date_filter = 'AND session_date BETWEEN ? AND ?'
+        params += list(date_range)
+    # SQLite returns the status of the row holding MAX(session_date)
+    cursor.execute(f"""
+        SELECT student_id, lesson_id, status, MAX(session_date) AS session_date
+        FROM attendance
+        WHERE course_id = ? AND student_id IN ({', '.join('?' * len(student_ids))}) {date_filter}
+        GROUP BY student_id, lesson_id
+    """, params)
+    return {(row['student_id'], row['lesson_id']): row['status'] for row in cursor.fetchall()}
+
+
+def parse_attendance_range(args):
+    """
+    Read the optional `from` / `to` report filter from query parameters.
+    
+    A missing bound is open-ended.
+    
+    Args:
+        args: request.args
+    
+    Returns:
+        tuple: (date_range or None, error message or None)
+    """
+    date_from = args.get('from', '').strip()
+    date_to = args.get('to', '').strip()
+    if not date_from and not date_to:
+        return None, None
+    bounds = []
+    for value, default in ((date_from, '0000-01-01'), (date_to, '9999-12-31')):
+        if not value:
+            bounds.append(default)
+            continue
+        try:
+            # Zero-pad (2024-1-5 -> 2024-01-05): bounds are compared as text with stored dates
+            bounds.append(datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d'))
+        except ValueError:
+            return None, f"Invalid date '{value}', use YYYY-MM-DD"
+    date_range = tuple(bounds)
+    if date_range[0] > date_range[1]:
+        return None, 'The start date must not be after the end date'
+    return date_range, None
+
+
+def iter_attendance_rows(cursor, course_id, lesson_ids, date_range=None):
+    """
+    Yield the attendance matrix of a course, one student at a time.
+    
+    Rows come from a single query ordered by student, lesson and day, and
+    are folded as they are read, so memory stays flat for any class size.
+    
+    Args:
+        cursor: Database cursor
+        course_id (int): ID of the course
+        lesson_ids (list): Lesson IDs, in column order
+        date_range (tuple): ('YYYY-MM-DD', 'YYYY-MM-DD') inclusive, or None for all sessions
+    
+    Yields:
+        tuple: (student_id, full_name, username, [latest status per lesson], {status: count})
+    """
+    column = {lesson_id: i for i, lesson_id in enumerate(lesson_ids)}
+    date_filter = ''
+    params = []
+    if date_range is not None:
+        date_filter = 'AND a.session_date BETWEEN ? AND ?'
+        params += list(date_range)
+    cursor.execute(f"""
+        SELECT e.student_id, u.full_name, u.username, a.lesson_id, a.status
+        FROM enrollments e
+        JOIN users u ON u.id = e.student_id
+        LEFT JOIN attendance a ON a.course_id = e.course_id AND a.student_id = e.student_id {date_filter}
+        WHERE e.course_id = ?
+        ORDER BY e.student_id, a.lesson_id, a.session_date
+    """, params + [course_id])
+    
+    current = None
+    for row in cursor:
+        if current is None or current[0] != row['student_id']:
+            if current is not None:
+                yield current
+            current = (row['student_id'], row['full_name'], row['username'], [''] * len(lesson_ids),
+                       dict.fromkeys(ATTENDANCE_STATUSES, 0))
+        # Later sessions overwrite earlier ones; only lessons still in the course count
+        if row['lesson_id'] in column and row['status'] in current[4]:
+            current[3][column[row['lesson_id']]] = row['status']
+            current[4][row['status']] += 1
+    if current is not None:
+        yield current
+
+
 # Define route for viewing attendance reports
 @app.route("/attendance/<int:course_id>")
 def view_attendance(course_id):
     """
     View attendance report for a course.
     
-    Shows attendance records for all students and lessons in the course.
+    Shows the students x lessons attendance matrix, one page of students at
+    a time, with the per-student and per-lesson counts kept by the
+    attendance summaries.
+    
+    Query parameters:
+        after: Keyset cursor of the next page (from the "Next" link)
     
     Args:
         course_id (int): ID of the course
@@ -1995,6 +5208,19 @@ def view_attendance(course_id):
     if session.get('role') != 'teacher':
         return redirect(url_for('home'))
     
+    # Decode the keyset cursor; a malformed one restarts at the first page
+    after = None
+    if request.args.get('after'):
+        try:
+            after = json.loads(request.args['after'])
+        except ValueError:
+            after = None
+        if not (isinstance(after, list) and len(after) == 2):
+            after = None
+    
+    # Optional date range (inclusive); an invalid one shows the all-time report with a warning
+    date_range, range_error = parse_attendance_range(request.args)
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -2010,39 +5236,11 @@ def view_attendance(course_id):
             conn.close()
             return render_template('error.html', error='Course not found or unauthorized!')
         
-        # Get all students enrolled in the course
-        cursor.execute("""
-            SELECT DISTINCT u.id, u.full_name
-            FROM users u
-            JOIN enrollments e ON u.id = e.student_id
-            WHERE e.course_id = ? AND u.role = 'student'
-            ORDER BY u.full_name
-        """, (course_id,))
-        
-        students = cursor.fetchall()
-        
-        # Get all lessons in the course
-        cursor.execute("""
-            SELECT id, title FROM topics WHERE course_id = ? ORDER BY created_at ASC
-        """, (course_id,))
-        
-        lessons = cursor.fetchall()
-        
-        # Get all attendance records
-        cursor.execute("""
-            SELECT student_id, lesson_id, status, lesson_date
-            FROM attendance
-            WHERE course_id = ?
-            ORDER BY lesson_date DESC
-        """, (course_id,))
-        
-        attendance_records = cursor.fetchall()
+        lessons, students, next_after, total_students = get_attendance_report(cursor, course_id, after,
+                                                                              date_range=date_range)
         
-        # Organize attendance data for easy access
-        attendance_data = {}
-        for record in attendance_records:
-            key = (record['student_id'], record['lesson_id'])
-            attendance_data[key] = record['status']
+        # Latest status of each (student, lesson) cell, for this page of students only
+        matrix = get_attendance_matrix(cursor, course_id, [student['id'] for student in students], date_range)
         
         conn.close()
         
@@ -2050,12 +5248,95 @@ def view_attendance(course_id):
                              course=course,
                              students=students,
                              lessons=lessons,
-                             attendance_data=attendance_data)
+                             matrix=matrix,
+                             total_students=total_students,
+                             total_records=sum(lesson['present'] + lesson['late'] + lesson['absent'] for lesson in lessons),
+                             first_page=after is None,
+                             next_after=json.dumps(next_after) if next_after is not None else None,
+                             date_from=request.args.get('from', '') if date_range else '',
+                             date_to=request.args.get('to', '') if date_range else '',
+                             range_error=range_error)
     
     except Exception as e:
         return render_template('error.html', error='Error loading attendance report!')
 
 
+# Define route for exporting an attendance report
+@app.route("/export/attendance/<int:course_id>")
+def export_attendance(course_id):
+    """
+    Stream a course's students x lessons attendance matrix as CSV.
+    
+    Each lesson column holds the student's latest status in the range, and
+    the last columns count the sessions per status. Rows are written as
+    they are read from the database.
+    
+    Query parameters:
+        from, to: Optional inclusive date range (YYYY-MM-DD), as on the report page
+    
+    Args:
+        course_id (int): ID of the course
+    
+    Returns:
+        Streaming CSV response or error page
+    """
+    # Check if user is logged in as a teacher
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    if session.get('role') != 'teacher':
+        return redirect(url_for('home'))
+    
+    date_range, range_error = parse_attendance_range(request.args)
+    if range_error:
+        return render_template('error.html', error=range_error), 400
+    
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        
+        # Verify teacher owns this course
+        cursor.execute("""
+            SELECT id FROM courses WHERE id = ? AND teacher_id = ?
+        """, (course_id, session['user_id']))
+        if not cursor.fetchone():
+            conn.close()
+            return render_template('error.html', error='Course not found or unauthorized!'), 404
+        
+        cursor.execute("""
+            SELECT id, title FROM topics WHERE course_id = ? ORDER BY created_at ASC
+        """, (course_id,))
+        lessons = cursor.fetchall()
+    except Exception as e:
+        conn.close()
+        return render_template('error.html', error=f'Error exporting attendance: {str(e)}'), 500
+    
+    header = ['student_id', 'full_name', 'username'] + [lesson['title'] for lesson in lessons] + list(ATTENDANCE_STATUSES)
+    
+    def generate():
+        try:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow([csv_safe(name) for name in header])
+            rows = iter_attendance_rows(conn.cursor(), course_id, [lesson['id'] for lesson in lessons], date_range)
+            for count, (student_id, full_name, username, statuses, totals) in enumerate(rows, start=1):
+                writer.writerow([student_id, csv_safe(full_name), csv_safe(username)] + statuses +
+                                [totals[status] for status in ATTENDANCE_STATUSES])
+                if count % EXPORT_CHUNK_ROWS == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        finally:
+            conn.close()
+    
+    suffix = ''
+    if date_range:
+        suffix = f"-{request.args.get('from', '').strip() or 'start'}-to-{request.args.get('to', '').strip() or 'end'}"
+    response = app.response_class(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="attendance-course-{course_id}{suffix}.csv"'
+    return response
+
+
 # Define route for submitting assignment answers
 @app.route("/submit_assignment", methods=['POST'])
 def submit_assignment():
@@ -2084,56 +5365,21 @@ def submit_assignment():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Get all form data from the submission
-        form_data = request.form.to_dict()
-        
-        # Track submission statistics
-        total_correct = 0
-        total_questions = 0
-        submission_ids = []
-        
-        # Process each question submission
-        for key, value in form_data.items():
-            # Form key format: question_<question_id>
+        # Collect the answers: form key format is question_<question_id>
+        answers = {}
+        for key, value in request.form.items():
             if key.startswith('question_'):
                 try:
-                    # Extract question ID from form key
                     question_id = int(key.split('_')[1])
-                    selected_answer = value.upper() if value else None
-                    
-                    if not selected_answer or selected_answer not in ['A', 'B', 'C', 'D']:
-                        # Skip invalid answers
-                        continue
-                    
-                    # Fetch the correct answer for this question
-                    cursor.execute("""
-                        SELECT correct_answer FROM msqs WHERE id = ?
-                    """, (question_id,))
-                    
-                    result = cursor.fetchone()
-                    if not result:
-                        # Skip if question not found
-                        continue
-                    
-                    correct_answer = result['correct_answer'].upper()
-                    # Determine if answer is correct
-                    is_correct = 1 if selected_answer == correct_answer else 0
-                    
-                    # Insert submission record into database
-                    cursor.execute("""
-                        INSERT INTO submissions (student_id, question_id, selected_answer, is_correct)
-                        VALUES (?, ?, ?, ?)
-                    """, (session['user_id'], question_id, selected_answer, is_correct))
-                    
-                    # Track for statistics
-                    submission_ids.append(cursor.lastrowid)
-                    if is_correct:
-                        total_correct += 1
-                    total_questions += 1
-                    
                 except (ValueError, IndexError):
                     # Skip malformed form keys
                     continue
+                selected_answer = value.upper() if value else None
+                if selected_answer in ('A', 'B', 'C', 'D'):
+                    answers[question_id] = selected_answer
+        
+        # Score the whole attempt against the answer keys and save it in one batch
+        total_correct, total_questions = score_submission(cursor, session['user_id'], answers)
         
         # Commit all submissions to database
         conn.commit()
@@ -2200,88 +5446,335 @@ def my_assignments():
     """
     Display all assignments completed by the logged-in student with their scores.
     
-    Shows a list of all assignments the student has submitted with:
-    - Question text
-    - Student's selected answer
-    - Correct answer
-    - Whether they got it right
-    - Date submitted
+    Shows a list of all assignments the student has submitted with:
+    - Question text
+    - Student's selected answer
+    - Correct answer
+    - Whether they got it right
+    - Date submitted
+    
+    Returns:
+        Rendered my_assignments template with student's submission history
+    """
+    # Check if user is logged in
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    # Check if user role is 'student'
+    if session.get('role') != 'student':
+        return redirect(url_for('home'))
+    
+    conn = None
+    try:
+        # Establish connection to the database
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Fetch all submissions by this student with question details
+        cursor.execute("""
+            SELECT 
+                s.id as submission_id,
+                s.question_id,
+                s.selected_answer,
+                s.is_correct,
+                s.submitted_at,
+                m.question,
+                m.correct_answer,
+                m.option_a,
+                m.option_b,
+                m.option_c,
+                m.option_d,
+                t.title as topic_title
+            FROM submissions s
+            JOIN msqs m ON s.question_id = m.id
+            LEFT JOIN topics t ON m.topic_id = t.id
+            WHERE s.student_id = ?
+            ORDER BY s.submitted_at DESC
+        """, (session['user_id'],))
+        
+        submissions = cursor.fetchall()
+        
+        # Read overall statistics from the student_stats read model
+        stats = get_student_stats(cursor, session['user_id'])
+        total_submissions = stats['submissions']
+        correct_answers = stats['correct']
+        overall_percentage = int((correct_answers / total_submissions * 100)) if total_submissions > 0 else 0
+        
+        return render_template('my_assignments.html',
+                             submissions=submissions,
+                             total_submissions=total_submissions,
+                             correct_answers=correct_answers,
+                             overall_percentage=overall_percentage)
+    
+    except Exception as e:
+        return render_template('error.html', error='Error loading your assignments!')
+    finally:
+        if conn:
+            conn.close()
+
+
+# Gradebook sort orders: name -> SQL keys, most significant first
+# Every order ends with the student ID so the keyset is unique
+GRADEBOOK_SORTS = {
+    'name': ['u.full_name', 'u.id'],
+    # Ungraded students sort as -1, below a grade of 0
+    'grade': ['COALESCE(g.grade, -1)', 'u.full_name', 'u.id'],
+    # 0 = pending, 1 = graded
+    'status': ['(g.id IS NOT NULL)', 'u.full_name', 'u.id'],
+}
+
+# Students shown per gradebook page
+GRADEBOOK_PAGE_SIZE = 50
+
+
+def get_gradebook_page(cursor, assignment_id, course_id, sort='name', descending=False, after=None,
+                       limit=GRADEBOOK_PAGE_SIZE):
+    """
+    Return one page of an assignment's gradebook: enrolled students joined to their grades.
+    
+    Uses keyset pagination: `after` is the sort key of the last row of the
+    previous page, so every page is one indexed query whatever the class size.
+    
+    Args:
+        cursor: Database cursor
+        assignment_id (int): ID of the assignment
+        course_id (int): ID of the assignment's course
+        sort (str): Key of GRADEBOOK_SORTS
+        descending (bool): Reverse the sort order
+        after (list): Sort key returned as next_after by the previous page, or None
+        limit (int): Page size
+    
+    Returns:
+        tuple: (rows, next_after) where next_after is None on the last page
+    """
+    keys = GRADEBOOK_SORTS[sort]
+    direction = 'DESC' if descending else 'ASC'
+    params = [assignment_id, course_id]
+    keyset = ''
+    if after is not None:
+        # Row-value comparison continues right after the previous page's last row
+        keyset = f"AND ({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' * len(keys))})"
+        params += after
+    cursor.execute(f"""
+        SELECT u.id, u.full_name, u.username, g.id AS grade_id, g.grade, g.feedback, g.graded_at,
+               {', '.join(f'{key} AS sort_{i}' for i, key in enumerate(keys))}
+        FROM enrollments e
+        JOIN users u ON u.id = e.student_id
+        LEFT JOIN grades g ON g.student_id = e.student_id AND g.assignment_id = ?
+        WHERE e.course_id = ? {keyset}
+        ORDER BY {', '.join(f'{key} {direction}' for key in keys)}
+        LIMIT ?
+    """, params + [limit + 1])
+    rows = cursor.fetchall()
+    
+    # The extra row only tells whether another page exists
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, [last[f'sort_{i}'] for i in range(len(keys))]
+
+
+def get_gradebook_summary(cursor, assignment_id, course_id):
+    """
+    Return the class-wide totals of an assignment's gradebook in one aggregate query.
+    
+    Returns:
+        sqlite3.Row: total_students, graded_count and average (None if nothing is graded)
+    """
+    cursor.execute("""
+        SELECT COUNT(*) AS total_students, COUNT(g.id) AS graded_count, AVG(g.grade) AS average
+        FROM enrollments e
+        LEFT JOIN grades g ON g.student_id = e.student_id AND g.assignment_id = ?
+        WHERE e.course_id = ?
+    """, (assignment_id, course_id))
+    return cursor.fetchone()
+
+
+# Maximum number of grades accepted by one bulk grading request
+GRADES_BULK_LIMIT = 1000
+
+# Insert a grade, or update it when the (student, assignment) pair is already graded
+# A NULL feedback keeps the feedback already stored
+UPSERT_GRADE_SQL = """
+    INSERT INTO grades (student_id, assignment_id, teacher_id, grade, feedback)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (student_id, assignment_id) DO UPDATE SET
+        grade = excluded.grade,
+        feedback = COALESCE(excluded.feedback, grades.feedback),
+        teacher_id = excluded.teacher_id,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def upsert_grades(cursor, course_id, assignment_id, teacher_id, entries):
+    """
+    Insert or update many grades of an assignment with one executemany.
+    
+    Relies on the unique (student_id, assignment_id) index (see UPSERT_GRADE_SQL).
+    The grades being replaced are read first so `student_stats` can be
+    adjusted by the difference.
+    
+    Args:
+        cursor: Database cursor (caller commits)
+        course_id (int): ID of the assignment's course
+        assignment_id (int): ID of the assignment
+        teacher_id (int): ID of the grading teacher
+        entries (list): (student_id, grade, feedback) tuples
+    """
+    # Current grades of these students, loaded in chunks under SQLite's parameter limit
+    current = {}
+    student_ids = sorted({entry[0] for entry in entries})
+    for start in range(0, len(student_ids), 500):
+        chunk = student_ids[start:start + 500]
+        cursor.execute(f"""
+            SELECT student_id, grade FROM grades
+            WHERE assignment_id = ? AND student_id IN ({', '.join('?' * len(chunk))})
+        """, [assignment_id] + chunk)
+        current.update((row['student_id'], row['grade']) for row in cursor.fetchall())
+    
+    deltas = {}
+    for student_id, grade, _ in entries:
+        changes = deltas.setdefault((student_id, course_id), {'graded': 0, 'grade_total': 0})
+        if current.get(student_id) is None:
+            changes['graded'] += 1
+            changes['grade_total'] += grade
+        else:
+            changes['grade_total'] += grade - current[student_id]
+        current[student_id] = grade
+    
+    cursor.executemany(UPSERT_GRADE_SQL, [(student_id, assignment_id, teacher_id, grade, feedback)
+                                          for student_id, grade, feedback in entries])
+    update_student_stats(cursor, deltas)
+
+
+def validate_grade_entries(cursor, course_id, items):
+    """
+    Check bulk grading entries against the grade range and the course roster.
+    
+    Args:
+        cursor: Database cursor
+        course_id (int): ID of the assignment's course
+        items (list): Dicts with student_id, grade and optional feedback
+    
+    Returns:
+        tuple: (entries as (student_id, grade, feedback) tuples, errors as
+               {'index', 'student_id', 'error'} dicts)
+    """
+    candidates = []
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'student_id': None, 'error': 'Entry must be an object'})
+            continue
+        student_id = item.get('student_id')
+        grade = item.get('grade')
+        feedback = item.get('feedback')
+        if not isinstance(student_id, int):
+            errors.append({'index': index, 'student_id': student_id, 'error': 'Invalid student_id'})
+        elif isinstance(grade, bool) or not isinstance(grade, (int, float)) or not 0 <= grade <= 100:
+            errors.append({'index': index, 'student_id': student_id, 'error': 'Grade must be between 0 and 100'})
+        elif feedback is not None and not isinstance(feedback, str):
+            errors.append({'index': index, 'student_id': student_id, 'error': 'Feedback must be text'})
+        else:
+            candidates.append((index, student_id, float(grade), feedback))
+    
+    # Look up the roster for all submitted students at once
+    enrolled = set()
+    student_ids = sorted({candidate[1] for candidate in candidates})
+    for start in range(0, len(student_ids), 500):
+        chunk = student_ids[start:start + 500]
+        cursor.execute(f"""
+            SELECT student_id FROM enrollments
+            WHERE course_id = ? AND student_id IN ({', '.join('?' * len(chunk))})
+        """, [course_id] + chunk)
+        enrolled.update(row['student_id'] for row in cursor.fetchall())
+    
+    entries = []
+    for index, student_id, grade, feedback in candidates:
+        if student_id in enrolled:
+            entries.append((student_id, grade, feedback))
+        else:
+            errors.append({'index': index, 'student_id': student_id,
+                           'error': 'Student is not enrolled in this course'})
+    errors.sort(key=lambda error: error['index'])
+    return entries, errors
+
+
+# Define route for grading many students of an assignment at once
+@app.route("/api/grades/<int:assignment_id>", methods=['POST'])
+def bulk_grade(assignment_id):
+    """
+    Save many grades of an assignment in one request and one transaction.
+    
+    Request body (JSON):
+        {"grades": [{"student_id": 5, "grade": 87.5, "feedback": "Well done"}, ...]}
+    
+    `feedback` is optional; when it is missing the stored feedback is kept.
+    Nothing is saved if any entry is invalid; the response lists the
+    offending entries by their index in the request.
+    
+    Args:
+        assignment_id (int): ID of the assignment being graded
     
     Returns:
-        Rendered my_assignments template with student's submission history
+        JSON response with the number of grades saved, or the errors
     """
-    # Check if user is logged in
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
+    # Check if user is logged in as a teacher
+    if 'user_id' not in session or session.get('role') != 'teacher':
+        return jsonify({'success': False, 'error': 'Not authorized'}), 403
     
-    # Check if user role is 'student'
-    if session.get('role') != 'student':
-        return redirect(url_for('home'))
+    data = request.get_json(silent=True)
+    items = data.get('grades') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': 'Expected a JSON body with a non-empty "grades" list'}), 400
+    if len(items) > GRADES_BULK_LIMIT:
+        return jsonify({'success': False, 'error': f'At most {GRADES_BULK_LIMIT} grades per request'}), 400
     
-    conn = None
+    conn = get_db_connection()
     try:
-        # Establish connection to the database
-        conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Fetch all submissions by this student with question details
-        cursor.execute("""
-            SELECT 
-                s.id as submission_id,
-                s.question_id,
-                s.selected_answer,
-                s.is_correct,
-                s.submitted_at,
-                m.question,
-                m.correct_answer,
-                m.option_a,
-                m.option_b,
-                m.option_c,
-                m.option_d,
-                t.title as topic_title
-            FROM submissions s
-            JOIN msqs m ON s.question_id = m.id
-            LEFT JOIN topics t ON m.topic_id = t.id
-            WHERE s.student_id = ?
-            ORDER BY s.submitted_at DESC
-        """, (session['user_id'],))
-        
-        submissions = cursor.fetchall()
-        
-        # Calculate overall statistics
+        # Verify assignment exists and belongs to this teacher
         cursor.execute("""
-            SELECT 
-                COUNT(*) as total_submissions,
-                SUM(is_correct) as correct_answers
-            FROM submissions
-            WHERE student_id = ?
-        """, (session['user_id'],))
+            SELECT a.id, a.course_id
+            FROM assignments a
+            JOIN courses c ON a.course_id = c.id
+            WHERE a.id = ? AND c.teacher_id = ?
+        """, (assignment_id, session['user_id']))
+        assignment = cursor.fetchone()
+        if not assignment:
+            return jsonify({'success': False, 'error': 'Assignment not found or unauthorized'}), 404
         
-        stats = cursor.fetchone()
-        total_submissions = stats['total_submissions'] if stats['total_submissions'] else 0
-        correct_answers = stats['correct_answers'] if stats['correct_answers'] else 0
-        overall_percentage = int((correct_answers / total_submissions * 100)) if total_submissions > 0 else 0
+        entries, errors = validate_grade_entries(cursor, assignment['course_id'], items)
+        if errors:
+            return jsonify({'success': False, 'error': 'Some grades are invalid', 'errors': errors}), 400
         
-        return render_template('my_assignments.html',
-                             submissions=submissions,
-                             total_submissions=total_submissions,
-                             correct_answers=correct_answers,
-                             overall_percentage=overall_percentage)
+        upsert_grades(cursor, assignment['course_id'], assignment_id, session['user_id'], entries)
+        conn.commit()
+        return jsonify({'success': True, 'saved': len(entries)})
     
     except Exception as e:
-        return render_template('error.html', error='Error loading your assignments!')
+        conn.rollback()
+        return jsonify({'success': False, 'error': f'Error saving grades: {str(e)}'}), 500
     finally:
-        if conn:
-            conn.close()
+        conn.close()
 
 
 # Define route for viewing assignment submissions for grading
 @app.route("/grade_assignment/<int:assignment_id>")
 def grade_assignment(assignment_id):
     """
-    Display all student submissions for an assignment that the teacher created.
+    Display the gradebook of an assignment that the teacher created.
     
-    Shows a list of all students who submitted the assignment with their submission status.
+    Lists the students enrolled in the assignment's course with their grade
+    status, one page at a time. The page runs three queries whatever the
+    class size: the assignment, the summary totals and the page of students.
+    
+    Query parameters:
+        sort: 'name' (default), 'grade' or 'status'
+        order: 'asc' (default) or 'desc'
+        after: Keyset cursor of the next page (from the "Next" link)
     
     Args:
         assignment_id (int): ID of the assignment to view submissions for
@@ -2297,6 +5790,22 @@ def grade_assignment(assignment_id):
     if session.get('role') != 'teacher':
         return redirect(url_for('home'))
     
+    # Read the sort order; unknown values fall back to the defaults
+    sort = request.args.get('sort', 'name')
+    if sort not in GRADEBOOK_SORTS:
+        sort = 'name'
+    descending = request.args.get('order') == 'desc'
+    
+    # Decode the keyset cursor; a malformed one restarts at the first page
+    after = None
+    if request.args.get('after'):
+        try:
+            after = json.loads(request.args['after'])
+        except ValueError:
+            after = None
+        if not isinstance(after, list) or len(after) != len(GRADEBOOK_SORTS[sort]):
+            after = None
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -2314,33 +5823,21 @@ def grade_assignment(assignment_id):
         if not assignment:
             return render_template('error.html', error='Assignment not found or unauthorized!')
         
-        # Get all students in the course
-        cursor.execute("""
-            SELECT DISTINCT u.id, u.full_name, u.username
-            FROM users u
-            WHERE u.role = 'student'
-            ORDER BY u.full_name
-        """)
-        
-        all_students = cursor.fetchall()
-        
-        # Get grades for each student
-        grades_by_student = {}
-        for student in all_students:
-            cursor.execute("""
-                SELECT grade, feedback, graded_at
-                FROM grades
-                WHERE student_id = ? AND assignment_id = ?
-            """, (student['id'], assignment_id))
-            grade = cursor.fetchone()
-            grades_by_student[student['id']] = grade
+        # Totals over the whole class, then the current page of students
+        summary = get_gradebook_summary(cursor, assignment_id, assignment['course_id'])
+        students, next_after = get_gradebook_page(cursor, assignment_id, assignment['course_id'],
+                                                  sort=sort, descending=descending, after=after)
         
         conn.close()
         
         return render_template('grade_assignment.html',
                              assignment=assignment,
-                             students=all_students,
-                             grades=grades_by_student)
+                             students=students,
+                             summary=summary,
+                             sort=sort,
+                             order='desc' if descending else 'asc',
+                             first_page=after is None,
+                             next_after=json.dumps(next_after) if next_after is not None else None)
     
     except Exception as e:
         return render_template('error.html', error=f'Error loading assignment: {str(e)}')
@@ -2416,20 +5913,9 @@ def submit_grade(assignment_id, student_id):
                                      existing_grade=existing_grade,
                                      error='Grade must be between 0 and 100!')
             
-            # Check if grade already exists
-            if existing_grade:
-                # Update existing grade
-                cursor.execute("""
-                    UPDATE grades
-                    SET grade = ?, feedback = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE student_id = ? AND assignment_id = ?
-                """, (grade, feedback, student_id, assignment_id))
-            else:
-                # Insert new grade
-                cursor.execute("""
-                    INSERT INTO grades (student_id, assignment_id, teacher_id, grade, feedback)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (student_id, assignment_id, session['user_id'], grade, feedback))
+            # Insert the grade, or update the existing one
+            upsert_grades(cursor, assignment['course_id'], assignment_id, session['user_id'],
+                          [(student_id, grade, feedback)])
             
             conn.commit()
             conn.close()
@@ -2453,68 +5939,532 @@ def submit_grade(assignment_id, student_id):
 @app.route("/student_grades")
 def student_grades():
     """
-    Display all grades received by the logged-in student for assignments.
+    Display all grades received by the logged-in student for assignments.
+    
+    Shows a list of all grades with feedback from teachers.
+    
+    Returns:
+        Rendered student_grades template with grade information
+    """
+    # Check if user is logged in
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    # Check if user is a student
+    if session.get('role') != 'student':
+        return redirect(url_for('home'))
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Fetch all grades for this student
+        cursor.execute("""
+            SELECT 
+                g.id,
+                g.grade,
+                g.feedback,
+                g.graded_at,
+                a.title as assignment_title,
+                a.id as assignment_id,
+                c.title as course_title,
+                u.full_name as teacher_name
+            FROM grades g
+            JOIN assignments a ON g.assignment_id = a.id
+            JOIN courses c ON a.course_id = c.id
+            JOIN users u ON g.teacher_id = u.id
+            WHERE g.student_id = ?
+            ORDER BY g.graded_at DESC
+        """, (session['user_id'],))
+        
+        grades = cursor.fetchall()
+        
+        # Read statistics from the student_stats read model
+        stats = get_student_stats(cursor, session['user_id'])
+        total_graded = stats['graded']
+        average_grade = round(stats['grade_total'] / total_graded, 2) if total_graded else 0
+        
+        conn.close()
+        
+        return render_template('student_grades.html',
+                             grades=grades,
+                             total_graded=total_graded,
+                             average_grade=average_grade)
+    
+    except Exception as e:
+        return render_template('error.html', error=f'Error loading grades: {str(e)}')
+
+
+# Rows written to a CSV export chunk before it is sent
+EXPORT_CHUNK_ROWS = 200
+
+# Static parts of a one-sheet XLSX workbook (the sheet itself is streamed)
+XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Grades" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'),
+}
+
+
+class StreamBuffer:
+    """Write-only file object whose contents are drained chunk by chunk (for zipfile)."""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        """Return and forget everything written so far."""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def get_grades_version(cursor, course_id):
+    """
+    Read the version of the data behind a course's gradebook export.
+    
+    Triggers bump it whenever an assignment, enrollment or grade of the
+    course is added, removed or updated (see migration_019_gradebook_versions),
+    so two changes within the same second still give different versions.
+    
+    Args:
+        cursor: Database cursor
+        course_id (int): ID of the course
+    
+    Returns:
+        str: Data version
+    """
+    cursor.execute("""
+        SELECT version FROM gradebook_versions WHERE course_id = ?
+    """, (course_id,))
+    row = cursor.fetchone()
+    return str(row['version'] if row else 0)
+
+
+def iter_gradebook_rows(cursor, course_id, assignment_ids, after=0):
+    """
+    Yield the students x assignments grade matrix of a course, one student at a time.
+    
+    Rows come from a single query ordered by student ID and are grouped as
+    they are read, so memory stays flat however many students there are.
+    
+    Args:
+        cursor: Database cursor
+        course_id (int): ID of the course
+        assignment_ids (list): Assignment IDs, in column order
+        after (int): Only students with a greater ID (resuming an export)
+    
+    Yields:
+        tuple: (student_id, full_name, username, [grade or None per assignment])
+    """
+    column = {assignment_id: i for i, assignment_id in enumerate(assignment_ids)}
+    cursor.execute("""
+        SELECT e.student_id, u.full_name, u.username, g.assignment_id, g.grade
+        FROM enrollments e
+        JOIN users u ON u.id = e.student_id
+        LEFT JOIN grades g ON g.student_id = e.student_id
+            AND g.assignment_id IN (SELECT id FROM assignments WHERE course_id = ?)
+        WHERE e.course_id = ? AND e.student_id > ?
+        ORDER BY e.student_id
+    """, (course_id, course_id, after))
+    
+    current = None
+    for row in cursor:
+        if current is None or current[0] != row['student_id']:
+            if current is not None:
+                yield current
+            current = (row['student_id'], row['full_name'], row['username'], [None] * len(assignment_ids))
+        if row['assignment_id'] in column:
+            current[3][column[row['assignment_id']]] = row['grade']
+    if current is not None:
+        yield current
+
+
+def csv_safe(value):
+    """Stop spreadsheet apps from evaluating a text cell as a formula."""
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def stream_gradebook_csv(header, rows, include_header=True):
+    """
+    Generate a CSV export in chunks of EXPORT_CHUNK_ROWS rows.
+    
+    Args:
+        header (list): Column names
+        rows (iterable): Rows from iter_gradebook_rows()
+        include_header (bool): False when resuming an export
+    
+    Yields:
+        str: CSV text
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if include_header:
+        writer.writerow([csv_safe(name) for name in header])
+    for count, (student_id, full_name, username, grades) in enumerate(rows, start=1):
+        writer.writerow([student_id, csv_safe(full_name), csv_safe(username)] +
+                        ['' if grade is None else grade for grade in grades])
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def xlsx_row(number, values):
+    """Render one worksheet row: numbers as values, everything else as inline strings."""
+    cells = []
+    for value in values:
+        if value is None:
+            cells.append('<c/>')
+        elif isinstance(value, (int, float)):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            cells.append(f'<c t="inlineStr"><is><t>{xml_escape(str(value))}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def stream_gradebook_xlsx(header, rows):
+    """
+    Generate an XLSX export with zipfile, sending the worksheet as it is compressed.
+    
+    Args:
+        header (list): Column names
+        rows (iterable): Rows from iter_gradebook_rows()
+    
+    Yields:
+        bytes: Parts of the .xlsx file
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in XLSX_STATIC_PARTS.items():
+            workbook.writestr(name, content)
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        b'<sheetData>')
+            sheet.write(xlsx_row(1, header).encode())
+            for number, (student_id, full_name, username, grades) in enumerate(rows, start=2):
+                sheet.write(xlsx_row(number, [student_id, full_name, username] + grades).encode())
+                if number % EXPORT_CHUNK_ROWS == 0:
+                    yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+# Define route for exporting a course gradebook
+@app.route("/export/grades/<int:course_id>")
+def export_grades(course_id):
+    """
+    Stream a course's students x assignments grade matrix as CSV or XLSX.
+    
+    The response is generated row by row from one query inside a read
+    transaction, so it matches its ETag (a hash of the data version).
+    
+    Query parameters:
+        format: 'csv' (default) or 'xlsx'
+        after: CSV only; resume after this student ID (rows are ordered by
+               student ID, and the header row is omitted). Send the ETag of
+               the interrupted download in If-Match; if the grades changed
+               since, the response is 412 and the export must restart.
+    
+    Args:
+        course_id (int): ID of the course
+    
+    Returns:
+        Streaming file response, 304 if the client's copy is current, or an error
+    """
+    # Check if user is logged in as a teacher
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    if session.get('role') != 'teacher':
+        return redirect(url_for('home'))
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        return render_template('error.html', error='Export format must be csv or xlsx!'), 400
+    after = request.args.get('after', 0, type=int)
+    if after and export_format != 'csv':
+        return render_template('error.html', error='Only CSV exports can be resumed!'), 400
+    
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        
+        # Verify course belongs to this teacher
+        cursor.execute("""
+            SELECT id, title FROM courses WHERE id = ? AND teacher_id = ?
+        """, (course_id, session['user_id']))
+        if not cursor.fetchone():
+            conn.close()
+            return render_template('error.html', error='Course not found or unauthorized!'), 404
+        
+        # Read the version and the data from one snapshot
+        cursor.execute("BEGIN")
+        etag = f"grades-{course_id}-{get_grades_version(cursor, course_id)}-{export_format}"
+        if request.if_none_match.contains(etag):
+            conn.close()
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        if after and request.if_match and not request.if_match.contains(etag):
+            conn.close()
+            return render_template('error.html', error='Grades changed since this export started; download it again.'), 412
+        
+        cursor.execute("""
+            SELECT id, title FROM assignments WHERE course_id = ? ORDER BY id
+        """, (course_id,))
+        assignments = cursor.fetchall()
+    except Exception as e:
+        conn.close()
+        return render_template('error.html', error=f'Error exporting grades: {str(e)}'), 500
+    
+    header = ['student_id', 'full_name', 'username'] + [a['title'] for a in assignments]
+    
+    def generate():
+        try:
+            rows = iter_gradebook_rows(conn.cursor(), course_id, [a['id'] for a in assignments], after)
+            if export_format == 'xlsx':
+                yield from stream_gradebook_xlsx(header, rows)
+            else:
+                yield from stream_gradebook_csv(header, rows, include_header=not after)
+        finally:
+            # Ends the read transaction and returns the connection to the pool
+            conn.close()
+    
+    if export_format == 'xlsx':
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        mimetype = 'text/csv'
+    response = app.response_class(stream_with_context(generate()), mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Content-Disposition'] = f'attachment; filename="grades-course-{course_id}.{export_format}"'
+    return response
+
+
+# Rows upserted per transaction by the grade importer
+GRADE_IMPORT_BATCH_SIZE = int(os.environ.get('LMS_GRADE_IMPORT_BATCH_SIZE', '5000'))
+
+# Row errors kept in an import report (the rest are only counted)
+GRADE_IMPORT_MAX_ERRORS = 1000
+
+
+def import_grades_csv(conn, course_id, teacher_id, text_stream, batch_size=None):
+    """
+    Import (username, assignment, grade, feedback) rows from a CSV stream.
+    
+    The file is read row by row. Students and assignments are resolved with
+    lookup maps loaded once per import, and valid rows are upserted in
+    transactions of `batch_size` rows. An invalid row is reported and
+    skipped; it does not stop the import.
+    
+    The assignment column may hold the assignment ID or its exact title.
+    An empty feedback keeps the feedback already stored.
+    
+    A file that stops being readable (bad encoding, broken quoting) ends
+    the import there: the rows read before it are kept, since earlier
+    batches are already committed, and the report says where it stopped.
+    
+    Args:
+        conn: Database connection
+        course_id (int): ID of the course the grades belong to
+        teacher_id (int): ID of the importing teacher
+        text_stream: Text file object with the CSV data
+        batch_size (int): Rows per transaction, defaults to GRADE_IMPORT_BATCH_SIZE
+    
+    Returns:
+        dict: rows, imported, error_count, errors ({'line', 'error'} dicts) and
+        stopped ({'line', 'error'} for the first line not read, or None)
+    """
+    batch_size = batch_size or GRADE_IMPORT_BATCH_SIZE
+    cursor = conn.cursor()
+    report = {'rows': 0, 'imported': 0, 'error_count': 0, 'errors': [], 'stopped': None}
+    
+    def error(line, message):
+        report['error_count'] += 1
+        if len(report['errors']) < GRADE_IMPORT_MAX_ERRORS:
+            report['errors'].append({'line': line, 'error': message})
+    
+    # Lookup maps: enrolled students by username, assignments by ID and title
+    cursor.execute("""
+        SELECT u.username, u.id
+        FROM enrollments e
+        JOIN users u ON u.id = e.student_id
+        WHERE e.course_id = ?
+    """, (course_id,))
+    students = {row['username']: row['id'] for row in cursor.fetchall()}
+    cursor.execute("""
+        SELECT id, title FROM assignments WHERE course_id = ?
+    """, (course_id,))
+    rows = cursor.fetchall()
+    assignments = {str(row['id']): row['id'] for row in rows}
+    # Titles are unique; a title wins over an ID written the same way
+    assignments.update({row['title']: row['id'] for row in rows})
+    
+    reader = csv.DictReader(text_stream)
+    columns = {name.strip().lower() for name in (reader.fieldnames or [])}
+    missing = {'username', 'assignment', 'grade'} - columns
+    if missing:
+        error(1, f"Missing column(s): {', '.join(sorted(missing))}")
+        return report
+    
+    batch = []
+    try:
+        for row in reader:
+            report['rows'] += 1
+            line = reader.line_num
+            row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            
+            student_id = students.get(row['username'])
+            if student_id is None:
+                error(line, f"Unknown or unenrolled student '{row['username']}'")
+                continue
+            assignment_id = assignments.get(row['assignment'])
+            if assignment_id is None:
+                error(line, f"Unknown assignment '{row['assignment']}'")
+                continue
+            try:
+                grade = float(row['grade'])
+            except ValueError:
+                grade = None
+            if grade is None or not 0 <= grade <= 100:
+                error(line, f"Grade must be a number between 0 and 100, got '{row['grade']}'")
+                continue
+            
+            batch.append((student_id, assignment_id, grade, row.get('feedback') or None))
+            if len(batch) >= batch_size:
+                report['imported'] += flush_grade_batch(conn, course_id, teacher_id, batch)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Earlier batches are committed already: keep them and report where reading stopped
+        # (a CSV error is raised on the line it read, a decoding error before the next line)
+        stopped_line = reader.line_num if isinstance(e, csv.Error) else reader.line_num + 1
+        report['stopped'] = {'line': stopped_line, 'error': f"Could not read the file as UTF-8 CSV: {str(e)}"}
+    
+    report['imported'] += flush_grade_batch(conn, course_id, teacher_id, batch)
+    return report
+
+
+def flush_grade_batch(conn, course_id, teacher_id, batch):
+    """
+    Upsert one batch of imported grades in its own transaction.
+    
+    Args:
+        conn: Database connection
+        course_id (int): ID of the course
+        teacher_id (int): ID of the importing teacher
+        batch (list): (student_id, assignment_id, grade, feedback) tuples
+    
+    Returns:
+        int: Number of rows written
+    """
+    if not batch:
+        return 0
+    by_assignment = {}
+    for student_id, assignment_id, grade, feedback in batch:
+        by_assignment.setdefault(assignment_id, []).append((student_id, grade, feedback))
+    cursor = conn.cursor()
+    for assignment_id, entries in by_assignment.items():
+        upsert_grades(cursor, course_id, assignment_id, teacher_id, entries)
+    conn.commit()
+    return len(batch)
+
+
+# Define route for importing grades from a CSV file
+@app.route("/import/grades/<int:course_id>", methods=['GET', 'POST'])
+def import_grades(course_id):
+    """
+    Upload a CSV of grades for a course and show the import report.
     
-    Shows a list of all grades with feedback from teachers.
+    GET: Display the upload form
+    POST: Import the uploaded file (field `file`) with import_grades_csv()
+    
+    Args:
+        course_id (int): ID of the course
     
     Returns:
-        Rendered student_grades template with grade information
+        Rendered import_grades template, with the report after an upload
     """
-    # Check if user is logged in
+    # Check if user is logged in as a teacher
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    # Check if user is a student
-    if session.get('role') != 'student':
+    if session.get('role') != 'teacher':
         return redirect(url_for('home'))
     
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Fetch all grades for this student
+        # Verify course belongs to this teacher
         cursor.execute("""
-            SELECT 
-                g.id,
-                g.grade,
-                g.feedback,
-                g.graded_at,
-                a.title as assignment_title,
-                a.id as assignment_id,
-                c.title as course_title,
-                u.full_name as teacher_name
-            FROM grades g
-            JOIN assignments a ON g.assignment_id = a.id
-            JOIN courses c ON a.course_id = c.id
-            JOIN users u ON g.teacher_id = u.id
-            WHERE g.student_id = ?
-            ORDER BY g.graded_at DESC
-        """, (session['user_id'],))
-        
-        grades = cursor.fetchall()
+            SELECT id, title FROM courses WHERE id = ? AND teacher_id = ?
+        """, (course_id, session['user_id']))
+        course = cursor.fetchone()
+        if not course:
+            return render_template('error.html', error='Course not found or unauthorized!')
         
-        # Calculate statistics
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_graded,
-                AVG(grade) as average_grade
-            FROM grades
-            WHERE student_id = ?
-        """, (session['user_id'],))
+        if request.method == 'GET':
+            return render_template('import_grades.html', course=course)
         
-        stats = cursor.fetchone()
-        total_graded = stats['total_graded'] if stats['total_graded'] else 0
-        average_grade = round(stats['average_grade'], 2) if stats['average_grade'] else 0
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return render_template('import_grades.html', course=course, error='Please choose a CSV file!')
         
-        conn.close()
+        # Read the upload as a text stream (utf-8-sig drops the BOM spreadsheet apps add)
+        text_stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        started = time.perf_counter()
+        try:
+            report = import_grades_csv(conn, course_id, session['user_id'], text_stream)
+        except (UnicodeDecodeError, csv.Error) as e:
+            # The header could not be read, so nothing was imported
+            conn.rollback()
+            return render_template('import_grades.html', course=course,
+                                 error=f'Could not read the file as UTF-8 CSV: {str(e)}')
+        report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"Imported {report['imported']}/{report['rows']} grade rows into course {course_id} "
+              f"in {report['elapsed_ms']}ms")
         
-        return render_template('student_grades.html',
-                             grades=grades,
-                             total_graded=total_graded,
-                             average_grade=average_grade)
+        return render_template('import_grades.html', course=course, report=report,
+                             max_errors=GRADE_IMPORT_MAX_ERRORS)
     
     except Exception as e:
-        return render_template('error.html', error=f'Error loading grades: {str(e)}')
+        return render_template('error.html', error=f'Error importing grades: {str(e)}')
+    finally:
+        conn.close()
 
 
 # Define route for viewing notifications
@@ -2543,7 +6493,35 @@ def notifications():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        if user_role == 'student':
+        if user_role == 'student' and NOTIFICATION_MODE == 'events':
+            # For students: Show events posted to their courses since they enrolled;
+            # an event is read when it is at or below the student's cursor for that course
+            cursor.execute("""
+                SELECT ev.id, ev.course_id, ev.event_type as notification_type, ev.title,
+                       ev.message, ev.resource_id, ev.created_at, c.title as course_title,
+                       CASE WHEN ev.id <= COALESCE(nc.last_seen_event_id, 0) THEN 1 ELSE 0 END as is_read
+                FROM enrollments e
+                JOIN course_events ev ON ev.course_id = e.course_id AND ev.created_at >= e.enrolled_at
+                LEFT JOIN notification_cursors nc ON nc.student_id = e.student_id AND nc.course_id = e.course_id
+                LEFT JOIN courses c ON ev.course_id = c.id
+                WHERE e.student_id = ?
+                ORDER BY ev.created_at DESC, ev.id DESC
+            """, (user_id,))
+            
+            all_notifications = cursor.fetchall()
+            
+            # Count unread events (beyond the cursor of each course)
+            cursor.execute("""
+                SELECT COUNT(*) as unread_count
+                FROM enrollments e
+                JOIN course_events ev ON ev.course_id = e.course_id AND ev.created_at >= e.enrolled_at
+                LEFT JOIN notification_cursors nc ON nc.student_id = e.student_id AND nc.course_id = e.course_id
+                WHERE e.student_id = ? AND ev.id > COALESCE(nc.last_seen_event_id, 0)
+            """, (user_id,))
+            
+            unread_count = cursor.fetchone()['unread_count']
+            
+        elif user_role == 'student':
             # For students: Show notifications they've received
             cursor.execute("""
                 SELECT n.*, c.title as course_title
@@ -2564,6 +6542,21 @@ def notifications():
             
             unread_count = cursor.fetchone()['unread_count']
             
+        elif NOTIFICATION_MODE == 'events':  # teacher
+            # For teachers: Show the events posted to their courses
+            cursor.execute("""
+                SELECT ev.id, ev.course_id, ev.event_type as notification_type, ev.title,
+                       ev.message, ev.resource_id, ev.created_at, c.title as course_title,
+                       'all enrolled students' as student_name
+                FROM course_events ev
+                JOIN courses c ON ev.course_id = c.id
+                WHERE c.teacher_id = ?
+                ORDER BY ev.created_at DESC, ev.id DESC
+            """, (user_id,))
+            
+            all_notifications = cursor.fetchall()
+            unread_count = len(all_notifications)
+            
         else:  # teacher
             # For teachers: Show notifications they've sent (from their courses)
             cursor.execute("""
@@ -2619,6 +6612,24 @@ def mark_notification_read(notification_id):
         conn = get_db_connection()
         cursor = conn.cursor()
         
+        if NOTIFICATION_MODE == 'events':
+            # Move the student's cursor for the event's course up to this event
+            # (the cursor is a high-water mark, so older events count as read too)
+            cursor.execute("""
+                INSERT INTO notification_cursors (student_id, course_id, last_seen_event_id)
+                SELECT e.student_id, e.course_id, ev.id
+                FROM course_events ev
+                JOIN enrollments e ON e.course_id = ev.course_id
+                WHERE ev.id = ? AND e.student_id = ?
+                ON CONFLICT(student_id, course_id)
+                DO UPDATE SET last_seen_event_id = MAX(last_seen_event_id, excluded.last_seen_event_id)
+            """, (notification_id, session['user_id']))
+            
+            conn.commit()
+            conn.close()
+            
+            return redirect(url_for('notifications'))
+        
         # Verify the notification belongs to the user
         cursor.execute("""
             SELECT id FROM notifications WHERE id = ? AND student_id = ?
@@ -2659,10 +6670,22 @@ def clear_all_notifications():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Mark all notifications as read
-        cursor.execute("""
-            UPDATE notifications SET is_read = 1 WHERE student_id = ? AND is_read = 0
-        """, (session['user_id'],))
+        if NOTIFICATION_MODE == 'events':
+            # Move every course cursor of the student to the course's latest event
+            cursor.execute("""
+                INSERT INTO notification_cursors (student_id, course_id, last_seen_event_id)
+                SELECT e.student_id, e.course_id,
+                       COALESCE((SELECT MAX(id) FROM course_events WHERE course_id = e.course_id), 0)
+                FROM enrollments e
+                WHERE e.student_id = ?
+                ON CONFLICT(student_id, course_id)
+                DO UPDATE SET last_seen_event_id = excluded.last_seen_event_id
+            """, (session['user_id'],))
+        else:
+            # Mark all notifications as read
+            cursor.execute("""
+                UPDATE notifications SET is_read = 1 WHERE student_id = ? AND is_read = 0
+            """, (session['user_id'],))
         
         conn.commit()
         conn.close()
@@ -2673,17 +6696,110 @@ def clear_all_notifications():
         return redirect(url_for('notifications'))
 
 
+# Function to check whether the logged-in user may read and post comments in a course
+def can_access_course_comments(cursor, course_id):
+    """
+    Check course discussion access for the logged-in user.
+    
+    Course 0 is the global discussion open to everyone. Otherwise students
+    must be enrolled and teachers must own the course. The check is one
+    indexed lookup and runs on every call, so removing an enrollment or
+    moving a course to another teacher takes effect immediately.
+    
+    Args:
+        cursor (sqlite3.Cursor): Database cursor
+        course_id (int): ID of the course
+    
+    Returns:
+        tuple: (allowed, error message or None)
+    """
+    if course_id == 0:
+        return True, None
+    
+    user_role = session.get('role')
+    user_id = session['user_id']
+    
+    # Verify user is enrolled in the course (if student) or is the teacher
+    if user_role == 'student':
+        cursor.execute("""
+            SELECT id FROM enrollments 
+            WHERE student_id = ? AND course_id = ?
+        """, (user_id, course_id))
+        
+        if not cursor.fetchone():
+            return False, 'Not enrolled in this course'
+    elif user_role == 'teacher':
+        cursor.execute("""
+            SELECT id FROM courses WHERE id = ? AND teacher_id = ?
+        """, (course_id, user_id))
+        
+        if not cursor.fetchone():
+            return False, 'Not authorized'
+    
+    return True, None
+
+
+# Function to read the change version of a course discussion
+def get_comments_version(cursor, course_id):
+    """
+    Return the newest comment ID and newest deletion ID of a course.
+    
+    Together they change whenever a comment is posted or deleted, so they
+    serve as both the ETag and the polling cursor.
+    
+    Args:
+        cursor (sqlite3.Cursor): Database cursor
+        course_id (int): ID of the course
+    
+    Returns:
+        tuple: (last comment ID, last deletion ID)
+    """
+    cursor.execute("""
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM comments WHERE course_id = ?) as last_id,
+               (SELECT COALESCE(MAX(id), 0) FROM comment_deletions WHERE course_id = ?) as last_deleted
+    """, (course_id, course_id))
+    row = cursor.fetchone()
+    return row['last_id'], row['last_deleted']
+
+
+# Function to convert a comment row to JSON-ready dictionary
+def comment_to_dict(comment):
+    """
+    Convert a comment row (joined with its author) to a dictionary.
+    
+    Args:
+        comment (sqlite3.Row): Row with id, message, created_at, full_name, username
+    
+    Returns:
+        dict: Comment fields for the JSON API
+    """
+    return {
+        'id': comment['id'],
+        'message': comment['message'],
+        'created_at': comment['created_at'],
+        'full_name': comment['full_name'],
+        'username': comment['username']
+    }
+
+
 # Define route for getting course comments (AJAX)
 @app.route("/api/get_comments/<int:course_id>")
 def get_comments(course_id):
     """
-    Get all comments for a specific course (for AJAX requests).
+    Get comments for a specific course (for AJAX requests).
+    
+    Without query parameters the whole discussion is returned. Pollers pass
+    since_id (last comment ID seen) and since_deleted (last deletion ID
+    seen) to receive only new comments and the IDs of deleted ones. The
+    response carries an ETag of the discussion version; a request whose
+    If-None-Match still matches gets 304 Not Modified with no body.
     
     Args:
         course_id (int): ID of the course
     
     Returns:
-        JSON response with list of comments
+        JSON response with comments, deleted comment IDs and the new cursor,
+        or an empty 304 response
     """
     # Check if user is logged in
     if 'user_id' not in session:
@@ -2693,54 +6809,67 @@ def get_comments(course_id):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        user_role = session.get('role')
-        user_id = session['user_id']
+        allowed, error = can_access_course_comments(cursor, course_id)
+        if not allowed:
+            conn.close()
+            return jsonify({'error': error}), 403
         
-        # If course_id is 0, it's a global discussion - all logged-in users can access
-        if course_id != 0:
-            # Verify user is enrolled in the course (if student) or is the teacher
-            if user_role == 'student':
-                cursor.execute("""
-                    SELECT id FROM enrollments 
-                    WHERE student_id = ? AND course_id = ?
-                """, (user_id, course_id))
-                
-                if not cursor.fetchone():
-                    conn.close()
-                    return jsonify({'error': 'Not enrolled in this course'}), 403
-            elif user_role == 'teacher':
-                cursor.execute("""
-                    SELECT id FROM courses WHERE id = ? AND teacher_id = ?
-                """, (course_id, user_id))
-                
-                if not cursor.fetchone():
-                    conn.close()
-                    return jsonify({'error': 'Not authorized'}), 403
+        # Answer 304 when nothing was posted or deleted since the client's version
+        last_id, last_deleted = get_comments_version(cursor, course_id)
+        etag = f"c{course_id}-{last_id}-{last_deleted}"
+        if request.if_none_match.contains_weak(etag):
+            conn.close()
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
         
-        # Get all comments for the course
-        cursor.execute("""
-            SELECT c.id, c.message, c.created_at, u.full_name, u.username
-            FROM comments c
-            JOIN users u ON c.user_id = u.id
-            WHERE c.course_id = ?
-            ORDER BY c.created_at DESC
-        """, (course_id,))
+        since_id = request.args.get('since_id', type=int)
+        since_deleted = request.args.get('since_deleted', 0, type=int)
+        
+        if since_id is None:
+            # Get all comments for the course
+            cursor.execute("""
+                SELECT c.id, c.message, c.created_at, u.full_name, u.username
+                FROM comments c
+                JOIN users u ON c.user_id = u.id
+                WHERE c.course_id = ?
+                ORDER BY c.created_at DESC
+            """, (course_id,))
+            comments_data = cursor.fetchall()
+            deleted_ids = []
+        else:
+            # Get only the comments posted after the client's cursor
+            cursor.execute("""
+                SELECT c.id, c.message, c.created_at, u.full_name, u.username
+                FROM comments c
+                JOIN users u ON c.user_id = u.id
+                WHERE c.course_id = ? AND c.id > ?
+                ORDER BY c.id DESC
+            """, (course_id, since_id))
+            comments_data = cursor.fetchall()
+            
+            # Get the comments deleted after the client's cursor
+            cursor.execute("""
+                SELECT comment_id FROM comment_deletions
+                WHERE course_id = ? AND id > ?
+            """, (course_id, since_deleted))
+            deleted_ids = [row['comment_id'] for row in cursor.fetchall()]
         
-        comments_data = cursor.fetchall()
         conn.close()
         
         # Convert to list of dictionaries
-        comments_list = []
-        for comment in comments_data:
-            comments_list.append({
-                'id': comment['id'],
-                'message': comment['message'],
-                'created_at': comment['created_at'],
-                'full_name': comment['full_name'],
-                'username': comment['username']
-            })
-        
-        return jsonify({'success': True, 'comments': comments_list})
+        comments_list = [comment_to_dict(comment) for comment in comments_data]
+        
+        response = jsonify({'success': True,
+                            'comments': comments_list,
+                            'deleted': deleted_ids,
+                            'full': since_id is None,
+                            'since_id': last_id,
+                            'since_deleted': last_deleted})
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -2776,28 +6905,12 @@ def post_comment(course_id):
         cursor = conn.cursor()
         
         user_id = session['user_id']
-        user_role = session.get('role')
         
         # If course_id is 0, it's a global discussion - all logged-in users can post
-        if course_id != 0:
-            # Verify user is enrolled in the course (if student) or is the teacher
-            if user_role == 'student':
-                cursor.execute("""
-                    SELECT id FROM enrollments 
-                    WHERE student_id = ? AND course_id = ?
-                """, (user_id, course_id))
-                
-                if not cursor.fetchone():
-                    conn.close()
-                    return jsonify({'error': 'Not enrolled in this course'}), 403
-            elif user_role == 'teacher':
-                cursor.execute("""
-                    SELECT id FROM courses WHERE id = ? AND teacher_id = ?
-                """, (course_id, user_id))
-                
-                if not cursor.fetchone():
-                    conn.close()
-                    return jsonify({'error': 'Not authorized'}), 403
+        allowed, error = can_access_course_comments(cursor, course_id)
+        if not allowed:
+            conn.close()
+            return jsonify({'error': error}), 403
         
         # Insert the new comment
         cursor.execute("""
@@ -2819,21 +6932,95 @@ def post_comment(course_id):
         comment = cursor.fetchone()
         conn.close()
         
+        # Push the new comment to everyone streaming this discussion
+        event_hub.publish(f"course:{course_id}", 'comment', comment_to_dict(comment))
+        
         return jsonify({
             'success': True,
-            'comment': {
-                'id': comment['id'],
-                'message': comment['message'],
-                'created_at': comment['created_at'],
-                'full_name': comment['full_name'],
-                'username': comment['username']
-            }
+            'comment': comment_to_dict(comment)
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# Define route for streaming a course discussion (Server-Sent Events)
+@app.route("/api/stream/course/<int:course_id>")
+def stream_course(course_id):
+    """
+    Stream new and deleted comments of a course as Server-Sent Events.
+    
+    Events: 'comment' (same fields as /api/get_comments) and
+    'comment_deleted' ({"id": ...}). Pages keep polling as a fallback.
+    
+    Args:
+        course_id (int): ID of the course (0 = global discussion)
+    
+    Returns:
+        text/event-stream response, or JSON error (503 when the stream limit is reached)
+        (or 204 when LMS_SSE is off, which tells EventSource not to reconnect)
+    """
+    if not SSE_ENABLED:
+        return '', 204
+    
+    # Check if user is logged in
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    conn = get_db_connection()
+    try:
+        allowed, error = can_access_course_comments(conn.cursor(), course_id)
+    finally:
+        # Release the connection before the long-lived stream starts
+        conn.close()
+    if not allowed:
+        return jsonify({'error': error}), 403
+    
+    subscription = event_hub.subscribe([f"course:{course_id}"])
+    if subscription is None:
+        return jsonify({'error': 'Too many open streams, use polling'}), 503
+    return sse_response(subscription)
+
+
+# Define route for streaming the logged-in user's notifications (Server-Sent Events)
+@app.route("/api/stream/user")
+def stream_user():
+    """
+    Stream new lesson and assignment notifications for the logged-in user.
+    
+    Students receive a 'notification' event whenever a lesson or assignment
+    is created in one of their courses.
+    
+    Returns:
+        text/event-stream response, or JSON error (503 when the stream limit is reached)
+        (or 204 when LMS_SSE is off, which tells EventSource not to reconnect)
+    """
+    if not SSE_ENABLED:
+        return '', 204
+    
+    # Check if user is logged in
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    channels = [f"user:{session['user_id']}"]
+    if session.get('role') == 'student':
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT course_id FROM enrollments WHERE student_id = ?
+            """, (session['user_id'],))
+            channels += [f"notify:{row['course_id']}" for row in cursor.fetchall()]
+        finally:
+            # Release the connection before the long-lived stream starts
+            conn.close()
+    
+    subscription = event_hub.subscribe(channels)
+    if subscription is None:
+        return jsonify({'error': 'Too many open streams, use polling'}), 503
+    return sse_response(subscription)
+
+
 # Define route for deleting a comment
 @app.route("/api/delete_comment/<int:comment_id>", methods=['POST'])
 def delete_comment(comment_id):
@@ -2856,7 +7043,7 @@ def delete_comment(comment_id):
         
         # Get the comment and verify the user owns it
         cursor.execute("""
-            SELECT id, user_id FROM comments WHERE id = ?
+            SELECT id, user_id, course_id FROM comments WHERE id = ?
         """, (comment_id,))
         
         comment = cursor.fetchone()
@@ -2875,15 +7062,131 @@ def delete_comment(comment_id):
             DELETE FROM comments WHERE id = ?
         """, (comment_id,))
         
+        # Record the deletion so pollers holding the comment can remove it
+        cursor.execute("""
+            INSERT INTO comment_deletions (comment_id, course_id) VALUES (?, ?)
+        """, (comment_id, comment['course_id']))
+        
         conn.commit()
         conn.close()
         
+        # Push the deletion to everyone streaming this discussion
+        event_hub.publish(f"course:{comment['course_id']}", 'comment_deleted', {'id': comment_id})
+        
         return jsonify({'success': True})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# Define route for listing a teacher's background jobs
+@app.route("/jobs")
+def jobs():
+    """
+    Display the background jobs started by the logged-in teacher.
+    
+    Returns:
+        Rendered jobs page with the 50 most recent jobs
+    """
+    # Check if user is logged in
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    # Check if user is a teacher
+    if session.get('role') != 'teacher':
+        return redirect(url_for('home'))
+    
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Fetch the most recent jobs queued by this teacher
+        cursor.execute("""
+            SELECT j.id, j.job_type, j.status, j.attempts, j.max_attempts, j.last_error,
+                   j.result, j.created_at, j.finished_at, c.title as course_title
+            FROM jobs j
+            LEFT JOIN courses c ON j.course_id = c.id
+            WHERE j.created_by = ?
+            ORDER BY j.id DESC
+            LIMIT 50
+        """, (session['user_id'],))
+        
+        return render_template('jobs.html', jobs=cursor.fetchall())
+    
+    except Exception as e:
+        return render_template('jobs.html', jobs=[], error='Error loading jobs')
+    finally:
+        if conn:
+            conn.close()
+
+
+# Define route for checking a background job's status (AJAX)
+@app.route("/api/jobs/<int:job_id>")
+def job_status(job_id):
+    """
+    Get the status of a background job queued by the logged-in user.
+    
+    Args:
+        job_id (int): ID of the job
+    
+    Returns:
+        JSON response with the job's status, attempts and result
+    """
+    # Check if user is logged in
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, job_type, status, attempts, max_attempts, last_error, result, created_at, finished_at
+            FROM jobs
+            WHERE id = ? AND created_by = ?
+        """, (job_id, session['user_id']))
+        
+        job = cursor.fetchone()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        job = dict(job)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return jsonify({'success': True, 'job': job})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+
+# Define route for database connection pool statistics (AJAX)
+@app.route("/api/db_stats")
+def db_stats():
+    """
+    Report connection pool statistics for monitoring.
+    
+    Only accessible to logged-in teachers.
+    
+    Returns:
+        JSON response with pool size, connections in use, waits and reuse counts
+    """
+    # Check if user is logged in as a teacher
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    if session.get('role') != 'teacher':
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    return jsonify({'success': True,
+                    'storage_profile': STORAGE_PROFILE,
+                    'event_hub': event_hub.stats(),
+                    'pools': [pool.stats() for pool in list(_pools.values())]})
+
+
 # Define error handler for 404 Not Found
 @app.errorhandler(404)
 def error_404(error):
@@ -2908,8 +7211,13 @@ def error_500(error):
     return render_template('error.html', error='Internal server error!'), 500
 
 
-# Initialize database tables on application startup
-init_db()
+# Apply and verify the storage profile, then bring the schema up to date on application startup
+# (a single SELECT when the schema is already current; set LMS_AUTO_MIGRATE=0 to run
+# "flask --app app migrate" from the deploy script instead)
+for problem in apply_storage_profile():
+    print(f"Warning: storage profile '{STORAGE_PROFILE}' not fully applied - {problem}")
+if os.environ.get('LMS_AUTO_MIGRATE', '1') != '0':
+    migrate_db()
 
 # Entry point of the application
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Attendance Report Filter Tests
+Checks that the `from` / `to` attendance report filter is parsed into
+zero-padded dates, since it is compared as text with stored session dates.
+"""
+
+import os
+import tempfile
+
+# Keep the tests off the real database and without background workers
+os.environ.setdefault('LMS_DATABASE', os.path.join(tempfile.mkdtemp(), 'lms.db'))
+os.environ.setdefault('LMS_JOB_WORKERS', '0')
+
+from app import parse_attendance_range
+
+
+def test_padded_range():
+    """A well-formed range is returned unchanged."""
+    assert parse_attendance_range({'from': '2024-01-05', 'to': '2024-01-10'}) == (('2024-01-05', '2024-01-10'), None)
+
+
+def test_non_padded_dates_are_normalized():
+    """2024-1-5 must sort before 2024-01-10, not after it."""
+    date_range, error = parse_attendance_range({'from': '2024-1-5', 'to': '2024-01-10'})
+    assert error is None
+    assert date_range == ('2024-01-05', '2024-01-10')
+    # An open-ended range keeps the January-September sessions of the year
+    date_range, error = parse_attendance_range({'from': '2024-1-5'})
+    assert date_range == ('2024-01-05', '9999-12-31') and '2024-03-01' >= date_range[0]
+
+
+def test_invalid_and_reversed_ranges():
+    """Bad dates and a start after the end are reported, not applied."""
+    assert parse_attendance_range({'from': '2024-13-01'})[0] is None
+    assert parse_attendance_range({'from': '2024-2-1', 'to': '2024-01-31'}) == (
+        None, 'The start date must not be after the end date')
+    assert parse_attendance_range({}) == (None, None)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Connection Pool Tests
+Checks that a connection closed twice is not taken away from the thread
+that checked it out in between.
+"""
+
+import os
+import tempfile
+import threading
+
+# Keep the tests off the real database and without background workers
+os.environ.setdefault('LMS_DATABASE', os.path.join(tempfile.mkdtemp(), 'lms.db'))
+os.environ.setdefault('LMS_JOB_WORKERS', '0')
+
+from app import ConnectionPool
+
+
+def run_in_thread(func):
+    """Run func in a new thread and wait for it to finish."""
+    thread = threading.Thread(target=func)
+    thread.start()
+    thread.join()
+
+
+def test_double_close_from_two_threads():
+    """A second close() by thread A must not release thread B's checkout."""
+    pool = ConnectionPool(os.path.join(tempfile.mkdtemp(), 'pool.db'), max_size=2)
+    a_closed = threading.Event()
+    b_started = threading.Event()
+    a_closed_again = threading.Event()
+    seen = {}
+    
+    def thread_a():
+        conn = pool.acquire()
+        seen['a'] = conn
+        conn.close()
+        a_closed.set()
+        b_started.wait(5)
+        # Early close plus close() in a finally block
+        conn.close()
+        a_closed_again.set()
+    
+    def thread_b():
+        a_closed.wait(5)
+        conn = pool.acquire()
+        seen['b'] = conn
+        conn.execute("CREATE TABLE IF NOT EXISTS t (x)")
+        conn.execute("INSERT INTO t VALUES (1)")
+        b_started.set()
+        a_closed_again.wait(5)
+        seen['b_in_transaction'] = conn.in_transaction
+        # Thread C must be given another connection while B still holds this one
+        run_in_thread(lambda: seen.setdefault('c', pool.acquire()))
+        conn.commit()
+        conn.close()
+    
+    threads = [threading.Thread(target=thread_a), threading.Thread(target=thread_b)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert seen['b'] is seen['a']
+    assert seen['b_in_transaction'] is True
+    assert seen['c'] is not seen['b']
+    assert pool.stats()['in_use'] == 1
+    pool.close_all()